@@ -42,7 +42,17 @@ function Content() {
 
 // Gets weather info from Yahoo Weather. (Method 1: JSON, 2: XML Response)
 // Sometimes breaks - it seems like you have to run it after at least 1 min wait.
+// The result is kept in the script cache for 6 hours (by location and date),
+// so sending e-mails and texts on the same day only fetches it once.
 function weatherInfo(){
+  var woeid = "2380633";  // Claremont
+  var key = "weather-" + woeid + "-" + Utilities.formatDate(new Date(), "America/Los_Angeles", "yyyy-MM-dd");
+  var cache = CacheService.getScriptCache();
+  var cached = cache.get(key);
+  if (cached != null) {
+    return cached;
+  }
+
   // Pretty-prints JSON in Terminal shell to show the data more clearly.
   // https://stackoverflow.com/questions/12943819/how-to-prettyprint-a-json-file
   // cat some.json | python -m json.tool
@@ -64,18 +74,20 @@ function weatherInfo(){
   // Finds average high temperature to the third decimal place and returns it.
   var avg_high = total_high/7;
   avg_high = avg_high.toFixed(3);
+  cache.put(key, avg_high, 6 * 60 * 60);  // Seconds.
   return avg_high;
 }
 
 function weatherContent() {
+  var avg_high = Number(weatherInfo());  // Fetched once for every comparison.
   var content = "A friendly reminder to water your tree! This week's average high temperature will be %s. ";
-  content = content.replace('%s', weatherInfo().toString());
+  content = content.replace('%s', avg_high.toFixed(3));
 
   // Reminds water frequency based on the week's average temperature.
-  if (weatherInfo() < 85) {
+  if (avg_high < 85) {
     content += "Please water your tree once this week.";
   }
-  else if (weatherInfo() > 100) {
+  else if (avg_high > 100) {
     content += "Please water your tree three times this week.";
   }
   else {
@@ -86,28 +98,53 @@ function weatherContent() {
   return content;
 }
 
+// Returns the mark of one message sent today: the date and a short digest
+// of its subject and text, e.g. "10/18 a1B2c3D4". Weekly and personal
+// messages (or two personal ones) get different marks.
+function sentMark(today, subject, content) {
+  var digest = Utilities.computeDigest(Utilities.DigestAlgorithm.MD5, subject + "\n" + content);
+  return today + " " + Utilities.base64EncodeWebSafe(digest).substring(0, 8);
+}
+
+// Returns the marks in Column 6 that are from today (older ones are dropped).
+function todaysMarks(value, today) {
+  if (value instanceof Date) {  // Only a date: no message to compare with.
+    return [];
+  }
+  return String(value).split(", ").filter(function(mark) {
+    return mark.indexOf(today + " ") == 0;
+  });
+}
+
+// Writes the mark of a message as soon as it is sent, so a run that was
+// stopped can be started again without sending anyone the same message twice.
+function markSent(sheet, i, marks, mark) {
+  sheet.getRange(2 + i, 6).setValue(marks.concat([mark]).join(", "));  // Start row, col
+  SpreadsheetApp.flush();
+}
+
 /******************************** E-MAIL ********************************/
 // Sends e-mail based on user preferrance.
 function sendEmails(subject, content) {
   var sheet = SpreadsheetApp.getActiveSheet();
   var data = getData();
   var today = Utilities.formatDate(new Date(), "America/Los_Angeles", "MM/dd")
+  var mark = sentMark(today, subject, content);
 
   for (var i = 0; i < data.length; i ++) {
     var row = data[i];
     var name = row[0];  // Column 1: Name
     var rule = row[1];  // Column 2: Preferred
+    var marks = todaysMarks(row[5], today);  // Column 6: Messages sent today
 
     var body = "Hello %s, \n \n"
     body = body.replace("%s", name);
     body += content;
 
-    if (rule == "E-mail") {
+    if (rule == "E-mail" && marks.indexOf(mark) < 0) {
         var emailAddress = row[3];  // Column 4: E-mail Address
         MailApp.sendEmail(emailAddress, subject, body);
-        sheet.getRange(2 + i, 6).setValue(today);  // Start row, col
-        // Make sure the cell is updated right away in case the script is interrupted
-        SpreadsheetApp.flush();
+        markSent(sheet, i, marks, mark);
     }
   }
 }
@@ -160,22 +197,22 @@ function sendTexts(content) {
   var sheet = SpreadsheetApp.getActiveSheet();
   var data = getData();
   var today = Utilities.formatDate(new Date(), "America/Los_Angeles", "MM/dd")
+  var mark = sentMark(today, "Text", content);
 
   for (var i = 0; i < data.length; i ++) {
     var row = data[i];
     var name = row[0];  // Column 1: Name
     var rule = row[1];  // Column 2: Preferred.
+    var marks = todaysMarks(row[5], today);  // Column 6: Messages sent today
 
     var body = "[Sustainable Claremont]\nHello %s, \n \n"
     body = body.replace("%s", name);
     body += content;
 
-    if (rule == "Text") {
+    if (rule == "Text" && marks.indexOf(mark) < 0) {
         var phoneNum = row[2];  // Column 3: Phone num.
         TwilioText(phoneNum, body);
-        sheet.getRange(2 + i, 6).setValue(today);  // Start row, col
-        // Updates cell right away in case the script is interrupted.
-        SpreadsheetApp.flush();
+        markSent(sheet, i, marks, mark);
     }
   }
 }
@@ -0,0 +1,352 @@
+"""
+ *****************************************************************************
+   FILE :           archive.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    History of the benefit results. report.py overwrites
+                    report.docx every run, so the per-tree results of each
+                    run are also kept here, in a Parquet dataset split into
+                    folders by city, organization, year and run date:
+
+                    archive/city=Claremont/organization=.../year=2026/
+                            run=2026-10-18/part-0.parquet
+
+                    Files are compressed (zstd) and keep min/max statistics
+                    of every column per row group, and the trees of a run
+                    are sorted by genus and species. A query only opens the
+                    folders that match its city, organization and years,
+                    only reads the columns it needs, and skips the row
+                    groups whose statistics can't match (e.g. another
+                    genus), so e.g. "stormwater managed per district, 2018
+                    vs 2026" or "CO2 sequestered by year for Jacaranda"
+                    don't read the rest of the history.
+
+                    Every run is a snapshot of all the trees, so totals,
+                    comparisons and trends only use the latest run of each
+                    city, organization and year (a second run in the same
+                    year doesn't count the trees twice). A run of the same
+                    city, organization and date replaces the earlier one.
+
+                    The Zone column is only filled when the tree sheet of
+                    the run is given (add --sheet, or report.py --archive
+                    with the sheet of the results); runs without it are in
+                    the empty group of "query --by Zone".
+
+   REQUIRES :       pyarrow (pip install pyarrow), imported only when the
+                    archive is used.
+
+   USAGE :          python archive.py add treeresult.csv --sheet tree.xls --organization "Sustainable Claremont"
+                    python archive.py query --metric "Stormwater Managed (gallons)" --by Zone --years 2018 2026
+                    python archive.py trend --metric "CO2 Sequestered (pounds)" --species Jacaranda --out trend.png
+                    python archive.py runs
+
+ *****************************************************************************
+"""
+
+import argparse
+import datetime
+import os
+import re
+import shutil
+import uuid
+from urllib.parse import quote
+
+import numpy as np
+
+import tracing  # Stage timings.
+from benefits import DEFAULT_DBH, GROUP_RE, METRICS
+from resultstore import read_results
+
+
+PARTITIONS = ["city", "organization", "year", "run"]  # Folder levels.
+TREE = ["Tree", "Species", "Scientific", "Genus", "DBH", "Distance", "Direction", "Zone"]
+COMPRESSION = "zstd"
+ROW_GROUP = 1 << 17  # Rows per row group (each has its own statistics, so it can be skipped).
+
+SCIENTIFIC_RE = re.compile(r"\(\d+\) .+? \((?P<scientific>.+?)\)\s+at")
+
+
+def _arrow():
+    """ Returns (pyarrow, pyarrow.dataset, pyarrow.parquet). """
+
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The results archive needs pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.dataset, pyarrow.parquet
+
+
+def from_export(file, start=3, zones=None):
+    """ Returns the trees of an iTree export as archive rows: Tree, Species
+        (common name), Scientific, Genus, DBH, Distance, Direction, Zone
+        and the benefit columns. 'zones' gives the zone of every tree. """
+
+    import pandas as pd
+
+    df = read_results(file, start)
+    if zones is not None and len(zones) != len(df):
+        raise ValueError("%s has %d trees but %d zones were given" % (file, len(df), len(zones)))
+    info = df["Tree Group Characteristics"].str.extract(GROUP_RE)
+    scientific = df["Tree Group Characteristics"].str.extract(SCIENTIFIC_RE)["scientific"]
+
+    trees = pd.DataFrame({"Tree": pd.to_numeric(df["Group Identifier"], errors="coerce").fillna(0).astype(np.int32),
+                          "Species": info["species"], "Scientific": scientific,
+                          "Genus": scientific.str.split().str[0],
+                          "DBH": pd.to_numeric(info["dbh"], errors="coerce").fillna(DEFAULT_DBH).astype(np.float32),
+                          "Distance": info["distance"], "Direction": info["direction"],
+                          "Zone": zones})
+    for metric in METRICS:
+        trees[metric] = df[metric].to_numpy(np.float32) if metric in df else np.float32(np.nan)
+    return trees
+
+
+def sheet_zones(sheet, size=500, polygons=None, name=None):
+    """ Returns the zone of every tree of an export from its tree sheet:
+        the polygon of a GeoJSON file (e.g. districts) or a hexagon. """
+
+    import zones
+
+    trees = zones.load_trees(sheet)
+    if polygons:
+        return zones.PolygonIndex.from_geojson(polygons, name).assign(trees["Longitude"], trees["Latitude"])
+    return zones.hex_grid(trees["Longitude"], trees["Latitude"], size)
+
+
+def schema(pa, partitions=False):
+    """ Returns the columns of the archive files (and of the folders). """
+
+    types = {"Tree": pa.int32(), "DBH": pa.float32(), "year": pa.int16()}  # The rest is text.
+    fields = [(name, types.get(name, pa.string())) for name in TREE]
+    fields += [(metric, pa.float32()) for metric in METRICS]
+    if partitions:
+        fields += [(name, types.get(name, pa.string())) for name in PARTITIONS]
+    return pa.schema(fields)
+
+
+def _values(value):
+    """ Returns a list of filter values (one value or a list). """
+
+    return [value] if isinstance(value, (str, int, np.integer)) else list(value)
+
+
+class Archive():
+    """ Benefit results of every run, in a partitioned Parquet dataset. """
+
+    def __init__(self, folder="archive"):
+        self._folder = folder
+        self._dataset = None  # Found again after every append.
+
+    def _partition(self, city, organization, run):
+        return os.path.join(self._folder, "city=" + quote(city, safe=""),
+                            "organization=" + quote(organization, safe=""),
+                            "year=%d" % run.year, "run=" + run.isoformat())
+
+    def append(self, trees, city, organization, run=None):
+        """ Saves the trees (see from_export) of one run. Replaces a run of
+            the same city, organization and date. Returns the number of rows. """
+
+        pa, ds, pq = _arrow()
+        run = run or datetime.date.today()
+        trees = trees.reindex(columns=TREE + METRICS)
+        trees = trees.sort_values(["Genus", "Species"], kind="stable")  # Tight statistics per row group.
+        table = pa.Table.from_pandas(trees, schema(pa), preserve_index=False)
+
+        # Written next to the partition and renamed, so a query never sees
+        # half a run. Names starting with "." are not read as partitions.
+        path = self._partition(city, organization, run)
+        parent, name = os.path.split(path)
+        temp = os.path.join(parent, ".%s-%s" % (name, uuid.uuid4().hex))
+        os.makedirs(temp)
+        with tracing.span("archive.append", len(table)):
+            pq.write_table(table, os.path.join(temp, "part-0.parquet"), compression=COMPRESSION,
+                           row_group_size=ROW_GROUP, write_statistics=True)
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.replace(temp, path)
+
+        self._dataset = None
+        return len(table)
+
+    def dataset(self):
+        """ Returns the pyarrow dataset of every run. """
+
+        pa, ds, pq = _arrow()
+        if self._dataset is None:
+            columns = schema(pa, partitions=True)
+            partitioning = ds.partitioning(pa.schema([columns.field(name) for name in PARTITIONS]), flavor="hive")
+            self._dataset = ds.dataset(self._folder, columns, format="parquet", partitioning=partitioning)
+        return self._dataset
+
+    def where(self, city=None, organization=None, years=None, since=None, until=None, species=None,
+              zones=None):
+        """ Returns the filter of a query (None for every row). Each one is
+            one value or a list; 'species' matches the common name, the
+            scientific name or the genus, and since/until are run dates. """
+
+        pa, ds, pq = _arrow()
+        found = []
+        if city is not None:
+            found.append(ds.field("city").isin(_values(city)))
+        if organization is not None:
+            found.append(ds.field("organization").isin(_values(organization)))
+        if years is not None:
+            found.append(ds.field("year").isin([int(year) for year in _values(years)]))
+        if since is not None:
+            found.append(ds.field("run") >= str(since))
+        if until is not None:
+            found.append(ds.field("run") <= str(until))
+        if species is not None:
+            names = _values(species)
+            found.append(ds.field("Genus").isin(names) | ds.field("Species").isin(names)
+                         | ds.field("Scientific").isin(names))
+        if zones is not None:
+            found.append(ds.field("Zone").isin(_values(zones)))
+
+        where = None
+        for expression in found:
+            where = expression if where is None else where & expression
+        return where
+
+    def latest(self):
+        """ Returns the dataset of only the latest run of every city,
+            organization and year (found from the folder names). """
+
+        pa, ds, pq = _arrow()
+        dataset = self.dataset()
+        found = {}  # (city, organization, year) -> (run, [files])
+        for fragment in dataset.get_fragments():
+            keys = ds.get_partition_keys(fragment.partition_expression)
+            key = (keys["city"], keys["organization"], keys["year"])
+            run, files = found.get(key, ("", []))
+            if keys["run"] > run:
+                found[key] = (keys["run"], [fragment.path])
+            elif keys["run"] == run:
+                files.append(fragment.path)
+        files = sorted(path for run, paths in found.values() for path in paths)
+        return ds.dataset(files, dataset.schema, format="parquet", partitioning=dataset.partitioning,
+                          partition_base_dir=self._folder)
+
+    def table(self, columns, every_run=False, **filters):
+        """ Returns the pyarrow Table of some columns of the matching rows,
+            from the latest run of each year (or from every run). """
+
+        with tracing.span("archive.read") as span:
+            dataset = self.dataset() if every_run else self.latest()
+            table = dataset.to_table(columns=list(columns), filter=self.where(**filters))
+            span.add(len(table))
+        return table
+
+    def query(self, columns, every_run=False, **filters):
+        """ Returns some columns of the matching rows as a DataFrame. """
+
+        return self.table(columns, every_run, **filters).to_pandas()
+
+    def totals(self, metrics, by=("year",), **filters):
+        """ Returns the sums of benefit columns and the number of trees of
+            every group (e.g. by=("Zone", "year")), summed in pyarrow over
+            the latest run of each year. """
+
+        metrics, by = _values(metrics), list(by)
+        table = self.table(by + metrics, **filters)
+        sums = table.group_by(by).aggregate([(metric, "sum") for metric in metrics] + [(metrics[0], "count")])
+        frame = sums.to_pandas().rename(columns=dict({metric + "_sum": metric for metric in metrics},
+                                                     **{metrics[0] + "_count": "Trees"}))
+        return frame.set_index(by).sort_index()[["Trees"] + metrics]
+
+    def compare(self, metric, by="Zone", years=None, **filters):
+        """ Returns a table of one benefit per group (rows) and year (columns),
+            e.g. stormwater managed per district in 2018 and 2026. """
+
+        return self.totals(metric, (by, "year"), years=years, **filters)[metric].unstack("year")
+
+    def trend(self, metric, **filters):
+        """ Returns the total of one benefit in every year. """
+
+        return self.totals(metric, ("year",), **filters)[metric]
+
+    def runs(self):
+        """ Returns the city, organization, year, run and rows of every run,
+            from the folder names and file footers (no rows are read). """
+
+        import pandas as pd
+
+        pa, ds, pq = _arrow()
+        rows = {}
+        for fragment in self.dataset().get_fragments():
+            keys = ds.get_partition_keys(fragment.partition_expression)
+            key = tuple(keys.get(name) for name in PARTITIONS)
+            rows[key] = rows.get(key, 0) + fragment.metadata.num_rows
+        return pd.DataFrame([key + (count,) for key, count in sorted(rows.items())],
+                            columns=PARTITIONS + ["rows"])
+
+
+def trend_chart(trend, metric):
+    """ Returns the (kind, values, labels, title) of a trend chart (see
+        charts.py). """
+
+    values = [round(float(value), 2) for value in trend]
+    return "line", values, [str(year) for year in trend.index], "%s by Year" % metric
+
+
+def main(argv=None):
+    """ Adds a run to the archive or answers a question about the history. """
+
+    parser = argparse.ArgumentParser(description="History of the benefit results.")
+    parser.add_argument("--folder", default="archive")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="adds the per-tree results of one run")
+    add.add_argument("results", nargs="?", default="treeresult.csv")
+    add.add_argument("--city", default="Claremont")
+    add.add_argument("--organization", default="Sustainable Claremont")
+    add.add_argument("--date", type=datetime.date.fromisoformat, default=None, help="run date, YYYY-MM-DD")
+    add.add_argument("--sheet", help="tree sheet of the results, for the Zone column")
+    add.add_argument("--polygons", help="GeoJSON file of districts (default: hexagons)")
+    add.add_argument("--name", help="property with the district name in the GeoJSON file")
+    add.add_argument("--size", type=float, default=500, help="hexagon size in meters")
+
+    commands.add_parser("runs", help="lists the runs in the archive")
+
+    for name, text in (("query", "sums a benefit per group and year"), ("trend", "a benefit by year")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument("--metric", default="CO2 Sequestered (pounds)", choices=METRICS, metavar="METRIC")
+        command.add_argument("--city", nargs="+")
+        command.add_argument("--organization", nargs="+")
+        command.add_argument("--years", type=int, nargs="+")
+        command.add_argument("--species", nargs="+", help="common name, scientific name or genus")
+        command.add_argument("--zones", nargs="+")
+    commands.choices["query"].add_argument("--by", default="Zone", help="e.g. Zone, Genus, organization")
+    commands.choices["trend"].add_argument("--out", help="saves the trend chart (PNG)")
+    args = parser.parse_args(argv)
+
+    archive = Archive(args.folder)
+    if args.command == "add":
+        zones = sheet_zones(args.sheet, args.size, args.polygons, args.name) if args.sheet else None
+        trees = from_export(args.results, zones=None if zones is None else np.asarray(zones, dtype=object))
+        rows = archive.append(trees, args.city, args.organization, args.date)
+        print("Archived %d trees of %s" % (rows, args.results))
+        return
+    if args.command == "runs":
+        print(archive.runs().to_string(index=False))
+        return
+
+    filters = {"city": args.city, "organization": args.organization, "species": args.species,
+               "zones": args.zones}
+    if args.command == "query":
+        print(archive.compare(args.metric, args.by, args.years, **filters).round(3).to_string())
+    else:
+        trend = archive.trend(args.metric, years=args.years, **filters)
+        print(trend.round(3).to_string())
+        if args.out:
+            import charts
+            with open(args.out, "wb") as fp:
+                fp.write(charts.draw(*trend_chart(trend, args.metric)))
+
+
+if __name__ == '__main__':
+    main()
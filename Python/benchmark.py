@@ -0,0 +1,351 @@
+"""
+ *****************************************************************************
+   FILE :           benchmark.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Times every stage of the pipeline on made-up inventories
+                    of 1k, 10k, 100k and 1M trees:
+
+                    parse       tree sheet -> inventory.py arrays
+                    normalize   sheet values -> iTree values (mappings.csv)
+                    benefits    local benefit engine (benefits.py)
+                    read_file   csvData.read_file and totals of a result csv
+                    report      one report from report_ex.docx with its chart
+                    contacts    contact sheet -> messages (outbox.py)
+                    email       building every e-mail and sending it
+
+                    Sheets, result csvs and contact lists are made with a
+                    seeded random generator, with the species mix of
+                    tree.xls (see treespecies.py), struck out rows, blank
+                    rows and "N/A" cells. Everything runs offline: benefits
+                    come from the local engine (the numbers itreestub.py
+                    serves instead of the iTree site) and e-mails go to a
+                    stub SMTP server. Results are written as JSON, so runs
+                    of different versions can be compared with --compare,
+                    which exits with status 1 if a stage got slower (for
+                    CI). Comparing needs the best of at least MIN_REPEAT
+                    runs, and a stage only counts as slower if it lost
+                    more than the tolerance and more than MIN_SECONDS:
+                    short stages vary by tens of percent from run to run.
+
+   USAGE :          python benchmark.py --out bench.json
+                    python benchmark.py --sizes 1000 10000 --compare bench.json
+
+   NOTES :          Sheets are made as .csv (.xls stops at 65,536 rows), and
+                    csv files can't have strikethrough, so the struck out
+                    rows are marked on the inventory after it is read.
+
+ *****************************************************************************
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import benefits
+import charts
+import inventory
+import mailer
+import normalize
+import outbox
+import report
+import sheetreader
+
+
+SIZES = [1000, 10000, 100000, 1000000]
+MIN_REPEAT = 3  # Runs of each stage to keep the best of when comparing.
+MIN_SECONDS = 0.1  # Smallest slowdown of a stage that counts, in seconds.
+
+# Species of tree.xls and how many trees each one has (treespecies.py).
+# Every species gets at least one tree in a big enough sheet.
+SPECIES = {"Acacia salicina": 24, "Acacia saligna": 4, "Chitalpa tashkentensis": 3,
+           "Corymbia citriodora": 42, "Gingko biloba": 58, "Jacaranda mimosifolia": 82,
+           "Lagerstroemia x 'Natchez'": 1, "Lophostemon confertus": 25, "Pistacia chinensis": 2,
+           "Quercus rubra": 64, "Quercus rubra ": 26}
+DISTANCES = ["0'-20'", "20'-40'", "40'-60'"]
+DIRECTIONS = ["N", "NE", "E", "SE", "S", "SW", "W", "NW"]
+STOCK = ["15 gal", "15 gal ", "24 in box", "5 gal"]
+HEADER = ["Tree #", "Species", "Address", "City", "Y  Coordinate", "X Coordinate", "Census Tract",
+          "DAC Status", "Date Planted", "Stock Size", "Grow Space", "Tree direction", "Tree distance"]
+
+CENTER = (-117.7195, 34.0967)  # Claremont.
+
+
+"""/**** SYNTHETIC DATA ***/ """
+def make_sheet(file, size, rng, struck=0.03, blank=0.01, na=0.02):
+    """ Writes a tree sheet of 'size' rows (three header rows first, like
+        tree.xls). Returns the sheet row numbers that are struck out. """
+
+    names = list(SPECIES)
+    weights = np.array(list(SPECIES.values()), float)
+    species = np.array(names, dtype=object)[rng.choice(len(names), size, p=weights / weights.sum())]
+    species[rng.random(size) < blank] = ""
+
+    longitude = np.round(CENTER[0] + rng.normal(0, 0.02, size), 7).astype(object)
+    latitude = np.round(CENTER[1] + rng.normal(0, 0.015, size), 7).astype(object)
+    missing = rng.random(size) < na
+    longitude[missing] = "N/A"
+    latitude[missing] = "N/A"
+
+    distance = np.array(DISTANCES, dtype=object)[rng.integers(0, len(DISTANCES), size)]
+    distance[rng.random(size) < na] = "N/A"
+    direction = np.array(DIRECTIONS, dtype=object)[rng.integers(0, len(DIRECTIONS), size)]
+    direction[rng.random(size) < na] = "N/A"
+
+    frame = pd.DataFrame({"Tree #": np.arange(1, size + 1), "Species": species,
+                          "Address": "885 Drake", "City": "Claremont",
+                          "Y  Coordinate": longitude, "X Coordinate": latitude,
+                          "Census Tract": "6037402002", "DAC Status": "DAC", "Date Planted": "43071",
+                          "Stock Size": np.array(STOCK, dtype=object)[rng.integers(0, len(STOCK), size)],
+                          "Grow Space": "24 sq ft", "Tree direction": direction, "Tree distance": distance})
+
+    with open(file, "w", newline="", encoding="utf-8") as fp:
+        fp.write("Synthetic tree sheet (benchmark.py)\nGrant Number:      Grantee Name:    Report Date: \n")
+        frame.to_csv(fp, index=False, header=HEADER)
+
+    return np.flatnonzero(rng.random(size) < struck) + 3  # Sheet rows start after the headers.
+
+
+def make_results(file, size, rng, sample="treeresult.csv"):
+    """ Writes a result csv of 'size' trees in the i-Tree export layout,
+        with rows picked at random from a real export. """
+
+    with open(sample, encoding="utf-8") as fp:
+        lines = fp.read().splitlines()
+    head, rows = lines[:4], [line for line in lines[4:] if line]
+
+    with open(file, "w", encoding="utf-8") as fp:
+        fp.write("\n".join(head) + "\n")
+        picked = np.array(rows, dtype=object)[rng.integers(0, len(rows), size)]
+        fp.write("\n".join(picked) + "\n")
+
+
+def make_contacts(file, size, rng):
+    """ Writes a contact list of 'size' people (header row first). """
+
+    numbers = np.arange(size)
+    preferred = np.array(["E-mail", "Text", ""], dtype=object)[rng.choice(3, size, p=[0.7, 0.25, 0.05])]
+    frame = pd.DataFrame({"Name": ["Contact %d" % i for i in numbers],
+                          "E-mail": ["contact%d@example.org" % i for i in numbers],
+                          "Phone": ["+1909%07d" % i for i in numbers],
+                          "Preferred": preferred,
+                          "Location": "2380633"})
+    frame.to_csv(file, index=False)
+
+
+"""/**** STUB SMTP ***/ """
+class StubServer():
+    """ Accepts every message and only counts them. """
+
+    def __init__(self):
+        self.sent = 0
+
+    def ehlo(self):
+        pass
+
+    def sendmail(self, sender, to, msg):
+        self.sent += 1
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StubPool(mailer.ConnectionPool):
+    """ ConnectionPool whose connections are StubServers. """
+
+    def __init__(self, size=2):
+        mailer.ConnectionPool.__init__(self, "localhost", size=size)
+
+    def _connect(self):
+        self.logins += 1
+        return StubServer()
+
+
+"""/**** STAGES ***/ """
+class Timer():
+    """ Times stages and keeps the best of every repeat. """
+
+    def __init__(self, repeat=1):
+        self._repeat = repeat
+        self.runs = []
+
+    def time(self, size, stage, items, function, *args):
+        """ Runs function(*args) 'repeat' times. Returns its last result. """
+
+        best = None
+        for _ in range(self._repeat):
+            start = time.perf_counter()
+            result = function(*args)
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+
+        count = items(result) if callable(items) else items
+        self.runs.append({"size": size, "stage": stage, "items": int(count), "seconds": round(best, 6),
+                          "per_second": round(count / best, 1) if best > 0 else None})
+        print("%9d  %-10s %10.3f s  %12.0f items/s" % (size, stage, best, count / best if best > 0 else 0))
+        return result
+
+
+def parse(file, struck):
+    trees = inventory.load_sheet(file)
+    marked = np.isin(trees.data["row"], struck)
+    trees.data["flags"] |= np.where(marked, inventory.STRUCK, 0).astype(np.uint8)
+    return trees
+
+
+def normalized(trees, mappings):
+    mask, translated = inventory.submittable(trees, normalize.load(mappings))
+    return inventory.itree_frame(trees, translated, mask)
+
+
+def read_file(file):
+    data = report.csvData(file, 3)
+    data.read_file()
+    return data.totals()
+
+
+def make_report(template, totals):
+    doc = template.new()
+    report.write_report(doc, totals, chart=charts.draw(*report.summary_chart(totals)))
+    doc.save(io.BytesIO())
+
+
+def messages(file, content):
+    return outbox.messages(sheetreader.contacts(file), "[Sustainable Claremont] Weekly Water Trees Reminder",
+                           content)
+
+
+def send_emails(found, image, chunk=1000):
+    """ Builds every e-mail and sends it to the stub server, 'chunk'
+        messages at a time so they are not all in memory at once. """
+
+    pool = StubPool(size=4)
+    dispatcher = mailer.Dispatcher(pool, "benchmark@example.org", workers=4, rate=1e9, retries=0)
+    sent = 0
+    for start in range(0, len(found), chunk):
+        part = [(to, mailer.build_message("benchmark@example.org", to, subject, body, image))
+                for to, name, subject, body in found[start:start + chunk]]
+        sent += mailer.summary(dispatcher.send(part))["sent"]
+    pool.close()
+    return sent
+
+
+def run(size, folder, timer, seed=0):
+    """ Makes the data of one size and times every stage on it. """
+
+    rng = np.random.default_rng([seed, size])  # Same data for a size whatever the other sizes are.
+    sheet = os.path.join(folder, "trees_%d.csv" % size)
+    results = os.path.join(folder, "results_%d.csv" % size)
+    contacts = os.path.join(folder, "contacts_%d.csv" % size)
+    people = max(10, size // 10)  # About one contact for every ten trees.
+
+    start = time.perf_counter()
+    struck = make_sheet(sheet, size, rng)
+    make_results(results, size, rng)
+    make_contacts(contacts, people, rng)
+    print("%9d  made data in %.1f s" % (size, time.perf_counter() - start))
+
+    trees = timer.time(size, "parse", len, parse, sheet, struck)
+    frame = timer.time(size, "normalize", len, normalized, trees, "mappings.csv")
+    table = benefits.load_table("coefficients.csv", "California", "Los Angeles", "Claremont")
+    timer.time(size, "benefits", len, benefits.benefits, frame, table)
+    totals = timer.time(size, "read_file", size, read_file, results)
+    timer.time(size, "report", 1, make_report, report.Template("report_ex.docx"), totals)
+
+    content = "A friendly reminder to water your tree!\n \nFrom your Sustainable Claremont Team."
+    found = timer.time(size, "contacts", people, messages, contacts, content)
+    timer.time(size, "email", lambda sent: sent, send_emails, found["email"],
+               mailer.image_part("contact_img.png"))
+
+
+def environment(seed, repeat):
+    """ Returns what the numbers depend on, saved with the results. """
+
+    return {"date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "machine": platform.machine(), "system": platform.system(), "cpus": os.cpu_count(),
+            "seed": seed, "repeat": repeat}
+
+
+def compare(old, new, tolerance=0.2, min_seconds=MIN_SECONDS):
+    """ Returns (size, stage, old seconds, new seconds) of the stages that
+        got more than 'tolerance' and more than 'min_seconds' slower. """
+
+    before = {(run["size"], run["stage"]): run["seconds"] for run in old["runs"]}
+    slower = []
+    for run in new["runs"]:
+        key = (run["size"], run["stage"])
+        if key not in before:
+            continue
+        if run["seconds"] > before[key] * (1 + tolerance) and run["seconds"] - before[key] > min_seconds:
+            slower.append(key + (before[key], run["seconds"]))
+    return slower
+
+
+def main(argv=None):
+    """ Runs the benchmark and writes the timings as JSON. Returns 1 if
+        --compare found a slower stage, else 0. """
+
+    parser = argparse.ArgumentParser(description="Times every pipeline stage on synthetic inventories.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=None,
+                        help="keeps the best of REPEAT runs of each stage (default 1, %d with --compare)" % MIN_REPEAT)
+    parser.add_argument("--out", default="benchmark.json")
+    parser.add_argument("--keep", metavar="FOLDER", help="keeps the synthetic files in FOLDER")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown that counts as a regression")
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS, help="smallest slowdown that counts")
+    args = parser.parse_args(argv)
+
+    if args.repeat is None:
+        args.repeat = MIN_REPEAT if args.compare else 1
+    if args.compare and args.repeat < MIN_REPEAT:
+        parser.error("--compare needs --repeat %d or more, one run is too noisy" % MIN_REPEAT)
+
+    old = None
+    if args.compare:  # Read first: --out may be the same file.
+        with open(args.compare, encoding="utf-8") as fp:
+            old = json.load(fp)
+
+    timer = Timer(args.repeat)
+    with tempfile.TemporaryDirectory() as temp:
+        folder = args.keep or temp
+        os.makedirs(folder, exist_ok=True)
+        for size in args.sizes:
+            run(size, folder, timer, args.seed)
+
+    results = {"environment": environment(args.seed, args.repeat), "runs": timer.runs}
+    with open(args.out, "w", encoding="utf-8") as fp:
+        json.dump(results, fp, indent=1)
+    print("Wrote %d timings to %s" % (len(timer.runs), args.out))
+
+    if old is None:
+        return 0
+    if old.get("environment", {}).get("repeat", 1) < MIN_REPEAT:
+        print("%s has the best of fewer than %d runs; its timings may be noise." % (args.compare, MIN_REPEAT))
+    slower = compare(old, results, args.tolerance, args.min_seconds)
+    for size, stage, before, after in slower:
+        print("SLOWER: %s at %d trees, %.3f s -> %.3f s" % (stage, size, before, after))
+    if not slower:
+        print("No stage got more than %d%% (and %.2f s) slower." % (args.tolerance * 100, args.min_seconds))
+    return 1 if slower else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+ *****************************************************************************
+   FILE :           benefits.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Computes i-Tree style tree benefits locally for a whole
+                    inventory at once, without going through the website.
+                    Benefits come from a coefficient table (coefficients.csv)
+                    with one row per species/DBH/distance/direction for each
+                    region (state, county, city as on the LOCATIONS page).
+                    The table is built from i-Tree Planting Calculator
+                    exports, so itree.py is only needed to validate the
+                    numbers or to add new species.
+
+   OUTPUT :         CSV in the same layout as the i-Tree export, so it can
+                    be read by report.py (csvData("benefits.csv", 3)).
+
+ *****************************************************************************
+"""
+
+import re  # Parses the tree group characteristics text.
+
+import numpy as np
+
+import normalize
+
+
+# Benefit columns in the same order as the i-Tree export.
+METRICS = ["CO2 Avoided (pounds)", "CO2 Avoided ($)",
+           "CO2 Sequestered (pounds)", "CO2 Sequestered ($)",
+           "Electricity Saved (kWh)", "Electricity Saved ($)",
+           "Fuel Saved (MMBtu)", "Fuel Saved ($)",
+           "Tree Biomass (short ton)", "Rainfall Interception (gallons)",
+           "Stormwater Managed (gallons)", "Stormwater Managed ($)",
+           "O3 Removed (pounds)", "NO2 Avoided (pounds)", "NO2 Removed (pounds)",
+           "SO2 Avoided (pounds)", "SO2 Removed (pounds)", "VOC Avoided (pounds)",
+           "PM2.5 Avoided (pounds)", "PM2.5 Removed (pounds)"]
+
+REGION = ["State", "County", "City"]  # Region columns of the coefficient table.
+KEY = ["Species", "Distance", "Direction"]  # Tree configuration columns.
+
+DEFAULT_DBH = 1.5  # Same DBH that itree.py enters for every tree.
+
+# Matches e.g. "(1) Chitalpa (Chitalpa tashkentensis)  at 1.5 inches DBH.Planted
+# 20-39 feet and east (90°) of buildings ..."
+GROUP_RE = re.compile(r"\(\d+\) (?P<species>.+?) \(.+?\)\s+at (?P<dbh>[\d.]+) inch(?:es)? DBH\."
+                      r"Planted (?P<distance>\d+-\d+) feet and (?P<direction>\w+) \((?P<degree>\d+)°\)")
+
+_tables = {}  # Coefficient tables that were already loaded, by (file, region).
+
+
+def parse_currency(frame, columns):
+    """ Changes "$1,234.5" style text columns into floats, all at once. """
+
+    import pandas as pd
+
+    text = frame[columns].astype(str)
+    text = text.replace(r"[$,]", "", regex=True)  # Drops dollar signs and commas.
+    return text.apply(pd.to_numeric, errors="coerce")
+
+
+class BenefitTable():
+    """ Coefficient table of benefits per tree for a single region. """
+
+    def __init__(self, frame):
+        self._placed = {}  # (species, distance, direction) -> (dbh, values)
+        self._species = {}  # species -> (dbh, values), averaged over placements.
+
+        frame = frame.sort_values("DBH")
+        for key, group in frame.groupby(KEY, sort=False):
+            self._placed[key] = (group["DBH"].to_numpy(float),
+                                 group[METRICS].to_numpy(float))
+
+        for species, group in frame.groupby("Species", sort=False):
+            mean = group.groupby("DBH")[METRICS].mean()
+            self._species[species] = (mean.index.to_numpy(float), mean.to_numpy(float))
+
+    def species(self):
+        """ Returns the species names (i-Tree common names) in the table. """
+
+        return sorted(self._species)
+
+    def lookup(self, species, distance, direction):
+        """ Returns (dbh, values) for a tree configuration. Uses the species
+            average if the exact placement was never run through i-Tree. """
+
+        found = self._placed.get((species, distance, direction))
+        if found is None:
+            found = self._species.get(species)
+        return found
+
+    def compute(self, trees):
+        """ Computes benefits of every tree in the DataFrame 'trees', which
+            needs the Species, Distance and Direction columns in i-Tree format
+            and optionally a DBH column in inches. Returns a float array of
+            shape (trees, metrics). Unknown species are left as NaN. """
+
+        import pandas as pd
+
+        out = np.full((len(trees), len(METRICS)), np.nan)
+        if "DBH" in trees:
+            dbh = pd.to_numeric(trees["DBH"], errors="coerce").fillna(DEFAULT_DBH).to_numpy(float)
+        else:
+            dbh = np.full(len(trees), DEFAULT_DBH)
+
+        # There are only a few hundred configurations even for a whole city,
+        # so the loop is over configurations and the math is over trees.
+        for key, index in trees.groupby(KEY, sort=False).indices.items():
+            found = self.lookup(*key)
+            if found is None:
+                continue
+
+            table_dbh, values = found
+            if len(table_dbh) == 1:  # Only one DBH known: same benefit for every size.
+                out[index] = values[0]
+            else:
+                for j in range(len(METRICS)):  # Linear interpolation along DBH.
+                    out[index, j] = np.interp(dbh[index], table_dbh, values[:, j])
+
+        return out
+
+
+def load_table(file, state, county, city):
+    """ Loads the coefficient table of a region. Each region is read once. """
+
+    import pandas as pd
+
+    region = (file, state, county, city)
+    if region not in _tables:
+        frame = pd.read_csv(file)
+        frame = frame[(frame["State"] == state) & (frame["County"] == county) & (frame["City"] == city)]
+        if frame.empty:
+            raise ValueError("No coefficients for %s, %s, %s in %s" % (city, county, state, file))
+        _tables[region] = BenefitTable(frame)
+
+    return _tables[region]
+
+
+def table_from_export(file, state, county, city, start=3):
+    """ Builds coefficient rows from an i-Tree Planting Calculator export
+        (e.g. treeresult.csv) so that they can be added to coefficients.csv. """
+
+    import pandas as pd
+
+    df = pd.read_csv(file, skiprows=start)
+    df.columns = [" ".join(col.split()) for col in df.columns]  # Fixes the PM2.5 names.
+
+    info = df["Tree Group Characteristics"].str.extract(GROUP_RE)
+    rows = pd.DataFrame({"State": state, "County": county, "City": city,
+                         "Species": info["species"],
+                         "DBH": info["dbh"].astype(float),
+                         "Distance": info["distance"],
+                         "Direction": info["direction"].str.capitalize() + " (" + info["degree"] + "°)"})
+    rows[METRICS] = parse_currency(df, METRICS).to_numpy()
+
+    # Same configuration exported more than once gives the same numbers.
+    return rows.groupby(REGION + ["Species", "DBH", "Distance", "Direction"], as_index=False).mean()
+
+
+def benefits(trees, table):
+    """ Returns a DataFrame with the same columns as an i-Tree export. """
+
+    import pandas as pd
+
+    values = table.compute(trees)
+
+    if "DBH" in trees:
+        dbh = pd.to_numeric(trees["DBH"], errors="coerce").fillna(DEFAULT_DBH).astype(str)
+    else:
+        dbh = str(DEFAULT_DBH)
+
+    result = pd.DataFrame(values, columns=METRICS)
+    result.insert(0, "Group Identifier", np.arange(1, len(trees) + 1))
+    result.insert(1, "Tree Group Characteristics",
+                  ("(1) " + trees["Species"].astype(str) + " at " + dbh + " inches DBH.Planted " +
+                   trees["Distance"].astype(str) + " feet and " +
+                   trees["Direction"].astype(str).str.lower() + " of buildings.").to_numpy())
+    return result
+
+
+def write_csv(result, file, location):
+    """ Writes results with the same three header lines as the i-Tree export. """
+
+    with open(file, "w", newline="", encoding="utf-8") as fp:
+        fp.write("This data was produced from the local benefit engine for %s.\n\n\n" % location)
+        result.to_csv(fp, index=False, float_format="%.3f")
+
+
+def compare(result, export, start=3):
+    """ Compares local totals with an i-Tree export of the same trees.
+        Returns the relative difference of each benefit column. """
+
+    import pandas as pd
+
+    df = pd.read_csv(export, skiprows=start)
+    df.columns = [" ".join(col.split()) for col in df.columns]
+    itree = parse_currency(df, METRICS).sum()
+    local = result[METRICS].sum()
+
+    return (local - itree) / itree.abs().replace(0, np.nan)
+
+
+def main():
+    """ Computes the benefits of tree.xls for Claremont. """
+
+    import inventory  # Imports benefits.py itself.
+
+    # Same rows as ExcelData.trees in itree.py: no blank or struck out rows.
+    trees = inventory.load_sheet("tree.xls")
+    names = normalize.load("mappings.csv")
+    mask, translated = inventory.submittable(trees, names)
+    if names.unmapped():
+        print("Values without an iTree name:", names.unmapped())
+    trees = inventory.itree_frame(trees, translated, mask)  # Sheet values -> iTree values.
+
+    table = load_table("coefficients.csv", "California", "Los Angeles", "Claremont")
+    result = benefits(trees, table)
+    write_csv(result, "benefits.csv", "Claremont, CA")
+    print("Wrote %d trees to benefits.csv" % len(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+ *****************************************************************************
+   FILE :           changes.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Finds which rows of the tree sheet changed since the last
+                    run, so a nightly refresh only redoes those trees. Each
+                    row gets a fingerprint (hash of its species, stock size,
+                    distance, direction, coordinates and strikethrough),
+                    kept in a SQLite file with the row's zone and benefits.
+                    Rows are new, changed, deleted or unchanged. Only new
+                    and changed rows get their benefits computed
+                    (benefits.py), only the zones they were or are in get
+                    new totals, and only those zones get new reports (the
+                    reports of zones left without trees are deleted). Map
+                    tiles (treemap.py) are already cached by their trees.
+
+                    A hash of mappings.csv, coefficients.csv and the region
+                    is kept too: when it changes, every row is redone, e.g.
+                    a species that had no mapping is counted once it has.
+
+   USAGE :          python changes.py --file tree.xls --reports zone_reports
+
+   NOTES :          Rows are read as sheetreader.TreeRecords, not as an
+                    inventory.Inventory: a fingerprint is one hash per row
+                    anyway, and it needs the full coordinates (the inventory
+                    keeps float32, about 1 m), or moving a tree a little
+                    would not count as a change.
+
+ *****************************************************************************
+"""
+
+import argparse
+import hashlib  # Row fingerprints.
+import os
+import sqlite3
+from collections import namedtuple
+
+import numpy as np
+
+import benefits
+import normalize
+import sheetreader
+import zones
+from benefits import METRICS
+
+
+REGION = ("California", "Los Angeles", "Claremont")
+
+# Keys of the rows in each group.
+Changes = namedtuple("Changes", ["new", "changed", "deleted", "unchanged"])
+
+
+def fingerprint(tree):
+    """ Returns the hash of everything in a row that changes its benefits,
+        zone or whether it is counted. Spaces and case don't count. Changes
+        of the mappings and coefficients are found by benefit_inputs. """
+
+    coordinates = ["" if value is None else "%.6f" % value for value in (tree.longitude, tree.latitude)]
+    text = "\x1f".join([normalize.clean(tree.species), normalize.clean(tree.stock),
+                        normalize.clean(tree.distance), normalize.clean(tree.direction)] +
+                       coordinates + [str(bool(tree.struck))])
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def benefit_inputs(mappings="mappings.csv", coefficients="coefficients.csv", region=REGION):
+    """ Returns the hash of the files and region the benefits come from. """
+
+    digest = hashlib.blake2b(("\x1f".join(region)).encode("utf-8"), digest_size=12)
+    for file in (mappings, coefficients):
+        with open(file, "rb") as fp:
+            digest.update(fp.read())
+    return digest.hexdigest()
+
+
+def keyed(trees):
+    """ Returns {key: TreeRecord}. Rows are keyed by their Tree # (so
+        inserting a row doesn't change every row after it), or by their row
+        number if they have none. Blank rows are left out. """
+
+    found = {}
+    for tree in trees:
+        if tree.number is None and tree.species in ('', 'NaN'):
+            continue
+        key = "tree:%g" % tree.number if tree.number is not None else "row:%d" % tree.row
+        while key in found:  # Same Tree # twice.
+            key += "+"
+        found[key] = tree
+    return found
+
+
+class RowIndex():
+    """ Fingerprint, zone and benefits of every row, and benefit totals of
+        every zone, from the last run. """
+
+    def __init__(self, file="rows.sqlite", grid="hex", size=500, inputs=None):
+        self._db = sqlite3.connect(file)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, hash TEXT, "
+                         "zone TEXT, benefits BLOB)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS rows_zone ON rows (zone)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS zones (zone TEXT PRIMARY KEY, trees INTEGER, "
+                         "totals BLOB)")
+
+        # Zones of another grid can't be updated: everything is new again.
+        settings = "%s|%g" % (grid, size)
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        if meta.get("grid") != settings:
+            self._db.execute("DELETE FROM rows")
+            self._db.execute("DELETE FROM zones")
+            self._db.execute("DELETE FROM meta")
+            self._db.execute("INSERT INTO meta VALUES ('grid', ?)", (settings,))
+            meta = {}
+
+        # Other mappings or coefficients: every row is changed (see benefit_inputs).
+        if inputs is not None and meta.get("inputs") != inputs:
+            self._db.execute("UPDATE rows SET hash = ''")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('inputs', ?)", (inputs,))
+        self._db.commit()
+
+        self._grid = grid
+        self._size = size
+        self._middle = float(meta["middle"]) if "middle" in meta else None  # Keeps the same cells.
+
+    def diff(self, trees):
+        """ Compares {key: TreeRecord} with the last run. Returns Changes. """
+
+        old = dict(self._db.execute("SELECT key, hash FROM rows"))
+        new, changed, unchanged = [], [], []
+        for key, tree in trees.items():
+            if key not in old:
+                new.append(key)
+            elif old[key] != fingerprint(tree):
+                changed.append(key)
+            else:
+                unchanged.append(key)
+        deleted = [key for key in old if key not in trees]
+        return Changes(new, changed, deleted, unchanged)
+
+    def zone_of(self, trees):
+        """ Returns the grid cell of each TreeRecord. The first run fixes the
+            latitude of the grid, so cells stay the same between runs. """
+
+        longitude = np.array([np.nan if tree.longitude is None else tree.longitude for tree in trees])
+        latitude = np.array([np.nan if tree.latitude is None else tree.latitude for tree in trees])
+        if self._middle is None and np.isfinite(latitude).any():
+            self._middle = zones.middle_latitude(latitude)
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('middle', ?)", (repr(self._middle),))
+
+        grid = zones.square_grid if self._grid == "square" else zones.hex_grid
+        return grid(longitude, latitude, self._size, self._middle)
+
+    def apply(self, changes, trees, compute):
+        """ Saves new and changed rows and removes deleted ones. compute(records)
+            returns the benefits of TreeRecords, shape (rows, metrics), with
+            NaN rows for trees that are not counted. Returns the zones whose
+            totals changed. """
+
+        keys = changes.new + changes.changed
+        records = [trees[key] for key in keys]
+        affected = set()
+
+        # Zones the changed and deleted rows were in before.
+        old = changes.changed + changes.deleted
+        for start in range(0, len(old), 500):
+            part = old[start:start + 500]
+            affected.update(zone for (zone,) in self._db.execute(
+                "SELECT zone FROM rows WHERE key IN (%s)" % ",".join("?" * len(part)), part))
+
+        values = compute(records) if records else np.empty((0, len(METRICS)))
+        cells = self.zone_of(records) if records else []
+        rows = []
+        for key, tree, zone, row in zip(keys, records, cells, values):
+            counted = not tree.struck and not np.isnan(row).all()
+            rows.append((key, fingerprint(tree), zone,
+                         np.nan_to_num(row).astype(np.float64).tobytes() if counted else None))
+            affected.add(zone)
+
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?)", rows)
+            self._db.executemany("DELETE FROM rows WHERE key = ?", [(key,) for key in changes.deleted])
+
+            # New totals of the affected zones, from their rows.
+            for zone in affected:
+                found = [np.frombuffer(blob, np.float64) for (blob,) in self._db.execute(
+                    "SELECT benefits FROM rows WHERE zone = ? AND benefits IS NOT NULL", (zone,))]
+                if found:
+                    totals = np.sum(found, axis=0)
+                    self._db.execute("INSERT OR REPLACE INTO zones VALUES (?, ?, ?)",
+                                     (zone, len(found), totals.tobytes()))
+                else:
+                    self._db.execute("DELETE FROM zones WHERE zone = ?", (zone,))
+
+        return affected
+
+    def zones(self):
+        """ Returns the set of zones that have counted trees. """
+
+        return {zone for (zone,) in self._db.execute("SELECT zone FROM zones")}
+
+    def zone_table(self, only=None):
+        """ Returns the zone totals (Trees and benefit columns per zone) like
+            zones.zone_totals, for every zone or the zones in 'only'. """
+
+        import pandas as pd
+
+        rows = [(zone, trees, np.frombuffer(blob, np.float64))
+                for zone, trees, blob in self._db.execute("SELECT zone, trees, totals FROM zones ORDER BY zone")
+                if only is None or zone in only]
+        table = pd.DataFrame([values for zone, trees, values in rows], columns=METRICS,
+                             index=pd.Index([zone for zone, trees, values in rows], name="Zone"))
+        table.insert(0, "Trees", [trees for zone, trees, values in rows])
+        return table
+
+    def close(self):
+        self._db.close()
+
+
+def local_benefits(mappings="mappings.csv", coefficients="coefficients.csv", region=REGION):
+    """ Returns a compute(records) function for RowIndex.apply that uses the
+        local benefit engine (benefits.py). """
+
+    names = normalize.load(mappings)
+    table = benefits.load_table(coefficients, *region)
+
+    def compute(records):
+        import pandas as pd
+
+        trees = pd.DataFrame({"Species": [tree.species for tree in records],
+                              "DBH": benefits.DEFAULT_DBH,
+                              "Distance": [tree.distance for tree in records],
+                              "Direction": [tree.direction for tree in records]})
+        return table.compute(names.frame(trees))
+
+    return compute
+
+
+def remove_reports(folder, names):
+    """ Deletes the reports of zones (made by report.batch) that are in
+        'names'. Returns the files that were deleted. """
+
+    from report import safe_name
+
+    removed = []
+    for name in names:
+        file = os.path.join(folder, safe_name(name) + ".docx")
+        if os.path.exists(file):
+            os.remove(file)
+            removed.append(file)
+    return removed
+
+
+def main(argv=None):
+    """ Updates the zone totals of tree.xls, redoing only the changed rows. """
+
+    parser = argparse.ArgumentParser(description="Redoes only the tree rows that changed.")
+    parser.add_argument("--file", default="tree.xls")
+    parser.add_argument("--db", default="rows.sqlite")
+    parser.add_argument("--grid", choices=["square", "hex"], default="hex")
+    parser.add_argument("--size", type=float, default=500, help="grid cell size in meters")
+    parser.add_argument("--reports", metavar="FOLDER", help="makes reports of the changed zones")
+    args = parser.parse_args(argv)
+
+    trees = keyed(sheetreader.trees(args.file))
+    index = RowIndex(args.db, args.grid, args.size, benefit_inputs())
+    try:
+        changes = index.diff(trees)
+        print("new %d, changed %d, deleted %d, unchanged %d"
+              % tuple(len(group) for group in changes))
+
+        affected = index.apply(changes, trees, local_benefits())
+        print("Zones with new totals:", sorted(affected))
+
+        if args.reports and affected:
+            import report
+            current = affected & index.zones()
+            if current:
+                times = report.batch(index.zone_table(current).drop(columns="Trees"), args.reports)
+                print("Made %d reports" % len(times))
+            removed = remove_reports(args.reports, affected - current)  # Zones without trees now.
+            if removed:
+                print("Deleted %d reports of empty zones" % len(removed))
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+ *****************************************************************************
+   FILE :           charts.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Draws charts for the reports (pie, bar, line and band) into
+                    PNG bytes in memory, which python-docx can insert with
+                    add_picture, so no pie.jpg file is written. Charts are
+                    drawn with matplotlib's Agg backend without pyplot, in
+                    a pool of worker processes, and are cached by the hash
+                    of what they show, so the same chart is never drawn
+                    twice.
+
+ *****************************************************************************
+"""
+
+import hashlib  # Hash of the chart contents for the cache.
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+COLORS = ['r', 'y', 'g', 'c', 'b', 'm', 'orange', 'purple']  # Same first four as make_pp.
+
+
+def chart_key(kind, values, labels, title, size):
+    """ Returns the hash of everything that changes how a chart looks. """
+
+    text = json.dumps([kind, [round(float(value), 6) for value in values],
+                       [str(label) for label in labels], title, list(size)])
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def draw(kind, values, labels, title="", size=(6, 6)):
+    """ Draws one chart and returns it as PNG bytes.
+        kind is "pie", "bar", "line" (values over labels, e.g. years) or
+        "band" (values are the low, middle and high lines one after the
+        other, each as long as labels). """
+
+    # Figure + Agg canvas instead of pyplot: no global state, so charts can be
+    # drawn in several processes (or threads) at the same time.
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=size)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+
+    if kind == "pie":
+        ax.pie(values, labels=labels, colors=COLORS[:len(values)],
+               autopct="$%.2f",  # Adds values to 2 decimal points.
+               textprops={"fontsize": 15})
+        ax.set_aspect("equal")
+    elif kind == "bar":
+        ax.bar(range(len(values)), values, color=COLORS[:len(values)], tick_label=labels)
+        ax.axhline(0, color="black", linewidth=0.8)  # Shows negative benefits.
+    elif kind == "line":
+        ax.plot(labels, values, marker="o", color="g")
+        ax.grid(True, alpha=0.3)
+    elif kind == "band":
+        n = len(labels)
+        low, middle, high = values[:n], values[n:2 * n], values[2 * n:3 * n]
+        ax.fill_between(labels, low, high, color="g", alpha=0.25)
+        ax.plot(labels, middle, marker="o", color="g")
+        ax.grid(True, alpha=0.3)
+    else:
+        raise ValueError("Unknown chart type: %s" % kind)
+
+    ax.set_title(title)
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=100)
+    return buffer.getvalue()
+
+
+class ChartService():
+    """ Draws charts in worker processes. Charts are cached in memory (and on
+        disk if 'folder' is given) by the hash of their contents. """
+
+    def __init__(self, processes=2, folder=None, cache_size=256):
+        self._executor = ProcessPoolExecutor(max_workers=processes)
+        self._folder = folder
+        self._cache = OrderedDict()  # key -> PNG bytes, least recently used first.
+        self._cache_size = cache_size
+        self._pending = {}  # key -> Future of a chart that is being drawn.
+        self._lock = threading.Lock()
+        self.drawn = 0  # Number of charts that were actually drawn.
+
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def _store(self, key, data):
+        """ Keeps a chart in the memory cache. Call with the lock held. """
+
+        self._cache[key] = data
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _done(self, key, future):
+        """ Stores a chart once its worker is done. """
+
+        if future.exception() is None:
+            data = future.result()
+            if self._folder:
+                with open(os.path.join(self._folder, key + ".png"), "wb") as fp:
+                    fp.write(data)
+
+        with self._lock:
+            if future.exception() is None:
+                self._store(key, future.result())
+            self._pending.pop(key, None)
+
+    def submit(self, kind, values, labels, title="", size=(6, 6)):
+        """ Returns a Future of the PNG bytes of a chart. """
+
+        key = chart_key(kind, values, labels, title, size)
+        file = os.path.join(self._folder, key + ".png") if self._folder else None
+
+        with self._lock:
+            if key in self._pending:  # Being drawn right now.
+                return self._pending[key]
+
+            if key not in self._cache and file and os.path.exists(file):  # Drawn in an earlier run.
+                with open(file, "rb") as fp:
+                    self._store(key, fp.read())
+
+            if key in self._cache:  # Already drawn.
+                self._cache.move_to_end(key)
+                future = Future()
+                future.set_result(self._cache[key])
+                return future
+
+            future = self._executor.submit(draw, kind, list(values), list(labels), title, size)
+            self._pending[key] = future
+            self.drawn += 1
+
+        future.add_done_callback(lambda done: self._done(key, done))
+        return future
+
+    def render(self, kind, values, labels, title="", size=(6, 6)):
+        """ Returns the PNG bytes of a chart, waiting until it is drawn. """
+
+        return self.submit(kind, values, labels, title, size).result()
+
+    def close(self):
+        """ Stops the worker processes. """
+
+        self._executor.shutdown()
+
+
+def buffer(data):
+    """ Returns PNG bytes as a file-like object for docx add_picture. """
+
+    return io.BytesIO(data)
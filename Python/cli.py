@@ -0,0 +1,133 @@
+"""
+ *****************************************************************************
+   FILE :           cli.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    One command for everything, e.g. for cron jobs:
+
+                    species     species of a tree sheet   (treespecies.py)
+                    validate    rows that can't be used    (validate.py)
+                    submit      trees to iTree             (itreepool.py)
+                    report      report.docx or --batch     (report.py)
+                    notify      weekly reminders           (outbox.py)
+                    water       watering scores per tree   (watering.py)
+                    map         map of the trees           (treemap.py)
+                    survey      species of many sheets     (speciesstats.py)
+                    refresh     only the changed rows      (changes.py)
+                    serve       benefit answers over HTTP  (service.py)
+                    archive     history of the results     (archive.py)
+
+                    Options after the command go to that script, so
+                    "python cli.py map --out trees.png" is the same as
+                    "python treemap.py --out trees.png". Only the script of
+                    the command is imported, so e.g. notify never loads
+                    selenium, and the scripts import pandas and python-docx
+                    inside the functions that use them, so every command
+                    imports within BUDGET (check with --imports).
+
+                    --trace FILE writes the stages of the run (tracing.py)
+                    as JSON lines, --memory adds memory high-water marks,
+                    --metrics-port serves them for Prometheus while the
+                    command runs and --profile FILE saves a cProfile.
+
+   USAGE :          python cli.py notify --run weekly-2026-10-18
+                    python cli.py --timing species --file tree.xls
+                    python cli.py --trace run.jsonl --memory report --batch reports
+                    python cli.py --imports   (import time of every command)
+
+ *****************************************************************************
+"""
+
+import argparse
+import importlib  # Imports the script of a command only when it runs.
+import subprocess
+import sys
+import time
+
+import tracing  # Stage timings and counters of every script.
+
+
+# Command -> (script, help).
+COMMANDS = {"species": ("treespecies", "lists the species of a tree sheet"),
+            "validate": ("validate", "checks a tree sheet and reports the rows that can't be used"),
+            "submit": ("itreepool", "submits a tree sheet to iTree (only new configurations)"),
+            "report": ("report", "makes report.docx, or one report per group with --batch"),
+            "notify": ("outbox", "sends the weekly reminders (resumable)"),
+            "water": ("watering", "scores how much each tree needs water"),
+            "map": ("treemap", "draws a map of the trees"),
+            "survey": ("speciesstats", "species counts and diversity of many tree sheets"),
+            "refresh": ("changes", "redoes only the tree rows that changed"),
+            "serve": ("service", "answers benefit questions over HTTP"),
+            "archive": ("archive", "keeps every run's results and answers questions over the years")}
+
+BUDGET = 0.5  # Seconds a command may spend importing before it starts.
+
+
+def import_time(module, python=sys.executable):
+    """ Returns the seconds it takes to import a script in a new Python
+        process (nothing already imported, like a cron job). """
+
+    code = "import time; start = time.perf_counter(); import %s; print(time.perf_counter() - start)" % module
+    output = subprocess.run([python, "-c", code], capture_output=True, text=True, check=True)
+    return float(output.stdout.split()[-1])
+
+
+def run(command, argv, timing=False, profile=None):
+    """ Imports the script of a command and runs its main with argv. """
+
+    start = time.perf_counter()
+    module = importlib.import_module(COMMANDS[command][0])
+    imported = time.perf_counter() - start
+
+    if profile:
+        with tracing.profile(profile):
+            module.main(argv)
+    else:
+        module.main(argv)
+
+    if timing:
+        print("%s: imports %.3f s, run %.3f s" % (command, imported, time.perf_counter() - start - imported),
+              file=sys.stderr)
+        if imported > BUDGET:
+            print("%s: imports took more than %.1f s" % (command, BUDGET), file=sys.stderr)
+
+
+def main(argv=None):
+    """ Runs one command. """
+
+    parser = argparse.ArgumentParser(prog="cli.py", description="Urban tree canopy tools.")
+    parser.add_argument("--timing", action="store_true", help="prints import and run time to stderr")
+    parser.add_argument("--imports", action="store_true", help="measures the import time of every command")
+    parser.add_argument("--trace", metavar="FILE", help="writes every stage of the run to FILE (JSON lines)")
+    parser.add_argument("--memory", action="store_true", help="adds memory high-water marks (tracemalloc)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT", help="serves /metrics for Prometheus")
+    parser.add_argument("--profile", metavar="FILE", help="saves a cProfile of the command to FILE")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    for name, (module, text) in COMMANDS.items():
+        commands.add_parser(name, help=text, add_help=False)  # -h goes to the script.
+    args, rest = parser.parse_known_args(argv)
+
+    if args.imports:
+        for name, (module, text) in COMMANDS.items():
+            seconds = import_time(module)
+            print("%-8s %-12s %.3f s%s" % (name, module, seconds, "  (over budget)" if seconds > BUDGET else ""))
+        return
+    if args.command is None:
+        parser.print_help()
+        return
+
+    traced = args.trace or args.memory or args.metrics_port is not None
+    tracer = tracing.configure(args.trace, args.memory, args.metrics_port) if traced else None
+    try:
+        run(args.command, rest, args.timing, args.profile)
+    finally:
+        if tracer is not None:
+            print(tracer.report(), file=sys.stderr)
+            tracer.close()
+
+
+if __name__ == '__main__':
+    main()
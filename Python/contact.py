@@ -14,115 +14,74 @@
    (1) Style
    (2) Email class & main function
    (3) Able to send e-mails to multiple ppl.
+   (4) One message per recipient over a pool of reused connections (mailer.py).
+   (5) Cached weather, looked up once per location (weatherinfo.py).
+   (6) Timed stages and sent/failed counters (tracing.py).
+   (7) Email and ExcelData classes removed (replaced by mailer.py and
+       sheetreader.contacts).
 
  *****************************************************************************
 """
 
-import smtplib  # Library for email transmission
-import xlrd  # Reads Exel
-from weather import Weather, Unit  # Yahoo Weather info
-from email.mime.image import MIMEImage
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import sheetreader  # Reads Excel or csv one row at a time.
+import mailer  # Pooled SMTP connections.
+import weatherinfo  # Cached weather lookups.
+import tracing  # Stage timings and counters.
 
 
-class Email():
-    """ Configures SMTP e-mail settings. """
-
-    def __init__(self, account, domain, pw, to, msg):
-
-        self._account = account
-        self._server = smtplib.SMTP_SSL(domain, 465)  # Standard port
-        self._server.ehlo()  # Optional, called by login()
-        self._pw = pw
-        self._to = to
-        self._msg = msg
-
-    def sendEmail(self):
-        """ Sends e-mail or prints error message. """
-
-        try:
-            # Logs in and sends message.
-            self._server.login(self._account, self._pw)
-            self._server.sendmail(self._account, self._to, self._msg)
-            self._server.close()
-            print('successfully sent the mail')
-
-        except:
-            print("Something went wrong...")
-
-
-class ExcelData():
-    """ Reads in Excel data. """
-
-    def __init__(self, sheet):
-
-        self._sheet = sheet
-
-    def readSheet(self, column, firstRow, lastRow):
-        """ Reads Excel and returns the email address in the row. """
-        
-        emailList = []
-
-        # Adjusts row start/end values to match the excel sheet's labels.
-        start = firstRow -1
-        end = lastRow
-
-        for rowID in range(start, end):
-            row = self._sheet.row(rowID)
-            emailList.append(row[column-1].value)
-        
-        print("Distribution list: ", emailList)
-        return emailList
+POOL_SIZE = 2  # Number of SMTP connections (and sending threads).
+RATE = 5.0  # Max e-mails per second.
 
 
 def main():
     """ Loads data and sends e-mail. """
 
-    # Reads in contact list sheet.
-    workbook = xlrd.open_workbook('contact_list.xlsx')
-    sheet = ExcelData(workbook.sheet_by_index(0))
-    to = sheet.readSheet(2, 2, 3)  # Col, startRow, endRow
-    name = sheet.readSheet(1, 2, 3)
-    # print(to)  # Debugging purposes.
-    # print(name)
+    # Reads in contact list sheet. Contacts without a Location column
+    # (WOEID) get the weather of Claremont.
+    contacts = list(sheetreader.contacts('contact_list.xlsx'))
+    print("Distribution list: ", [contact.email for contact in contacts])
 
     # Set up sender email. Change.
     account = 'senderemail'
     domain = "smtp.gmail.com"
     pw = 'senderpw'
 
-    # Loads weather data in Fahrenheit.
-    weather = Weather(unit=Unit.FAHRENHEIT)
-
-    # Looks up weather for the location (Claremont) using WOEID.
-    loc = weather.lookup(2380633)
-    cur_temp = loc.condition.temp
-
-    # Set up message.
-    msg = MIMEMultipart()
-    msg['From'] = account
-    msg['To'] = "UTC Distribution List"
-    msg['Subject'] = "Remember to Water Your Tree!"
-    msg.preamble = 'Sustainable Claremont'
-
-    # Attach test image.
-    fp = open('contact_img.png', 'rb')
-    img = MIMEImage(fp.read())
-    fp.close()
-    msg.attach(img)
-
-    # Sends e-mail to every recipient on the list.
-    for i in range(len(to)):
-        body = ("Hello %s! \n\n" % (name[i]) + 
-                "The weather today is %s degrees. " % (cur_temp) +
-                "This can put your tree at risk for deydration! " +
-                "Go out and water yours today.\n\n" +
-                "Thank you from your friends at Sustainable Claremont\n")
-        msg.attach(MIMEText(body, 'plain'))
-
-        email = Email(account, domain, pw, to, msg.as_string())
-        email.sendEmail()
+    # Looks up the weather once per distinct location (cached for a few
+    # hours). Uses weather_fixture.json if Yahoo Weather doesn't answer.
+    service = weatherinfo.WeatherService(weatherinfo.YahooProvider(),
+                                         fallback=weatherinfo.FixtureProvider())
+    weather = service.lookup_many(contact.location or weatherinfo.CLAREMONT for contact in contacts)
+
+    # Shared image part, read and encoded once for every message.
+    img = mailer.image_part('contact_img.png')
+
+    # Builds one message per recipient, addressed only to that recipient.
+    messages = []
+    with tracing.span("notify.build", len(contacts)):
+        for contact in contacts:
+            address = contact.email
+            cur_temp = weather[contact.location or weatherinfo.CLAREMONT]["temp"]
+            body = ("Hello %s! \n\n" % (contact.name) + 
+                    "The weather today is %s degrees. " % (cur_temp) +
+                    "This can put your tree at risk for deydration! " +
+                    "Go out and water yours today.\n\n" +
+                    "Thank you from your friends at Sustainable Claremont\n")
+            messages.append((address, mailer.build_message(account, address,
+                                                           "Remember to Water Your Tree!", body,
+                                                           img, 'Sustainable Claremont')))
+
+    # Sends them over a few reused connections.
+    pool = mailer.ConnectionPool(domain, 465, account, pw, size=POOL_SIZE)
+    dispatcher = mailer.Dispatcher(pool, account, workers=POOL_SIZE, rate=RATE)
+    try:
+        statuses = dispatcher.send(messages)
+    finally:
+        pool.close()
+
+    for status in statuses:
+        if status.status != "sent":
+            print("Could not send to %s (%s)" % (status.to, status.error))
+    print("Sent: %(sent)d, failed: %(failed)d, retried: %(retried)d" % mailer.summary(statuses))
 
 if __name__ == '__main__':
   main()
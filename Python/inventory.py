@@ -0,0 +1,356 @@
+"""
+ *****************************************************************************
+   FILE :           inventory.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    One compact table of trees shared by the scripts, instead
+                    of sheet rows with column numbers (row[1], row[11], ...).
+                    Trees are kept in a NumPy structured array, 37 bytes per
+                    tree (about 37 MB for a million trees):
+
+                    row, number          sheet row and Tree #   (int32)
+                    species, distance,   codes into the lists of distinct
+                    direction, stock     sheet values           (uint16)
+                    dbh, longitude,      numbers                (float32)
+                    latitude
+                    planted, watered     Date Planted and Last Watered as
+                                         Excel day numbers      (float32)
+                    flags                STRUCK, BLANK, NO_LOCATION bits
+
+                    Scripts use whole columns (masks, codes) instead of one
+                    Python object per tree. frame() gives a pandas view with
+                    categorical columns.
+
+   NOTES :          float32 coordinates are precise to about a meter.
+                    A categorical column can have at most MAX_CATEGORIES
+                    distinct values (uint16 codes); a sheet with more is
+                    refused with a ValueError instead of wrapping around.
+                    Last Watered is not in the tree.xls template; it is
+                    found by its header if a sheet has it.
+
+ *****************************************************************************
+"""
+
+import datetime
+import json
+import os
+from array import array  # Compact columns while reading a sheet.
+
+import numpy as np
+
+import sheetreader
+import tracing  # Stage timings.
+from benefits import DEFAULT_DBH
+
+
+STRUCK, BLANK, NO_LOCATION = 1, 2, 4  # Bits of the flags field.
+CATEGORIES = ["species", "distance", "direction", "stock"]
+MAX_CATEGORIES = 1 << 16  # Distinct values of a categorical column (uint16 codes).
+
+DTYPE = np.dtype([("row", "<i4"), ("number", "<i4"),  # -1 if there is no Tree #.
+                  ("species", "<u2"), ("distance", "<u2"), ("direction", "<u2"), ("stock", "<u2"),
+                  ("dbh", "<f4"), ("longitude", "<f4"), ("latitude", "<f4"),
+                  ("planted", "<f4"), ("watered", "<f4"),  # Excel day numbers, NaN if blank.
+                  ("flags", "u1")])  # Packed: no padding between fields.
+
+# Columns of the tree sheet (see tree.xls and sheetreader.trees).
+COLUMNS = {"number": 0, "species": 1, "longitude": 4, "latitude": 5, "planted": 8, "stock": 9,
+           "direction": 11, "distance": 12}
+HEADERS = {"watered": "Last Watered"}  # Optional columns, found by their header.
+
+EPOCH = datetime.date(1899, 12, 30)  # Day 0 of Excel dates.
+
+
+def _check_categories(kind, count):
+    """ Raises a ValueError if a column has too many values for its codes. """
+
+    if count > MAX_CATEGORIES:
+        raise ValueError("More than %d distinct %s values; the codes are uint16." % (MAX_CATEGORIES, kind))
+
+
+class Inventory():
+    """ Trees in a structured array, with the distinct sheet values of each
+        categorical column. """
+
+    def __init__(self, data, categories):
+        self.data = data  # Structured array of DTYPE.
+        self._categories = {kind: list(values) for kind, values in categories.items()}
+
+    def __len__(self):
+        return len(self.data)
+
+    def nbytes(self):
+        """ Returns the memory used by the trees. """
+
+        return self.data.nbytes
+
+    def categories(self, kind):
+        """ Returns the distinct sheet values of a categorical column. """
+
+        return self._categories[kind]
+
+    def values(self, kind):
+        """ Returns the sheet values of a categorical column (one per tree). """
+
+        return np.array(self._categories[kind], dtype=object)[self.data[kind]]
+
+    def struck(self):
+        return (self.data["flags"] & STRUCK) != 0
+
+    def blank(self):
+        return (self.data["flags"] & BLANK) != 0
+
+    def located(self):
+        return (self.data["flags"] & NO_LOCATION) == 0
+
+    def counts(self, kind, mask=None):
+        """ Returns the number of trees (in 'mask') with each category. """
+
+        codes = self.data[kind] if mask is None else self.data[kind][mask]
+        return np.bincount(codes, minlength=len(self._categories[kind]))
+
+    def translate(self, kind, names, mask=None):
+        """ Translates a categorical column into iTree values with a
+            normalize.Normalizer, one lookup per category. Returns (codes of
+            each tree into the iTree values, -1 if not matched; iTree values).
+            Only trees in 'mask' are counted as unmatched. """
+
+        mapped = names.categories(kind, self._categories[kind], self.counts(kind, mask))
+        lookup = {}  # iTree value -> code, in order of first use.
+        itree = np.array([-1 if value is None else lookup.setdefault(value, len(lookup)) for value in mapped],
+                         dtype=np.int64)
+        return itree[self.data[kind]], list(lookup)
+
+    def select(self, mask):
+        """ Returns the trees in 'mask' (same categories). """
+
+        return Inventory(self.data[mask], self._categories)
+
+    def frame(self, columns=None):
+        """ Returns a DataFrame of the trees. Categorical columns share the
+            codes; number columns are views of the array where pandas allows. """
+
+        import pandas as pd
+
+        columns = columns or list(DTYPE.names)
+        frame = {}
+        for name in columns:
+            if name in CATEGORIES:
+                frame[name] = pd.Categorical.from_codes(self.data[name].astype(np.int32),
+                                                        categories=pd.Index(self._categories[name], dtype=object))
+            else:
+                frame[name] = self.data[name]
+        return pd.DataFrame(frame, copy=False)
+
+    def save(self, file):
+        """ Saves the trees and categories in one .npz file. """
+
+        np.savez(file, data=self.data, categories=json.dumps(self._categories))
+
+    @classmethod
+    def load(cls, file):
+        with np.load(file) as saved:
+            return cls(saved["data"], json.loads(str(saved["categories"])))
+
+
+def to_day_number(date):
+    """ Returns the Excel day number of a date. """
+
+    return float((date - EPOCH).days)
+
+
+def day_number(value):
+    """ Returns a date cell as an Excel day number (xls numbers, xlsx dates,
+        or "2026-10-18" / "10/18/2026" text), or NaN. """
+
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    if isinstance(value, datetime.date):
+        return to_day_number(value)
+    found = sheetreader.number(value)
+    if found is not None:
+        return found
+    for form in ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y"):
+        try:
+            return to_day_number(datetime.datetime.strptime(str(value).strip(), form).date())
+        except ValueError:
+            pass
+    return np.nan
+
+
+def find_headers(values):
+    """ Returns {field: column} of the optional columns in a header row. """
+
+    header = [sheetreader.text(value).strip() for value in values]
+    return {field: header.index(name) for field, name in HEADERS.items() if name in header}
+
+
+class _Builder():
+    """ Fills the columns of an Inventory while reading a sheet. 'columns'
+        has the optional columns (see find_headers). """
+
+    def __init__(self, columns=None):
+        self._optional = dict(columns or {})
+        self._columns = {name: array("i") for name in ("row", "number")}
+        self._columns.update({name: array("H") for name in CATEGORIES})
+        self._columns.update({name: array("f") for name in ("longitude", "latitude", "planted", "watered")})
+        self._columns["flags"] = array("B")
+        self._codes = {kind: {} for kind in CATEGORIES}
+
+    def add(self, row, values, struck):
+        """ Adds one sheet row (list of cell values). Blank rows are skipped. """
+
+        values = values + [""] * (13 - len(values))  # Short csv rows.
+        number = sheetreader.number(values[COLUMNS["number"]])
+        species = sheetreader.text(values[COLUMNS["species"]])
+        if number is None and species == "":
+            return
+
+        longitude = sheetreader.number(values[COLUMNS["longitude"]])
+        latitude = sheetreader.number(values[COLUMNS["latitude"]])
+        flags = (STRUCK if struck else 0) | (BLANK if species in ('', 'NaN') else 0)
+        if longitude is None or latitude is None:
+            flags |= NO_LOCATION
+
+        self._columns["row"].append(row)
+        self._columns["number"].append(-1 if number is None else int(number))
+        for kind in CATEGORIES:
+            text = species if kind == "species" else sheetreader.text(values[COLUMNS[kind]])
+            codes = self._codes[kind]
+            if text not in codes:
+                _check_categories(kind, len(codes) + 1)
+                codes[text] = len(codes)
+            self._columns[kind].append(codes[text])
+        self._columns["longitude"].append(np.nan if longitude is None else longitude)
+        self._columns["latitude"].append(np.nan if latitude is None else latitude)
+        self._columns["planted"].append(day_number(values[COLUMNS["planted"]]))
+        watered = self._optional.get("watered")
+        self._columns["watered"].append(day_number(values[watered]) if watered is not None and
+                                        watered < len(values) else np.nan)
+        self._columns["flags"].append(flags)
+
+    def build(self):
+        data = np.zeros(len(self._columns["row"]), dtype=DTYPE)
+        for name, column in self._columns.items():
+            data[name] = np.frombuffer(column, dtype=column.typecode) if len(column) else []
+        data["dbh"] = DEFAULT_DBH  # The sheet has stock sizes, not DBH.
+        return Inventory(data, {kind: list(codes) for kind, codes in self._codes.items()})
+
+
+def load_sheet(file, start=3, sheet=0):
+    """ Reads the trees of a tree sheet (.xls, .xlsx or .csv) into an
+        Inventory. Skips the three header rows by default. """
+
+    with tracing.span("ingest.load_sheet", file=os.path.basename(file)) as span:
+        if os.path.splitext(file)[1].lower() == ".csv":
+            trees = _load_csv(file, start)
+        else:
+            trees = _load_rows(file, start, sheet)
+        span.add(len(trees))
+    return trees
+
+
+def _load_rows(file, start, sheet):
+    """ Reads an Excel tree sheet one row at a time (sheetreader.py). """
+
+    builder = None
+    for row, values, struck in sheetreader.rows(file, max(0, start - 1), sheet):
+        if builder is None:  # Header row (the row before 'start').
+            builder = _Builder(find_headers(values) if start > 0 else {})
+            if start > 0:
+                continue
+        builder.add(row, values, struck)
+    return (builder or _Builder()).build()
+
+
+def _load_csv(file, start):
+    """ Reads a csv tree sheet with pandas, a whole column at a time. """
+
+    import pandas as pd
+
+    df = pd.read_csv(file, header=None, skiprows=max(0, start - 1), dtype=str, keep_default_na=False,
+                     encoding="utf-8-sig")
+    optional = {}
+    if start > 0 and len(df):  # Header row.
+        optional = find_headers(df.iloc[0])
+        df = df.iloc[1:].reset_index(drop=True)
+    watered = df[optional["watered"]] if "watered" in optional else pd.Series("", index=df.index)
+    df = df.reindex(columns=range(13), fill_value="")
+    number = pd.to_numeric(df[COLUMNS["number"]], errors="coerce")
+    species = df[COLUMNS["species"]]
+    keep = (number.notna() | (species != "")).to_numpy()
+    df, number, species, watered = df[keep], number[keep], species[keep], watered[keep]
+
+    data = np.zeros(len(df), dtype=DTYPE)
+    data["row"] = np.flatnonzero(keep) + start
+    data["number"] = number.fillna(-1).to_numpy()
+    categories = {}
+    for kind in CATEGORIES:
+        codes, uniques = pd.factorize(df[COLUMNS[kind]])
+        _check_categories(kind, len(uniques))
+        data[kind] = codes
+        categories[kind] = list(uniques)
+
+    longitude = pd.to_numeric(df[COLUMNS["longitude"]], errors="coerce").to_numpy()
+    latitude = pd.to_numeric(df[COLUMNS["latitude"]], errors="coerce").to_numpy()
+    data["longitude"], data["latitude"] = longitude, latitude
+    data["planted"] = _day_numbers(df[COLUMNS["planted"]])
+    data["watered"] = _day_numbers(watered)
+    data["dbh"] = DEFAULT_DBH
+    data["flags"] = (np.where(species.isin(["", "NaN"]).to_numpy(), BLANK, 0) |
+                     np.where(np.isnan(longitude) | np.isnan(latitude), NO_LOCATION, 0))
+    return Inventory(data, categories)
+
+
+def _day_numbers(column):
+    """ Excel day numbers of a csv column of dates (numbers or text). """
+
+    import pandas as pd
+
+    days = pd.to_numeric(column, errors="coerce")
+    text = days.isna() & (column.str.strip() != "")
+    if text.any():
+        dates = pd.to_datetime(column[text], errors="coerce", format="mixed")
+        days[text] = (dates - pd.Timestamp(EPOCH)).dt.days
+    return days.to_numpy(float)
+
+
+def submittable(inventory, names):
+    """ Returns (mask of the trees that itree.py can submit, {kind: (codes,
+        iTree values)}) for species, distance and direction. Struck out and
+        blank rows are left out, and so are rows with values that have no
+        iTree name (see validate.py). """
+
+    import validate  # Imports inventory.py itself.
+
+    check = validate.validate(inventory, names)
+    return ~check.rejected(validate.SUBMIT), check.translated
+
+
+def itree_frame(inventory, translated, mask):
+    """ Returns a DataFrame of the trees in 'mask' with Row, Species, DBH,
+        Distance and Direction in iTree values (like normalize.frame).
+        'translated' comes from submittable. """
+
+    import pandas as pd
+
+    frame = {"Row": inventory.data["row"][mask], "DBH": inventory.data["dbh"][mask]}
+    for kind, (codes, lookup) in translated.items():
+        frame[kind.capitalize()] = pd.Categorical.from_codes(codes[mask], categories=lookup)
+    return pd.DataFrame(frame)
+
+
+def main():
+    """ Prints the size of the inventory of tree.xls. """
+
+    trees = load_sheet("tree.xls")
+    print("%d trees, %d bytes (%.1f bytes per tree)" % (len(trees), trees.nbytes(), DTYPE.itemsize))
+    print("struck %d, blank %d, without location %d"
+          % (trees.struck().sum(), trees.blank().sum(), (~trees.located()).sum()))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,273 +4,282 @@
    AUTHORS :        Jiin Jeong and Heather Wing
    DATE :           May 31 - June 6, 2018
    DESCRIPTION :    Automates filling the iTree website with data from Excel.
+                    Benefits are now computed locally by benefits.py; this
+                    script is kept to validate those numbers against i-Tree
+                    (benefits.compare) and to export new species for
+                    coefficients.csv (benefits.table_from_export).
    REQUIRES :
    (1) Selenium
-   (2) xlrd
+   (2) xlrd (.xls) or openpyxl (.xlsx), see sheetreader.py
    (3) ChromeDriver or SafariDriver
-   (4) .xls format Excel file ("tree.xls")
+   (4) .xls, .xlsx or .csv tree file ("tree.xls")
    REMAINING BUGS :
-   (1) Export only works for less than 50 trees.
-   (2) xlrd library only works for .xls files for now (b/c of formatting).
+   (1) Export only works for less than 50 trees (itreepool.py splits
+       bigger sheets into chunks).
  *****************************************************************************
 """
 
 from selenium import webdriver
-from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import Select
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
 
-import xlrd  # Library for reading data and formatting info from Excel.
+import numpy as np
+
+import inventory  # Trees of the sheet as arrays (reads .xls, .xlsx and .csv).
+import normalize  # Translates sheet values into iTree values.
+import tracing  # Row counters.
+import validate  # Finds the rows that can't be submitted.
+from waits import Timings, Waiter  # Waits for elements and times every step.
 
 
 class AutomateBrowser():
     """ This class automates the browser and performs desired tasks
-        within the browser. """
+        within the browser. Every step is timed (see waits.py). """
 
-    def __init__(self, driver):
+    def __init__(self, driver, timings=None):
         self._driver = driver
+        self._wait = Waiter(driver)  # Waits and finds each element only once.
+        self._timings = timings if timings is not None else Timings()
+
+    def timings(self):
+        """ Returns the timings of every step so far. """
+
+        return self._timings
+
+    def page(self, name):
+        """ Sets the page name used in the timing report. """
+
+        self._timings.page(name)
 
     def select_option_by_name(self, selectName, text):
         """ Selects an option with text in a drop down list with name 'selectName'. """
 
-        # Waits until drop down list is loaded.
-        WebDriverWait(self._driver, 10).until(lambda driver:
-            self._driver.find_element_by_xpath("//*[contains(text(), '"+text+"')]"))
-        selectBox = Select(self._driver.find_element_by_xpath('//select[@name="'+selectName+'"]'))
-        selectBox.select_by_visible_text(text)
+        with self._timings.time("select " + selectName):
+            # Waits until drop down list is loaded with the option.
+            selectBox = self._wait.find("//select[@name='%s'][option[contains(text(), '%s')]]"
+                                        % (selectName, text))
+            Select(selectBox).select_by_visible_text(text)
 
     def select_option_by_class(self, selectClass, text):
         """ Selects text box by class. """
 
-        try:  # Waits until drop down list is loaded.
-            wait = WebDriverWait(self._driver, 10)
-            element = wait.until(EC.visibility_of_element_located((By.XPATH,("//select[@class='"+selectClass+"']"))))
-        finally:
-            selectBox = Select(self._driver.find_element_by_xpath('//select[@class="'+selectClass+'"]'))
-            selectBox.select_by_visible_text(text)
+        with self._timings.time("select " + selectClass):
+            selectBox = self._wait.find("//select[@class='%s']" % selectClass)
+            Select(selectBox).select_by_visible_text(text)
 
     def push_button(self, buttonClass):
         """ Pushes button with class 'buttonClass'. """
 
-        element = self._driver.find_element_by_xpath("//button[@class='"+buttonClass+"']")
-        self._driver.execute_script("arguments[0].click();", element)
+        self.push_button_by_class(buttonClass)
 
     def select_radio(self, radioButtonID):
         """ Selects radio button with id 'radioButtonID'. """
 
-        try:
-            wait = WebDriverWait(self._driver, 10)
-            element = wait.until(EC.visibility_of_element_located((By.XPATH,("//input[@id='"+radioButtonID+"']"))))
-        finally:
-            radio_button = self._driver.find_element_by_xpath("//input[@id='"+radioButtonID+"']")
+        with self._timings.time("radio " + radioButtonID):
+            radio_button = self._wait.find("//input[@id='%s']" % radioButtonID)
             self._driver.execute_script("arguments[0].click();", radio_button)
 
     def enter_text(self, textBox, text):
         """ Enters text to text box with id 'textBox'. """
 
-        try:
-            wait = WebDriverWait(self._driver, 10)
-            element = wait.until(EC.visibility_of_element_located((By.XPATH,("//input[@id='"+textBox+"']"))))
-        finally:
-            text_area = self._driver.find_element_by_xpath("//input[@id='"+textBox+"']")
-            self._driver.execute_script("document.getElementById('"+textBox+"').click();")
-            self._driver.execute_script("arguments[0].setAttribute('value','"+text+"');",text_area)
+        with self._timings.time("text " + textBox):
+            text_area = self._wait.find("//input[@id='%s']" % textBox)
+            self._driver.execute_script("arguments[0].click(); arguments[0].setAttribute('value', arguments[1]);",
+                                        text_area, text)
 
     def enter_text_by_class(self, textBox, text):
 
-        try:
-            wait = WebDriverWait(self._driver, 10)
-            element = wait.until(EC.visibility_of_element_located((By.XPATH,("//input[@class='"+textBox+"']"))))
-        finally:
-            text_area = self._driver.find_element_by_xpath("//input[@class='"+textBox+"']")
-            self._driver.execute_script("document.getElementsByClassName('"+textBox+"')[0].click();")
-            self._driver.execute_script("arguments[0].setAttribute('value','"+text+"');",text_area)
+        with self._timings.time("text " + textBox):
+            text_area = self._wait.find("//input[@class='%s']" % textBox)
+            self._driver.execute_script("arguments[0].click(); arguments[0].setAttribute('value', arguments[1]);",
+                                        text_area, text)
 
-    def special_enter(self,rowID,textBox,text):
+    def special_enter(self, rowID, textBox, text):
+        """ Specialized text box for table rows with IDs. """
 
-        try:
-            wait = WebDriverWait(self._driver, 10)
-            element = wait.until(EC.visibility_of_element_located((By.XPATH,("//tr[@id='"+rowID+"']/td/input[@class='"+textBox+"']"))))
-        finally:
-            text_area = self._driver.find_element_by_xpath("//tr[@id='"+rowID+"']/td/input[@class='"+textBox+"']")
-            self._driver.execute_script("document.getElementsByClassName('"+textBox+"')[0].click();")
-            self._driver.execute_script("arguments[0].setAttribute('value','"+text+"');",text_area)
+        with self._timings.time("row " + textBox):
+            text_area = self._wait.find(self._wait.row(rowID, textBox))
+            self._driver.execute_script("arguments[0].click(); arguments[0].setAttribute('value', arguments[1]);",
+                                        text_area, text)
 
     def push_button_by_class(self, buttonClass):
         """ Pushes button with class 'buttonID'. """
 
-        element = self._driver.find_element_by_xpath("//button[@class='"+buttonClass+"']")
-        self._driver.execute_script("arguments[0].click();", element)
+        with self._timings.time("button " + buttonClass):
+            element = self._wait.find("//button[@class='%s']" % buttonClass)
+            self._driver.execute_script("arguments[0].click();", element)
 
     def push_button_by_id(self, buttonID):
         """ Pushes button with id 'buttonID'. """
 
-        element = self._driver.find_element_by_xpath("//input[@id='"+buttonID+"']")
-        self._driver.execute_script("arguments[0].click();", element)
-    
+        with self._timings.time("button " + buttonID):
+            element = self._wait.find("//input[@id='%s']" % buttonID)
+            self._driver.execute_script("arguments[0].click();", element)
+
     def push_button_export(self, buttonClass, text):
         """ Pushes button with class 'buttonClass' in an a type div. """
-        try:  # Waits until info table is loaded
-            wait = WebDriverWait(self._driver, 500)
-            element = wait.until(EC.visibility_of_element_located((By.XPATH,("//*[contains(text(), '"+text+"')]"))))
-        finally:
-            element = self._driver.find_element_by_xpath("//a[@class='"+buttonClass+"']")
+
+        with self._timings.time("wait for report"):  # Waits until info table is loaded
+            self._wait.find("//*[contains(text(), '%s')]" % text, timeout=500)
+
+        with self._timings.time("export " + buttonClass):
+            element = self._wait.find("//a[@class='%s']" % buttonClass)
             self._driver.execute_script("arguments[0].click();", element)
-        
 
-    def special_select(self,rowID,selectClass,text):
+    def special_select(self, rowID, selectClass, text):
         """ Specialized select box for drop downs in table rows with IDs. """
-        try:
-            wait = WebDriverWait(self._driver, 10)
-            element = wait.until(EC.visibility_of_element_located((By.XPATH,("//tr[@id='"+rowID+"']/td/select[@class='"+selectClass+"']"))))
-        finally:
-            selectBox = Select(self._driver.find_element_by_xpath("//tr[@id='"+rowID+"']/td/select[@class='"+selectClass+"']"))
-            selectBox.select_by_visible_text(text)
+
+        with self._timings.time("row " + selectClass):
+            selectBox = self._wait.find(self._wait.row(rowID, selectClass))
+            Select(selectBox).select_by_visible_text(text)
+
+    def fill_row(self, rowID, species, dbh, tree_dist, tree_dir):
+        """ Fills in all four fields of a tree row with a single script. """
+
+        with self._timings.time("fill row"):
+            self._wait.fill_row(rowID, {"tree-species": species,
+                                        "tree-dbh": dbh,
+                                        "tree-building-distance": tree_dist,
+                                        "tree-building-direction": tree_dir})
 
 
 class ExcelData():
     """ This class changes Excel data into inputtable format.
-        It only works with .xls files because of formatting. """
+        Works with .xls, .xlsx and .csv files. """
+
+    def __init__(self, file, mappings="mappings.csv"):
+        self._file = file
+        self._names = normalize.load(mappings)  # Sheet values -> iTree values.
 
-    def __init__(self, sheet):
-        self._sheet = sheet
-    
     def treename(self, species):
         """ Changes treename into common name in iTree website.
-        We find all the treenames in the Excelfile beforehand
-        by using the program file itree-treename.py. """
-
-        if species == "Acacia salicina":
-            return "Acacia, Green"
-        elif species == "Acacia saligna":
-            return "Acacia, Bailey"
-        elif species == "Chitalpa tashkentensis":
-            return "Chitalpa"
-        elif species == "Corymbia citriodora":
-            return "Gum, Lemon-scented"
-        elif species == "Gingko biloba":
-            return "Ginkgo"
-        elif species == "Jacaranda mimosifolia":
-            return "Jacaranda"
-        elif species == "Lagerstroemia x 'Natchez'":
-            return "Crapemyrtle"
-        elif species == "Lophostemon confertus":
-            return "Box, Brisbane"
-        elif species == "Pistacia chinensis":
-            return "Pistache, Chinese"
-        elif species == "Quercus rubra" or "Quercus rubra ":
-            return "Oak, Northern red"
+        The names are in mappings.csv (see normalize.py). """
+
+        return self._names.value("species", species)
 
     def distance(self, dist):
         """ Changes distance to inputtable format in iTree website. """
 
-        if dist == "0'-20'" or dist == "0-20'" or dist == "N/A":
-            return "0-19"
-        elif dist == "20'-40'":
-            return "20-39"
-        elif dist == "40'-60'" or dist == "40-60'":
-            return "40-59"
+        return self._names.value("distance", dist)
 
     def direction(self, direct):
         """ Changes direction to inputtable format in iTree website. """
 
-        if direct == "N" or direct == "N/A":
-            return "North (0°)"
-        elif direct == "NE":
-            return "Northeast (45°)"
-        elif direct == "NW":
-            return "Northwest (315°)"
-        elif direct == "E":
-            return "East (90°)"
-        elif direct == "S":
-            return "South (180°)"
-        elif direct == "SE":
-            return "Southeast (135°)"
-        elif direct == "SW":
-            return "Southwest (225°)"
-        elif direct == "W":
-            return "West (270°)"
+        return self._names.value("direction", direct)
+
+    def trees(self, start, end=None, report=None):
+        """ Returns the trees in rows start to end (or the last row) in
+            inputtable format: a list of (species, dbh, distance, direction).
+            Rejected rows are written to the csv 'report' if given. """
+
+        # for i in range(3, 4):  # Used for testing.
+        trees = inventory.load_sheet(self._file, start)  # Skips rows until start range.
+        if end is not None:
+            trees = trees.select(trees.data["row"] < end)
+
+        # Skips strikethrough, blank or NaN rows, and rows with unknown
+        # values (they would stop the browser in the middle of a run).
+        check = validate.validate(trees, self._names)
+        mask = ~check.rejected(validate.SUBMIT)
+        problems = {name: count for name, count in check.counts(validate.SUBMIT).items()
+                    if count and name not in ("struck", "blank_species")}
+        if problems:
+            print("Skipped rows:", problems)
+        tracing.count("submit.rows.processed", int(mask.sum()))
+        tracing.count("submit.rows.skipped", int((~mask).sum()))
+        if report:
+            check.report(report, validate.SUBMIT)
+
+        # dbh = stock size.
+        species, distance, direction = (np.array(lookup, dtype=object)[codes[mask]]
+                                        for codes, lookup in check.translated.values())
+        return [(name, "1.5", dist, direct) for name, dist, direct in zip(species, distance, direction)]
 
     def readfile(self, site, start, end):
         """ Reads the file, and fills in Tree page with the data.
             I wish I could make this more general, but oh well. """
 
-        row_id = 1  # Starting value for row_id
+        fill_trees(site, self.trees(start, end))
+
+
+def fill_trees(site, trees):
+    """ Fills in the Tree page with (species, dbh, distance, direction) tuples. """
+
+    row_id = 1  # Starting value for row_id
+
+    for species, dbh, tree_dist, tree_dir in trees:
+        site.fill_row("row-%s" % row_id, species, dbh, tree_dist, tree_dir)
+        site.push_button_by_id("add-row-button")
+
+        row_id += 1
+
+
+URL = "https://planting.itreetools.org/app/location/"
+REGION = ("California", "Los Angeles", "Claremont")  # State, County, City.
+MAX_TREES = 50  # Export only works for less than 50 trees at a time.
 
-        # for i in range(3, 4):  # Used for testing.
-        for i in range(start, end):  # Skips rows until start range.
-            row = self._sheet.row(i)
 
-            # Skips strikethrough rows.
-            xf = workbook.xf_list[self._sheet.cell_xf_index(i, 1)]  # Checks first cell for strikethrough.
-            font = workbook.font_list[xf.font_index]  # Finds the font element.
+def submit(driver, trees, url=URL, region=REGION, years='25', timings=None):
+    """ Goes through every page of the iTree website with the given trees
+        (at most MAX_TREES) and clicks the export button on the report.
+        Returns the timings of every step. """
 
-            if font.struck_out:  # If struck through, moves on to next iteration.
-                continue
+    itree = AutomateBrowser(driver, timings)
 
-            # Skips blank or NaN rows.
-            if row[1].value == '' or row[1].value == 'NaN':
-                continue
+    # Navigates to page in URL.
+    itree.page("START")
+    with itree.timings().time("load " + url):
+        driver.get(url)
 
-            else:
-                species = row[1].value  # Species.
-                dbh = row[9].value  # Stock size.
-                tree_dist = row[12].value  # Tree distance.
-                tree_dir = row[11].value  # Tree direction.
-                # print(species)  # Tests if the for-loop and conditions are working porperly.
-                # print(dbh)
-                # print(tree_dir)
-                # print(tree_dist)
+    # Asserts that project is in the driver title.
+    assert "Project" in driver.title
+    assert "No results found." not in driver.page_source
 
-                itree.special_select("row-%s" % row_id, "tree-species", self.treename(species))
-                itree.special_enter("row-%s" % row_id, "tree-dbh", "1.5")
-                itree.special_select("row-%s" % row_id, "tree-building-distance", self.distance(tree_dist))
-                itree.special_select("row-%s" % row_id, "tree-building-direction", self.direction(tree_dir))
-                itree.push_button_by_id("add-row-button")
 
-                row_id += 1
+    """/*************** LOCATIONS Page ***************/"""
+    itree.page("LOCATIONS")
+    itree.select_option_by_name("partition", region[0])  # State
+    itree.select_option_by_name("secondary_partition", region[1])  # County
+    itree.select_option_by_name("tertiary_partition", region[2])  # City
+    itree.push_button_by_class("next btn btn-primary")  # Push button: NEXT
 
 
-"""/*************** From here, we START working with iTree. ***************/"""
-# Creates webdriver.
-driver = webdriver.Chrome()  # Or webdriver.Chrome()
+    """/*************** PARAMETERS Page ***************/"""
+    itree.page("PARAMETERS")
+    # Adds local parameters IF NECESSARY: radio buttons and fill-in options.
+    itree.select_radio('id_electricity_units_0')
+    itree.select_radio('id_natural_gas_units_0')
+    itree.enter_text("id_project_years", years)
+    itree.push_button_by_class("next btn btn-primary")  # NEXT
 
-# Navigates to page in URL.
-driver.get("https://planting.itreetools.org/app/location/")
 
-# Asserts that project is in the driver title.
-assert "Project" in driver.title
-assert "No results found." not in driver.page_source
+    """/*************** TREES Page ***************/"""
+    itree.page("TREES")
+    fill_trees(itree, trees)
+    itree.push_button_by_class("next btn btn-primary")  # NEXT
 
-itree = AutomateBrowser(driver)
 
+    """/*************** REPORT Page ***************/"""
+    itree.page("REPORT")
+    # Waits for the number of trees to show up, then downloads report csv.
+    itree.push_button_export("btn btn-default buttons-csv buttons-html5 btn-primary", str(len(trees)))
 
-"""/*************** LOCATIONS Page ***************/"""
-itree.select_option_by_name("partition","California")  # State
-itree.select_option_by_name("secondary_partition","Los Angeles")  # County
-itree.select_option_by_name("tertiary_partition","Claremont")  # City
-itree.push_button_by_class("next btn btn-primary")  # Push button: NEXT
+    return itree.timings()
 
 
-"""/*************** PARAMETERS Page ***************/"""
-# Adds local parameters IF NECESSARY: radio buttons and fill-in options.
-itree.select_radio('id_electricity_units_0')
-itree.select_radio('id_natural_gas_units_0')
-itree.enter_text("id_project_years",'25')
-itree.push_button_by_class("next btn btn-primary")  # NEXT
+def main():
+    """ Sends the trees in tree.xls to iTree. Use itreepool.py for more
+        than MAX_TREES trees. """
 
+    """/*************** From here, we START working with iTree. ***************/"""
+    # Creates webdriver.
+    driver = webdriver.Chrome()  # Or webdriver.Chrome()
 
-"""/*************** TREES Page ***************/"""
-workbook = xlrd.open_workbook("tree.xls", formatting_info=True)  # Opens file.
-sheet = ExcelData(workbook.sheet_by_index(0))  # Retrives sheet.
+    sheet = ExcelData("tree.xls")  # Opens file.
 
-# sheet.readfile(itree, 3, 85)  # Reads the file from the third row.
-sheet.readfile(itree, 3, 50)  # ERROR: only works with 50 trees max.
-itree.push_button_by_class("next btn btn-primary")  # NEXT
+    # submit(driver, sheet.trees(3, 85))  # Reads the file from the third row.
+    timings = submit(driver, sheet.trees(3, 50))  # ERROR: only works with 50 trees max.
+    print(timings.report())  # Shows which page or field took the most time.
 
 
-"""/*************** REPORT Page ***************/"""
-itree.push_button_export("btn btn-default buttons-csv buttons-html5 btn-primary",'75')  # Download report csv
-# wait function isn't working?
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+ *****************************************************************************
+   FILE :           itreecache.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Remembers the iTree results of every tree configuration
+                    (region, project years, species, DBH, distance and
+                    direction) in a SQLite file. A sheet only has a few
+                    hundred different configurations, so only the ones that
+                    were never submitted go to the website, and the results
+                    are copied back to every tree with that configuration.
+
+   VERSIONS :       Results are saved with the iTree calculator version
+                    (CALCULATOR). Results of another version are not used,
+                    so changing CALCULATOR when the website is updated makes
+                    every configuration be submitted again. The least
+                    recently used results are removed past max_entries.
+
+   FILES :          itree_cache.sqlite
+
+ *****************************************************************************
+"""
+
+import csv
+import json
+import re  # Reads the calculator version from the export.
+import sqlite3  # Cache file.
+import time
+
+import numpy as np
+
+from benefits import METRICS
+from resultstore import read_results
+
+
+SCHEMA_VERSION = 1  # Layout of the tables. The cache is rebuilt if it changes.
+CALCULATOR = "1.1.3"  # i-Tree Planting Calculator version of the cached results.
+
+VERSION_RE = re.compile(r"version (\S+) for")
+
+
+def region_key(region):
+    """ Returns "State|County|City" for a (state, county, city) tuple. """
+
+    return "|".join(region)
+
+
+def configurations(trees):
+    """ Returns the distinct (species, dbh, distance, direction) tuples in
+        order of first use, and for every tree the index of its tuple. """
+
+    import pandas as pd
+
+    keys = pd.Series(["\x1f".join(map(str, tree)) for tree in trees], dtype=object)
+    codes, uniques = pd.factorize(keys)
+    return [tuple(key.split("\x1f")) for key in uniques], codes
+
+
+def read_export(file, start=3):
+    """ Reads an iTree export. Returns (calculator version, characteristics
+        text of each row without its "(1) " count, benefit values). """
+
+    with open(file, encoding="utf-8") as fp:
+        match = VERSION_RE.search(fp.readline())
+
+    df = read_results(file, start)
+    texts = df["Tree Group Characteristics"].str.replace(r"^\(\d+\)\s*", "", regex=True)
+    return (match.group(1) if match else None), list(texts), df[METRICS].to_numpy(float)
+
+
+class ResultCache():
+    """ SQLite cache of iTree results by tree configuration. """
+
+    def __init__(self, file="itree_cache.sqlite", calculator=CALCULATOR, max_entries=100000):
+        self._calculator = calculator
+        self._max_entries = max_entries
+        self._db = sqlite3.connect(file)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        found = self._db.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        if found is None or int(found[0]) != SCHEMA_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS results")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+
+        self._db.execute("""CREATE TABLE IF NOT EXISTS results (
+                                region TEXT, years TEXT, species TEXT, dbh TEXT,
+                                distance TEXT, direction TEXT, calculator TEXT,
+                                characteristics TEXT, benefits TEXT, used REAL,
+                                PRIMARY KEY (region, years, species, dbh, distance, direction))""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+        self._db.commit()
+
+    def get_many(self, region, years, configs):
+        """ Returns {config: (characteristics, values)} for the cached configurations. """
+
+        found = {}
+        region = region_key(region)
+        rows = self._db.execute("SELECT species, dbh, distance, direction, characteristics, benefits "
+                                "FROM results WHERE region = ? AND years = ? AND calculator = ?",
+                                (region, str(years), self._calculator))
+        wanted = set(configs)
+        for species, dbh, distance, direction, text, values in rows:
+            config = (species, dbh, distance, direction)
+            if config in wanted:
+                found[config] = (text, np.array(json.loads(values), dtype=float))
+
+        if found:  # Marks them as used for the eviction.
+            self._db.executemany("UPDATE results SET used = ? WHERE region = ? AND years = ? AND "
+                                 "species = ? AND dbh = ? AND distance = ? AND direction = ?",
+                                 [(time.time(), region, str(years)) + config for config in found])
+            self._db.commit()
+        return found
+
+    def put_many(self, region, years, configs, texts, values):
+        """ Saves the results of newly submitted configurations. """
+
+        now = time.time()
+        region = region_key(region)
+        self._db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             [(region, str(years)) + tuple(config) +
+                              (self._calculator, text, json.dumps([float(value) for value in row]), now)
+                              for config, text, row in zip(configs, texts, values)])
+        self.evict()
+        self._db.commit()
+
+    def evict(self):
+        """ Removes results of other calculator versions, then the least
+            recently used results past max_entries. """
+
+        self._db.execute("DELETE FROM results WHERE calculator != ?", (self._calculator,))
+        self._db.execute("DELETE FROM results WHERE rowid IN (SELECT rowid FROM results "
+                         "ORDER BY used DESC LIMIT -1 OFFSET ?)", (self._max_entries,))
+
+    def count(self):
+        """ Returns the number of cached configurations. """
+
+        return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def resolve(self, trees, region, years, submit):
+        """ Returns (characteristics, values) of every tree, in order.
+            submit(configs) is only called with the configurations that are
+            not cached, and has to return (version, characteristics, values)
+            in the same order, like read_export. """
+
+        configs, codes = configurations(trees)
+        found = self.get_many(region, years, configs)
+        missing = [config for config in configs if config not in found]
+        print("%d trees, %d configurations, %d not cached" % (len(trees), len(configs), len(missing)))
+
+        if missing:
+            version, texts, values = submit(missing)
+            if len(values) != len(missing):
+                raise ValueError("Expected %d results, got %d" % (len(missing), len(values)))
+            if version is not None and version != self._calculator:
+                print("Warning: results are from calculator version %s, not %s" % (version, self._calculator))
+            self.put_many(region, years, missing, texts, values)
+            found.update((config, (text, row)) for config, text, row in zip(missing, texts, values))
+
+        texts = [found[config][0] for config in configs]
+        values = np.array([found[config][1] for config in configs]).reshape(len(configs), len(METRICS))
+        return [texts[code] for code in codes], values[codes]
+
+    def close(self):
+        self._db.close()
+
+
+def write_results(file, texts, values, location):
+    """ Writes results in the layout of the iTree export (three header lines),
+        so report.py and resultstore.py can read them. """
+
+    with open(file, "w", newline="", encoding="utf-8") as fp:
+        fp.write("This data was produced from cached i-Tree Planting Calculator results for %s.\n\n\n"
+                 % location)
+        writer = csv.writer(fp, quoting=csv.QUOTE_ALL)
+        writer.writerow(["Group Identifier", "Tree Group Characteristics"] + METRICS)
+        for number, (text, row) in enumerate(zip(texts, values), 1):
+            writer.writerow([number, "(1) " + text] + ["%.3f" % value for value in row])
@@ -0,0 +1,262 @@
+"""
+ *****************************************************************************
+   FILE :           itreepool.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Sends a whole tree sheet to the iTree website by
+                    splitting it into chunks of 50 trees or less (the
+                    export limit of itree.py) and running the chunks on a
+                    pool of headless browsers at the same time. Every
+                    exported csv is merged into one result file for
+                    report.py. Chunks that fail are retried on their own.
+                    Trees whose configuration was submitted before are
+                    taken from itree_cache.sqlite (itreecache.py).
+
+   USAGE :          python itreepool.py                 (live iTree site)
+                    python itreepool.py --stub          (itreestub.py server)
+
+ *****************************************************************************
+"""
+
+import argparse
+import csv
+import glob
+import os
+import queue  # Thread-safe queue of idle browsers.
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium import webdriver
+
+import itree
+import itreecache
+import tracing  # Chunk timings and counters.
+from waits import Timings
+
+
+def new_driver(download, headless=True):
+    """ Creates a Chrome driver that downloads into the folder 'download'. """
+
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_experimental_option("prefs", {"download.default_directory": os.path.abspath(download),
+                                              "download.prompt_for_download": False})
+    return webdriver.Chrome(options=options)
+
+
+def chunks(trees, size=itree.MAX_TREES):
+    """ Splits the list of trees into lists of at most 'size' trees. """
+
+    return [trees[i:i + size] for i in range(0, len(trees), size)]
+
+
+def wait_for_csv(folder, before, timeout):
+    """ Waits until a csv file that is not in 'before' is fully downloaded. """
+
+    end = time.time() + timeout
+    while time.time() < end:
+        new = set(glob.glob(os.path.join(folder, "*.csv"))) - before
+        if new and not glob.glob(os.path.join(folder, "*.crdownload")):  # Chrome's partial files.
+            return new.pop()
+        time.sleep(0.5)
+
+    raise TimeoutError("No report was downloaded into %s" % folder)
+
+
+class BrowserPool():
+    """ Pool of headless browsers that submit chunks of trees in parallel. """
+
+    def __init__(self, size, folder, url=itree.URL, region=itree.REGION, years='25',
+                 headless=True, timeout=500):
+        self._folder = folder
+        self._url = url
+        self._region = region
+        self._years = years
+        self._headless = headless
+        self._timeout = timeout  # Same as the longest wait in push_button_export.
+        self._size = size
+        self._idle = queue.Queue()  # (driver or None, download folder) pairs.
+        self._timings = Timings()  # Timings of every chunk, merged.
+
+        try:
+            for i in range(size):
+                download = os.path.join(folder, "driver%d" % i)  # One folder per browser.
+                os.makedirs(download, exist_ok=True)
+                self._idle.put((new_driver(download, headless), download))
+        except Exception:
+            self.close()  # Browsers already started would be left running.
+            raise
+
+    def _replace(self, driver, download):
+        """ Quits a browser that may be stuck on any page and returns a new
+            one, or None if Chrome didn't start (the next chunk tries again). """
+
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:  # Already dead.
+                pass
+        try:
+            return new_driver(download, self._headless)
+        except Exception as error:
+            print("Could not start a browser: %s" % error)
+            tracing.count("submit.browsers.failed")
+            return None
+
+    @tracing.traced("submit.chunk", lambda self, number, trees: len(trees))
+    def run_chunk(self, number, trees):
+        """ Submits one chunk and returns the path of its exported csv. """
+
+        driver, download = self._idle.get()  # Waits for a free browser.
+        try:
+            if driver is None:  # Its replacement didn't start last time.
+                driver = new_driver(download, self._headless)
+            before = set(glob.glob(os.path.join(download, "*.csv")))
+            timings = Timings()
+            try:
+                itree.submit(driver, trees, self._url, self._region, self._years, timings)
+                with timings.time("download"):
+                    file = wait_for_csv(download, before, self._timeout)
+            finally:
+                self._timings.merge(timings)  # Failed chunks count too.
+
+            out = os.path.join(self._folder, "chunk%04d.csv" % number)
+            shutil.move(file, out)
+            return out
+
+        except Exception:
+            driver = self._replace(driver, download)  # Never a dead browser back in the pool.
+            raise
+
+        finally:
+            self._idle.put((driver, download))
+
+    def run(self, trees, retries=2):
+        """ Submits every tree and returns the csv files in chunk order.
+            Raises RuntimeError with the chunks that failed every retry. """
+
+        todo = dict(enumerate(chunks(trees)))
+        files = {}
+
+        with ThreadPoolExecutor(max_workers=self._size) as executor:
+            for attempt in range(retries + 1):
+                futures = {number: executor.submit(self.run_chunk, number, chunk)
+                           for number, chunk in todo.items()}
+
+                for number, future in futures.items():
+                    try:
+                        files[number] = future.result()
+                        tracing.count("submit.rows.submitted", len(todo.pop(number)))
+                    except Exception as error:
+                        tracing.count("submit.chunks.failed")
+                        print("Chunk %d failed (attempt %d): %s" % (number, attempt + 1, error))
+
+                if not todo:
+                    break
+
+        if todo:
+            tracing.count("submit.rows.failed", sum(len(chunk) for chunk in todo.values()))
+            raise RuntimeError("Chunks failed after %d retries: %s" % (retries, sorted(todo)))
+
+        return [files[number] for number in sorted(files)]
+
+    def timings(self):
+        """ Returns the merged timings of every chunk. """
+
+        return self._timings
+
+    def close(self):
+        """ Closes every browser. """
+
+        while not self._idle.empty():
+            driver, download = self._idle.get()
+            if driver is not None:
+                driver.quit()
+
+
+def merge(files, out):
+    """ Merges exported csv files into one file with the same three header
+        lines, so that it can be read by csvData(out, 3) in report.py. """
+
+    number = 0  # Renumbers the group identifiers across chunks.
+
+    with open(out, "w", newline="", encoding="utf-8") as result:
+        writer = csv.writer(result, quoting=csv.QUOTE_ALL)
+
+        for i, file in enumerate(files):
+            with open(file, newline="", encoding="utf-8") as fp:
+                header = [fp.readline() for line in range(3)]  # Disclaimer and blank lines.
+                rows = csv.reader(fp)
+                columns = next(rows)
+
+                if i == 0:
+                    result.writelines(header)
+                    writer.writerow(columns)
+
+                for row in rows:
+                    if not row:
+                        continue
+                    number += 1
+                    row[0] = str(number)
+                    writer.writerow(row)
+
+    return number
+
+
+def main(argv=None):
+    """ Submits every tree in tree.xls and writes treeresult.csv. """
+
+    parser = argparse.ArgumentParser(description="Submits a tree sheet to iTree in parallel.")
+    parser.add_argument("--file", default="tree.xls", help=".xls, .xlsx or .csv tree sheet")
+    parser.add_argument("--out", default="treeresult.csv")
+    parser.add_argument("--drivers", type=int, default=4, help="number of browsers")
+    parser.add_argument("--folder", default="chunks", help="folder for exported csv files")
+    parser.add_argument("--url", default=itree.URL)
+    parser.add_argument("--stub", action="store_true", help="uses a local itreestub.py server")
+    parser.add_argument("--cache", default="itree_cache.sqlite", help="results of earlier submissions")
+    parser.add_argument("--no-cache", action="store_true", help="submits every tree")
+    parser.add_argument("--rejections", default="rejections.csv", help="csv of the rows that can't be submitted")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        import itreestub
+        server = itreestub.start()
+        args.url = "http://localhost:%d/app/location/" % server.server_port
+
+    trees = itree.ExcelData(args.file).trees(3, report=args.rejections)  # Skips the three header rows.
+
+    def submit(configs):
+        """ Submits trees in the browser pool and reads back the merged export. """
+
+        pool = BrowserPool(args.drivers, args.folder, args.url)
+        try:
+            files = pool.run(configs)
+        finally:
+            pool.close()
+            pool.timings().save(os.path.join(args.folder, "timings.csv"))
+            print(pool.timings().report())
+
+        merged = os.path.join(args.folder, "merged.csv")
+        merge(files, merged)
+        return itreecache.read_export(merged)
+
+    if args.no_cache:
+        version, texts, values = submit(trees)
+    else:
+        # Only configurations that were never submitted go to the website.
+        cache = itreecache.ResultCache(args.cache, "stub" if args.stub else itreecache.CALCULATOR)
+        try:
+            texts, values = cache.resolve(trees, itree.REGION, '25', submit)
+        finally:
+            cache.close()
+
+    itreecache.write_results(args.out, texts, values, "%s, CA" % itree.REGION[2])
+    print("Wrote %d trees to %s" % (len(texts), args.out))
+
+if __name__ == '__main__':
+    main()
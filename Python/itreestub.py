@@ -0,0 +1,191 @@
+"""
+ *****************************************************************************
+   FILE :           itreestub.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Local stand-in for the iTree Planting Calculator, used
+                    to test itree.py and itreepool.py without the live site.
+                    It has the same LOCATIONS, PARAMETERS, TREES and REPORT
+                    pages, with the same element names, ids and classes that
+                    AutomateBrowser looks for. The exported csv has the same
+                    layout as the real one and its numbers come from
+                    benefits.py.
+
+   USAGE :          python itreestub.py   (then open localhost:8000/app/location/)
+
+ *****************************************************************************
+"""
+
+import csv
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+import benefits
+
+
+COEFFICIENTS = "coefficients.csv"
+REGION = ("California", "Los Angeles", "Claremont")
+
+DISTANCES = ["0-19", "20-39", "40-59"]
+DIRECTIONS = ["North (0°)", "Northeast (45°)", "East (90°)", "Southeast (135°)",
+              "South (180°)", "Southwest (225°)", "West (270°)", "Northwest (315°)"]
+
+NEXT = '<button type="button" class="next btn btn-primary" onclick="next()">Next</button>'
+
+
+def options(values):
+    """ Returns <option> tags for a drop down list. """
+
+    return "".join('<option value="%s">%s</option>' % (value, value) for value in values)
+
+
+def page(title, body, script):
+    """ Returns a full HTML page. Every title contains "Project" like the real site. """
+
+    return ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>Project - %s</title></head>'
+            '<body><h1>%s</h1>%s<script>%s</script></body></html>' % (title, title, body, script))
+
+
+def location_page():
+    body = ('<select name="partition"><option></option>%s</select>'
+            '<select name="secondary_partition"><option></option>%s</select>'
+            '<select name="tertiary_partition"><option></option>%s</select>%s'
+            % (options([REGION[0]]), options([REGION[1]]), options([REGION[2]]), NEXT))
+    script = ('function next() {'
+              '  var names = ["partition", "secondary_partition", "tertiary_partition"];'
+              '  var region = names.map(function(n) { return document.getElementsByName(n)[0].value; });'
+              '  sessionStorage.setItem("region", JSON.stringify(region));'
+              '  location.href = "/app/parameters/"; }')
+    return page("Location", body, script)
+
+
+def parameters_page():
+    body = ('<input type="radio" id="id_electricity_units_0" name="electricity_units" value="0">'
+            '<input type="radio" id="id_natural_gas_units_0" name="natural_gas_units" value="0">'
+            '<input type="text" id="id_project_years" value="">%s' % NEXT)
+    script = ('function next() {'
+              '  sessionStorage.setItem("years", document.getElementById("id_project_years").value);'
+              '  location.href = "/app/trees/"; }')
+    return page("Parameters", body, script)
+
+
+def trees_page(species):
+    row = ('<td><select class="tree-species"><option></option>%s</select></td>'
+           '<td><input type="text" class="tree-dbh" value=""></td>'
+           '<td><select class="tree-building-distance">%s</select></td>'
+           '<td><select class="tree-building-direction">%s</select></td>'
+           % (options(species), options(DISTANCES), options(DIRECTIONS)))
+    body = ('<table><tbody id="trees"><tr id="row-1">%s</tr></tbody></table>'
+            '<input type="button" id="add-row-button" value="Add" onclick="addRow()">%s' % (row, NEXT))
+    script = ('var ROW = %s;'
+              'function addRow() {'
+              '  var rows = document.getElementById("trees");'
+              '  var tr = document.createElement("tr");'
+              '  tr.id = "row-" + (rows.children.length + 1);'
+              '  tr.innerHTML = ROW;'
+              '  rows.appendChild(tr); }'
+              'function next() {'
+              '  var trees = [];'
+              '  var rows = document.getElementById("trees").children;'
+              '  for (var i = 0; i < rows.length; i++) {'
+              '    var get = function(c) { return rows[i].getElementsByClassName(c)[0].value; };'
+              '    if (get("tree-species") == "") { continue; }'  # The last row is always blank.
+              '    trees.push([get("tree-species"), get("tree-dbh"),'
+              '                get("tree-building-distance"), get("tree-building-direction")]); }'
+              '  sessionStorage.setItem("trees", JSON.stringify(trees));'
+              '  location.href = "/app/report/"; }' % json.dumps(row))
+    return page("Trees", body, script)
+
+
+def report_page():
+    # The table "loads" after a moment, like the real report page.
+    body = '<div id="report">Calculating...</div>'
+    script = ('setTimeout(function() {'
+              '  var trees = sessionStorage.getItem("trees");'
+              '  var query = "trees=" + encodeURIComponent(trees) +'
+              '              "&region=" + encodeURIComponent(sessionStorage.getItem("region"));'
+              '  document.getElementById("report").innerHTML ='
+              '    "<p>Number of trees: " + JSON.parse(trees).length + "</p>" +'
+              '    "<a class=\\"btn btn-default buttons-csv buttons-html5 btn-primary\\" " +'
+              '    "href=\\"/export.csv?" + query + "\\">CSV</a>"; }, 500);')
+    return page("Report", body, script)
+
+
+def export(trees, region):
+    """ Returns the csv text of the report for a list of
+        (species, dbh, distance, direction) trees. """
+
+    frame = pd.DataFrame(trees, columns=["Species", "DBH", "Distance", "Direction"])
+    table = benefits.load_table(COEFFICIENTS, *region)
+    values = table.compute(frame)
+
+    out = io.StringIO()
+    out.write("This data was produced from the i-Tree Planting Calculator version stub for %s, CA.\n\n\n"
+              % region[2])
+    writer = csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    writer.writerow(["Group Identifier", "Tree Group Characteristics"] + benefits.METRICS)
+
+    for i, (species, dbh, dist, direct) in enumerate(trees):
+        text = ("(1) %s (stub)  at %s inches DBH.Planted %s feet and %s of buildings."
+                % (species, dbh, dist, direct.lower()))
+        cells = [("$%.2f" if "($)" in name else "%.1f") % value
+                 for name, value in zip(benefits.METRICS, values[i])]
+        writer.writerow([str(i + 1), text] + cells)
+
+    return out.getvalue()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """ Serves the stub pages. """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        species = benefits.load_table(COEFFICIENTS, *REGION).species()
+        pages = {"/app/location/": location_page, "/app/parameters/": parameters_page,
+                 "/app/trees/": lambda: trees_page(species), "/app/report/": report_page}
+
+        if url.path in pages:
+            self.send(pages[url.path](), "text/html; charset=utf-8")
+        elif url.path == "/export.csv":
+            query = parse_qs(url.query)
+            trees = json.loads(query["trees"][0])
+            region = json.loads(query["region"][0])
+            self.send(export(trees, region), "text/csv; charset=utf-8", "itree_report.csv")
+        else:
+            self.send_error(404)
+
+    def send(self, text, kind, attachment=None):
+        data = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(data)))
+        if attachment:  # Makes the browser download the file.
+            self.send_header("Content-Disposition", 'attachment; filename="%s"' % attachment)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # Keeps the console quiet.
+
+
+def start(port=0):
+    """ Starts the stub server in a background thread and returns it.
+        Port 0 picks any free port (server.server_port). """
+
+    server = ThreadingHTTPServer(("localhost", port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    server = ThreadingHTTPServer(("localhost", 8000), StubHandler)
+    print("Stub iTree at http://localhost:8000/app/location/")
+    server.serve_forever()
@@ -0,0 +1,179 @@
+"""
+ *****************************************************************************
+   FILE :           loadtest.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Load test of service.py, like locust but without a web
+                    page: a number of users each keep one connection open
+                    and send requests one after the other, picking the
+                    kind of request by weight (TASKS). Prints requests per
+                    second and p50/p99 latency of every kind, then the
+                    service's own /metrics.
+
+                    Without --url the service is started in this process on
+                    a free port, so "python loadtest.py" alone is a local
+                    test.
+
+   USAGE :          python loadtest.py --users 20 --duration 10
+                    python loadtest.py --url http://127.0.0.1:8080
+
+ *****************************************************************************
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+
+# Sheet values like those of tree.xls (mappings.csv), some misspelled.
+SPECIES = ["Lagerstroemia indica", "Jacaranda mimosifolia", "Chitalpa tashkentensis", "Ginkgo biloba",
+           "Gingko biloba", "Quercus rubra", "Acacia salicina", "Corymbia citriodora", "Lagerstromia indica"]
+DISTANCES = ["0'-20'", "20'-40'", "40-60'", "N/A"]
+DIRECTIONS = ["N", "NE", "E", "SE", "S", "SW", "W", "NW"]
+BULK = 2000  # Trees in a bulk POST.
+
+
+def random_tree(rng):
+    return {"species": rng.choice(SPECIES), "distance": rng.choice(DISTANCES),
+            "direction": rng.choice(DIRECTIONS), "dbh": round(rng.uniform(1, 30), 1)}
+
+
+def tree_request(rng):
+    tree = random_tree(rng)
+    return "GET", "/tree?" + "&".join("%s=%s" % (key, quote(str(value))) for key, value in tree.items()), b""
+
+
+def zone_request(rng, zones):
+    return "GET", "/zones/" + quote(rng.choice(zones)) if zones else "/zones", b""
+
+
+def bulk_request(rng):
+    body = json.dumps({"trees": [random_tree(rng) for _ in range(BULK)]}).encode("utf-8")
+    return "POST", "/trees", body
+
+
+# Name -> (weight, function(rng, zones) -> (method, path, body)).
+TASKS = {"tree": (10, lambda rng, zones: tree_request(rng)),
+         "zone": (5, zone_request),
+         "totals": (3, lambda rng, zones: ("GET", "/totals", b"")),
+         "organizations": (1, lambda rng, zones: ("GET", "/organizations", b"")),
+         "bulk": (1, lambda rng, zones: bulk_request(rng))}
+
+
+async def request(reader, writer, host, method, path, body):
+    """ Sends one request on an open connection. Returns (status, body). """
+
+    writer.write(("%s %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+                  % (method, path, host, len(body))).encode("latin-1") + body)
+    await writer.drain()
+
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    length = 0
+    for line in head[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return int(head[0].split()[1]), await reader.readexactly(length)
+
+
+async def user(host, port, deadline, seed, zones, results):
+    """ One user: a connection and requests until the deadline. """
+
+    rng = random.Random(seed)
+    names = list(TASKS)
+    weights = [TASKS[name][0] for name in names]
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = TASKS[name][1](rng, zones)
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host, method, path, body)
+            results.setdefault(name, []).append((time.perf_counter() - start, status))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def fetch(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return json.loads((await request(reader, writer, host, "GET", path, b""))[1])
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def load_test(host, port, users, duration, seed=0):
+    """ Runs the users and returns {task: [(seconds, status)]} and the run time. """
+
+    zones = await fetch(host, port, "/zones")
+    results = {}
+    start = time.monotonic()
+    await asyncio.gather(*[user(host, port, start + duration, seed + i, zones, results) for i in range(users)])
+    return results, time.monotonic() - start
+
+
+def summary(results, seconds):
+    """ Returns lines of requests per second and latency of every task. """
+
+    lines = ["%-14s %8s %8s %9s %9s %7s" % ("task", "requests", "req/s", "p50 ms", "p99 ms", "errors")]
+    every = []
+    for name, found in sorted(results.items()):
+        ms = np.array([value for value, status in found]) * 1000
+        errors = sum(status != 200 for value, status in found)
+        every.extend(ms)
+        lines.append("%-14s %8d %8.1f %9.2f %9.2f %7d" % (name, len(ms), len(ms) / seconds, np.percentile(ms, 50),
+                                                          np.percentile(ms, 99), errors))
+    if every:
+        lines.append("%-14s %8d %8.1f %9.2f %9.2f" % ("all", len(every), len(every) / seconds,
+                                                       np.percentile(every, 50), np.percentile(every, 99)))
+    return lines
+
+
+async def run(args):
+    service = server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        import service as benefit_service
+        service = benefit_service.BenefitService(processes=args.processes)
+        server = await service.start("127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+
+    try:
+        results, seconds = await load_test(host, port, args.users, args.duration, args.seed)
+        print("\n".join(summary(results, seconds)))
+        print("\nService metrics:\n%s" % json.dumps(await fetch(host, port, "/metrics"), indent=1))
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+            service.close()
+
+
+def main(argv=None):
+    """ Runs the load test and prints the numbers. """
+
+    parser = argparse.ArgumentParser(description="Load test of the benefit service.")
+    parser.add_argument("--url", help="running service (default: start one here)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None, help="workers of the service started here")
+    args = parser.parse_args(argv)
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+ *****************************************************************************
+   FILE :           mailer.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Sends personalized e-mails to a long list of recipients.
+                    A few SMTP connections are opened and logged in once and
+                    then reused, messages are sent by a small number of
+                    threads with a rate limit, and every message gets a
+                    status (sent/failed, attempts, error).
+
+   TESTING :        Works with a local server without SSL or login, e.g.
+                    python -m aiosmtpd -n -l localhost:8025
+                    and ConnectionPool("localhost", 8025, use_ssl=False).
+
+ *****************************************************************************
+"""
+
+import queue
+import smtplib  # Library for email transmission
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import tracing  # Login timings and message counters.
+
+
+# Result of one message.
+Status = namedtuple("Status", ["to", "status", "attempts", "error"])
+
+
+class ConnectionPool():
+    """ Pool of SMTP connections that are logged in once and reused. """
+
+    def __init__(self, domain, port=465, account=None, pw=None, size=2, use_ssl=True, timeout=30):
+        self._domain = domain
+        self._port = port  # 465 is the standard SSL port.
+        self._account = account
+        self._pw = pw
+        self._use_ssl = use_ssl
+        self._timeout = timeout
+        self._idle = queue.LifoQueue()  # Most recently used first, so they stay warm.
+        self._slots = threading.Semaphore(size)  # At most 'size' connections.
+        self.logins = 0  # Number of times a connection was opened.
+
+    @tracing.traced("notify.smtp_login")
+    def _connect(self):
+        """ Opens and logs in a new connection. """
+
+        if self._use_ssl:
+            server = smtplib.SMTP_SSL(self._domain, self._port, timeout=self._timeout)
+        else:
+            server = smtplib.SMTP(self._domain, self._port, timeout=self._timeout)
+        server.ehlo()
+        if self._account and self._pw:
+            server.login(self._account, self._pw)
+        self.logins += 1
+        return server
+
+    def get(self):
+        """ Returns an open connection, opening one if none is idle. """
+
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                return self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+
+    def put(self, server, broken=False):
+        """ Gives a connection back. Broken connections are closed instead. """
+
+        if broken:
+            try:
+                server.close()
+            except Exception:
+                pass
+        else:
+            self._idle.put(server)
+        self._slots.release()
+
+    def close(self):
+        """ Logs out of every idle connection. """
+
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+
+
+class RateLimiter():
+    """ Allows at most 'rate' sends per second (token bucket). """
+
+    def __init__(self, rate, burst=1):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """ Waits until the next send is allowed. """
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._burst, self._tokens + (now - self._last) * self._rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self._rate
+            time.sleep(delay)
+
+
+def image_part(file):
+    """ Reads and base64-encodes an image once, so it can be shared by every message. """
+
+    with open(file, 'rb') as fp:
+        return MIMEImage(fp.read())
+
+
+def build_message(account, to, subject, body, image=None, preamble=None):
+    """ Builds one personalized message. 'image' is a shared MIMEImage part. """
+
+    msg = MIMEMultipart()
+    msg['From'] = account
+    msg['To'] = to
+    msg['Subject'] = subject
+    if preamble:
+        msg.preamble = preamble
+
+    if image is not None:
+        msg.attach(image)  # Already encoded, only copied into the output.
+    msg.attach(MIMEText(body, 'plain'))
+    return msg.as_bytes()
+
+
+class Dispatcher():
+    """ Sends messages over a ConnectionPool with bounded concurrency,
+        a rate limit and retries. """
+
+    def __init__(self, pool, account, workers=2, rate=5.0, retries=2, backoff=1.0):
+        self._pool = pool
+        self._account = account
+        self._workers = workers
+        self._limiter = RateLimiter(rate, burst=workers)
+        self._retries = retries
+        self._backoff = backoff  # Seconds before the first retry, doubled each time.
+
+    def send_one(self, to, msg):
+        """ Sends one message and returns its Status. """
+
+        status = self._send_one(to, msg)
+        tracing.count("notify.email." + status.status)
+        if status.attempts > 1:
+            tracing.count("notify.email.retried")
+        return status
+
+    def _send_one(self, to, msg):
+        error = None
+        for attempt in range(1, self._retries + 2):
+            self._limiter.wait()
+            try:
+                server = self._pool.get()
+            except (smtplib.SMTPException, OSError) as err:  # Could not connect or log in.
+                error = err
+            else:
+                try:
+                    server.sendmail(self._account, [to], msg)
+                    self._pool.put(server)
+                    return Status(to, "sent", attempt, None)
+                except smtplib.SMTPRecipientsRefused as err:  # Bad address: retrying won't help.
+                    self._pool.put(server)
+                    return Status(to, "failed", attempt, repr(err))
+                except (smtplib.SMTPException, OSError) as err:
+                    self._pool.put(server, broken=True)
+                    error = err
+
+            if attempt <= self._retries:
+                time.sleep(self._backoff * 2 ** (attempt - 1))
+
+        return Status(to, "failed", self._retries + 1, repr(error))
+
+    def send(self, messages):
+        """ Sends (to, message bytes) pairs. Returns a Status for each one,
+            in the same order. """
+
+        messages = list(messages)
+        with tracing.span("notify.dispatch", len(messages)):
+            with ThreadPoolExecutor(max_workers=self._workers) as executor:
+                return list(executor.map(lambda pair: self.send_one(*pair), messages))
+
+
+def summary(statuses):
+    """ Returns {"sent": n, "failed": n, "retried": n}. """
+
+    return {"sent": sum(status.status == "sent" for status in statuses),
+            "failed": sum(status.status == "failed" for status in statuses),
+            "retried": sum(status.attempts > 1 for status in statuses)}
@@ -0,0 +1,160 @@
+"""
+ *****************************************************************************
+   FILE :           normalize.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Changes species, distance and direction values from the
+                    tree sheet into the names used by the iTree website.
+                    The translations are in mappings.csv instead of if/elif
+                    chains, so new species only need a new line there.
+                    Values with typos or extra spaces (e.g. "Quercus rubra ")
+                    are matched to the closest known value, and values that
+                    can't be matched are counted in a report.
+
+ *****************************************************************************
+"""
+
+import csv
+import difflib  # Finds the closest known value for typos.
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+
+KINDS = ["species", "distance", "direction"]
+
+
+def clean(text):
+    """ Lowercases the text and removes extra spaces. """
+
+    return " ".join(str(text).split()).casefold()
+
+
+class Normalizer():
+    """ Translates sheet values into iTree values with dictionaries loaded
+        from a mapping file (Kind, Value, iTree columns). With record=False
+        unmatched values are not counted (e.g. values sent by clients of
+        service.py, which would grow the counters forever). """
+
+    def __init__(self, file="mappings.csv", cutoff=0.85, record=True):
+        self._exact = {kind: {} for kind in KINDS}  # Value as written in the file.
+        self._clean = {kind: {} for kind in KINDS}  # Cleaned value.
+        self._cutoff = cutoff  # How close a typo has to be (0 to 1).
+        self._record = record
+        self._unmapped = {kind: Counter() for kind in KINDS}
+
+        with open(file, newline="", encoding="utf-8") as fp:
+            for row in csv.DictReader(fp):
+                kind = row["Kind"].strip()
+                self._exact.setdefault(kind, {})[row["Value"]] = row["iTree"]
+                self._clean.setdefault(kind, {})[clean(row["Value"])] = row["iTree"]
+                self._unmapped.setdefault(kind, Counter())
+
+        # Cached per normalizer, so each distinct typo is only matched once.
+        self._closest = lru_cache(maxsize=4096)(self._find_closest)
+
+    def _find_closest(self, kind, cleaned):
+        """ Returns the iTree value of the closest known value, or None. """
+
+        known = self._clean[kind]
+        match = difflib.get_close_matches(cleaned, list(known), n=1, cutoff=self._cutoff)
+        return known[match[0]] if match else None
+
+    def _translate(self, kind, text):
+        """ Exact value first, then cleaned value, then the closest one. """
+
+        found = self._exact[kind].get(text)
+        if found is None:
+            cleaned = clean(text)
+            found = self._clean[kind].get(cleaned)
+            if found is None and cleaned:
+                found = self._closest(kind, cleaned)
+        return found
+
+    def value(self, kind, text):
+        """ Returns the iTree value for one sheet value, or None. """
+
+        found = self._translate(kind, text)
+        if found is None and self._record and clean(text):  # Blank cells are not counted.
+            self._unmapped[kind][text] += 1
+        return found
+
+    def column(self, kind, values):
+        """ Translates a whole column (list, array or Series) at once.
+            Each distinct value is only looked up once. Returns an object
+            array with None for values that could not be matched. """
+
+        import pandas as pd
+
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        mapped = np.append(self.categories(kind, uniques, counts), None)  # Last one is for blanks (-1).
+        return mapped[codes]
+
+    def categories(self, kind, values, counts=None):
+        """ Translates distinct values (e.g. the categories of a column).
+            'counts' is the number of rows with each value, for the report
+            of unmatched values. Returns an object array with None for
+            values that could not be matched. """
+
+        mapped = np.empty(len(values), dtype=object)
+        for i, text in enumerate(values):
+            mapped[i] = self._translate(kind, text)
+            if not self._record:
+                continue
+            count = 1 if counts is None else int(counts[i])
+            if mapped[i] is None and clean(text) and count:  # Blank cells are not counted.
+                self._unmapped[kind][text] += count
+        return mapped
+
+    def frame(self, trees):
+        """ Returns a copy of a DataFrame with Species, Distance and Direction
+            columns translated into iTree values. """
+
+        trees = trees.copy()
+        for kind in KINDS:
+            name = kind.capitalize()
+            trees[name] = self.column(kind, trees[name].to_numpy(object))
+        return trees
+
+    def fresh(self, record=True):
+        """ Returns a normalizer with the same mappings and typo matches
+            (nothing is read again) but its own, empty counters. """
+
+        found = object.__new__(Normalizer)
+        found.__dict__.update(self.__dict__)
+        found._record = record
+        found._unmapped = {kind: Counter() for kind in self._unmapped}
+        return found
+
+    def unmapped(self):
+        """ Returns {kind: Counter of values that could not be matched}. """
+
+        return {kind: Counter(counts) for kind, counts in self._unmapped.items() if counts}
+
+    def save_report(self, file):
+        """ Saves the unmatched values with how many rows had them. """
+
+        with open(file, "w", newline="", encoding="utf-8") as fp:
+            writer = csv.writer(fp)
+            writer.writerow(["Kind", "Value", "Rows"])
+            for kind, counts in self.unmapped().items():
+                for text, count in counts.most_common():
+                    writer.writerow([kind, text, count])
+
+
+_normalizers = {}  # Normalizers that were already loaded, by (file, cutoff).
+
+
+def load(file="mappings.csv", cutoff=0.85):
+    """ Returns a normalizer for a mapping file. Each file is read once, but
+        every call gets its own counters, so unmapped() and save_report only
+        have the values of that run. """
+
+    if (file, cutoff) not in _normalizers:
+        _normalizers[(file, cutoff)] = Normalizer(file, cutoff)
+    return _normalizers[(file, cutoff)].fresh()
@@ -0,0 +1,331 @@
+"""
+ *****************************************************************************
+   FILE :           outbox.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Sends e-mails and texts to everyone on the contact list
+                    (by their Preferred column, like contact.gs) and can
+                    pick up where it stopped if the run crashes. Every
+                    message of a run is first saved in an outbox (SQLite)
+                    as pending, once per recipient and channel. Each channel
+                    has its own pool of workers. Every finished message is
+                    written to a small journal file right away, and the
+                    outbox is updated from it in batches, so the database
+                    isn't written after every single message.
+
+   RESUMING :       Run again with the same --run name. Messages that were
+                    sent (even if only in the journal) are not sent again.
+                    Only messages that were being sent at the moment of the
+                    crash (at most one per worker) can't be known and are
+                    sent again.
+
+   USAGE :          python outbox.py --run weekly-2026-10-18
+                    python outbox.py --stub      (nothing is really sent)
+                    python outbox.py --targeted  (by each recipient's trees,
+                                                  see watering.py)
+
+ *****************************************************************************
+"""
+
+import argparse
+import base64
+import datetime
+import json
+import os
+import sqlite3  # Outbox file.
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import mailer
+import sheetreader
+import tracing  # Send timings and counters.
+
+
+PENDING, SENT, FAILED = "pending", "sent", "failed"
+CHANNELS = {"E-mail": "email", "Text": "text"}  # Preferred column -> channel.
+
+
+class Outbox():
+    """ SQLite outbox (WAL mode) with one message per (run, channel,
+        recipient), and a journal of finished messages not yet in it. """
+
+    def __init__(self, file="outbox.sqlite"):
+        self._db = sqlite3.connect(file, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer.
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS messages (
+                                id INTEGER PRIMARY KEY, run TEXT, channel TEXT, recipient TEXT,
+                                name TEXT, subject TEXT, body TEXT, status TEXT, attempts INTEGER,
+                                error TEXT, updated REAL, UNIQUE (run, channel, recipient))""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS messages_status ON messages (run, channel, status)")
+        self._db.commit()
+
+        self._journal_file = file + ".journal"
+        self._lock = threading.Lock()
+        self._buffer = []  # Finished messages not yet written to the database.
+        self.replay()
+        self._journal = open(self._journal_file, "a", encoding="utf-8")
+
+    def replay(self):
+        """ Writes the finished messages of the journal (left by a crash)
+            into the database. """
+
+        if not os.path.exists(self._journal_file):
+            return 0
+        with open(self._journal_file, encoding="utf-8") as fp:
+            updates = []
+            for line in fp:
+                try:
+                    updates.append(json.loads(line))
+                except ValueError:  # Half-written last line.
+                    break
+        self._write(updates)
+        open(self._journal_file, "w").close()
+        return len(updates)
+
+    def _write(self, updates):
+        """ Writes finished messages to the database in one transaction. """
+
+        with self._db:
+            self._db.executemany("UPDATE messages SET status = ?, attempts = attempts + ?, error = ?, "
+                                 "updated = ? WHERE id = ?",
+                                 [(u["status"], u["attempts"], u["error"], u["time"], u["id"]) for u in updates])
+
+    def enqueue(self, run, channel, messages):
+        """ Adds (recipient, name, subject, body) messages as pending.
+            Messages that are already in the run are left as they are. """
+
+        with self._db:
+            cursor = self._db.executemany(
+                "INSERT OR IGNORE INTO messages (run, channel, recipient, name, subject, body, status, "
+                "attempts, updated) VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)",
+                [(run, channel) + tuple(message) + (PENDING, time.time()) for message in messages])
+        return cursor.rowcount
+
+    def pending(self, run, channel, retry_failed=False):
+        """ Returns (id, recipient, name, subject, body) of the messages to send. """
+
+        statuses = (PENDING, FAILED) if retry_failed else (PENDING, PENDING)
+        return self._db.execute("SELECT id, recipient, name, subject, body FROM messages "
+                                "WHERE run = ? AND channel = ? AND status IN (?, ?) ORDER BY id",
+                                (run, channel) + statuses).fetchall()
+
+    def record(self, id, status, attempts=1, error=None):
+        """ Saves the result of one message in the journal (right away) and
+            keeps it for the next flush. """
+
+        update = {"id": id, "status": status, "attempts": attempts, "error": error, "time": time.time()}
+        with self._lock:
+            self._journal.write(json.dumps(update) + "\n")
+            self._journal.flush()  # In the file even if the program crashes.
+            self._buffer.append(update)
+
+    def flush(self):
+        """ Writes the buffered results to the database and empties the journal. """
+
+        with self._lock:
+            if self._buffer:
+                self._write(self._buffer)
+                self._buffer = []
+            self._journal.seek(0)
+            self._journal.truncate()
+
+    def counts(self, run):
+        """ Returns {(channel, status): number of messages} of a run. """
+
+        rows = self._db.execute("SELECT channel, status, COUNT(*) FROM messages WHERE run = ? "
+                                "GROUP BY channel, status", (run,))
+        return {(channel, status): count for channel, status, count in rows}
+
+    def close(self):
+        self.flush()
+        self._journal.close()
+        self._db.close()
+
+
+"""/**** SENDERS: send(recipient, name, subject, body), raise on failure. ***/ """
+class SmtpSender():
+    """ Sends e-mails over a mailer.py connection pool (with its rate limit
+        and retries). """
+
+    def __init__(self, domain, account, pw, connections=2, rate=5.0, image=None):
+        self._account = account
+        self._pool = mailer.ConnectionPool(domain, 465, account, pw, size=connections)
+        self._dispatcher = mailer.Dispatcher(self._pool, account, workers=connections, rate=rate)
+        self._image = mailer.image_part(image) if image else None  # Shared by every message.
+
+    def send(self, recipient, name, subject, body):
+        message = mailer.build_message(self._account, recipient, subject, body, self._image)
+        status = self._dispatcher.send_one(recipient, message)
+        if status.status != "sent":
+            raise RuntimeError(status.error)
+
+    def close(self):
+        self._pool.close()
+
+
+class TwilioSender():
+    """ Sends texts with the Twilio Messaging API (TwilioText in contact.gs). """
+
+    URL = "https://api.twilio.com/2010-04-01/Accounts/%s/Messages.json"
+
+    def __init__(self, sid, token, number, timeout=30):
+        self._url = self.URL % sid
+        self._auth = "Basic " + base64.b64encode(("%s:%s" % (sid, token)).encode()).decode()
+        self._number = number
+        self._timeout = timeout
+
+    def send(self, recipient, name, subject, body):
+        data = urllib.parse.urlencode({"To": recipient, "Body": body, "From": self._number}).encode()
+        request = urllib.request.Request(self._url, data=data, headers={"Authorization": self._auth})
+        with urllib.request.urlopen(request, timeout=self._timeout) as response:
+            response.read()
+
+    def close(self):
+        pass
+
+
+class StubSender():
+    """ Pretends to send. Keeps what was sent, for testing. 'fail' is a
+        set of recipients that always fail. """
+
+    def __init__(self, delay=0.0, fail=()):
+        self._delay = delay
+        self._fail = set(fail)
+        self._lock = threading.Lock()
+        self.sent = []
+
+    def send(self, recipient, name, subject, body):
+        time.sleep(self._delay)
+        if recipient in self._fail:
+            raise RuntimeError("stub failure for %s" % recipient)
+        with self._lock:
+            self.sent.append(recipient)
+
+    def close(self):
+        pass
+
+
+class Notifier():
+    """ Sends the pending messages of a run, with a pool of workers per
+        channel. Results are flushed to the outbox every 'batch' messages. """
+
+    def __init__(self, outbox, senders, workers=None, batch=200):
+        self._outbox = outbox
+        self._senders = senders  # {channel: sender}
+        self._workers = workers or {}  # {channel: number of workers}, 4 by default.
+        self._batch = batch
+        self._done = 0
+        self._lock = threading.Lock()
+
+    def _send(self, channel, message):
+        """ Sends one message and records the result. """
+
+        id, recipient, name, subject, body = message
+        try:
+            with tracing.span("notify.send." + channel):
+                self._senders[channel].send(recipient, name, subject, body)
+            self._outbox.record(id, SENT)
+            tracing.count("notify.outbox.%s.%s" % (channel, SENT))
+        except Exception as error:
+            self._outbox.record(id, FAILED, error=repr(error))
+            tracing.count("notify.outbox.%s.%s" % (channel, FAILED))
+
+        with self._lock:
+            self._done += 1
+            if self._done % self._batch == 0:  # Checkpoint.
+                with tracing.span("notify.flush", self._batch):
+                    self._outbox.flush()
+
+    def run(self, run, retry_failed=False):
+        """ Sends every pending message of a run. Returns the counts. """
+
+        pools = {channel: ThreadPoolExecutor(max_workers=self._workers.get(channel, 4))
+                 for channel in self._senders}
+        with tracing.span("notify.run", run=run) as span:
+            try:
+                for channel, pool in pools.items():
+                    for message in self._outbox.pending(run, channel, retry_failed):
+                        pool.submit(self._send, channel, message)
+                        span.add()
+            finally:
+                for pool in pools.values():  # Channels send at the same time.
+                    pool.shutdown(wait=True)
+                self._outbox.flush()
+
+        return self._outbox.counts(run)
+
+
+def messages(contacts, subject, content):
+    """ Returns {channel: [(recipient, name, subject, body)]} from contact
+        records, by their Preferred column (e-mail if there is none). """
+
+    found = {channel: [] for channel in CHANNELS.values()}
+    for contact in contacts:
+        channel = CHANNELS.get(contact.preferred, "email" if contact.email else None)
+        recipient = contact.email if channel == "email" else contact.phone
+        if channel is None or not recipient:
+            continue
+        prefix = "[Sustainable Claremont]\n" if channel == "text" else ""
+        body = prefix + "Hello %s, \n \n" % contact.name + content
+        found[channel].append((recipient, contact.name, subject, body))
+    return found
+
+
+def main(argv=None):
+    """ Sends this week's watering reminder to everyone on the contact list. """
+
+    parser = argparse.ArgumentParser(description="Sends reminders through a resumable outbox.")
+    parser.add_argument("--contacts", default="contact_list.xlsx")
+    parser.add_argument("--run", default="weekly-%s" % datetime.date.today(), help="same name to resume")
+    parser.add_argument("--db", default="outbox.sqlite")
+    parser.add_argument("--retry-failed", action="store_true")
+    parser.add_argument("--stub", action="store_true", help="doesn't really send anything")
+    parser.add_argument("--targeted", metavar="SHEET", help="tells each recipient how often to water "
+                        "their own trees in SHEET (e.g. tree.xls)")
+    args = parser.parse_args(argv)
+
+    import weatherinfo  # Only needed to write the message.
+    service = weatherinfo.WeatherService(weatherinfo.YahooProvider(), fallback=weatherinfo.FixtureProvider())
+    weather = service.lookup(weatherinfo.CLAREMONT)
+    high = weather["high"]
+    times = "once" if high < 85 else "three times" if high > 100 else "two times"  # Like weatherContent.
+    content = ("A friendly reminder to water your tree! This week's average high temperature will be %s. "
+               % high + "Please water your tree %s this week.\n \nFrom your Sustainable Claremont Team." % times)
+
+    if args.stub:
+        senders = {"email": StubSender(), "text": StubSender()}
+    else:  # Change.
+        senders = {"email": SmtpSender("smtp.gmail.com", "senderemail", "senderpw", image="contact_img.png"),
+                   "text": TwilioSender("SID", "token", "phone#")}
+
+    subject = "[Sustainable Claremont] Weekly Water Trees Reminder"
+    contacts = list(sheetreader.contacts(args.contacts))
+    if args.targeted:
+        import watering
+        found = watering.messages(contacts, watering.load_model(args.targeted), weather, subject)
+    else:
+        found = messages(contacts, subject, content)
+
+    outbox = Outbox(args.db)
+    try:
+        for channel, items in found.items():
+            print("%s: %d new messages" % (channel, outbox.enqueue(args.run, channel, items)))
+
+        counts = Notifier(outbox, senders, {"email": 4, "text": 2}).run(args.run, args.retry_failed)
+        for (channel, status), count in sorted(counts.items()):
+            print("%s %s: %d" % (channel, status, count))
+    finally:
+        outbox.close()
+        for sender in senders.values():
+            sender.close()
+
+
+if __name__ == '__main__':
+    main()
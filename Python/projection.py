@@ -0,0 +1,209 @@
+"""
+ *****************************************************************************
+   FILE :           projection.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Spreads the lifetime benefits of each tree (the totals
+                    that iTree gives for the project years) over the years,
+                    so reports can show a curve instead of one number.
+                    Each tree's DBH grows every year at the rate of its
+                    species (growth.csv), and a year's share of the benefits
+                    follows the tree's leaf area (DBH squared). Trees also
+                    die at the yearly mortality rate of their species.
+
+                    annual()       expected benefits per year
+                    monte_carlo()  random deaths, many times, for bands
+                                   (e.g. 5th-95th percentile) per year
+
+   NOTES :          Trees of the same species and DBH grow the same way, so
+                    the math is done per (species, DBH) group. dbh() and
+                    tree_series() give the (trees x years) arrays.
+
+ *****************************************************************************
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor  # Monte Carlo draws in parallel.
+
+import numpy as np
+import pandas as pd
+
+from benefits import METRICS, DEFAULT_DBH, GROUP_RE
+from resultstore import read_results
+
+
+TOTAL = "Total ($)"  # Sum of every dollar column.
+DOLLARS = [metric for metric in METRICS if metric.endswith("($)")]
+GROWTH = ["Growth (in/yr)", "Max DBH (in)", "Mortality (per yr)"]
+
+
+def load_growth(file="growth.csv"):
+    """ Returns growth rate, max DBH and mortality per species. The
+        "default" row is used for species that are not in the file. """
+
+    return pd.read_csv(file, index_col="Species")
+
+
+def from_export(file, start=3):
+    """ Returns Species, DBH and benefit columns of every tree in an iTree
+        export (treeresult.csv, benefits.csv or an itreepool.py result). """
+
+    df = read_results(file, start)
+    info = df["Tree Group Characteristics"].str.extract(GROUP_RE)
+    trees = pd.DataFrame({"Species": info["species"],
+                          "DBH": pd.to_numeric(info["dbh"], errors="coerce").fillna(DEFAULT_DBH)})
+    trees[METRICS] = df[METRICS].to_numpy(float)
+    return trees
+
+
+class Projection():
+    """ Year by year benefits of a list of trees. 'trees' is a DataFrame
+        with Species, DBH (optional) and benefit columns, where the benefits
+        are totals over 'years'. """
+
+    def __init__(self, trees, growth, years=25):
+        self._years = years
+        dbh = (pd.to_numeric(trees["DBH"], errors="coerce").fillna(DEFAULT_DBH).to_numpy(np.float32)
+               if "DBH" in trees else np.full(len(trees), DEFAULT_DBH, np.float32))
+
+        values = trees.reindex(columns=METRICS).to_numpy(float)
+        values = np.nan_to_num(values)  # Trees without results add nothing.
+        total = values[:, [METRICS.index(metric) for metric in DOLLARS]].sum(axis=1)
+        self._values = np.column_stack([values, total]).astype(np.float32)  # (trees, metrics + 1)
+        self._columns = METRICS + [TOTAL]
+
+        # Groups of trees that grow the same way.
+        keys = pd.DataFrame({"Species": trees["Species"].astype(str).to_numpy(), "DBH": dbh})
+        self._codes = keys.groupby(["Species", "DBH"], sort=False).ngroup().to_numpy()
+        groups = keys.drop_duplicates().reset_index(drop=True)  # Same order as the codes.
+
+        params = growth.reindex(groups["Species"])
+        params = params.fillna(growth.loc["default"]) if "default" in growth.index else params
+        self._rate = params[GROWTH[0]].to_numpy(np.float32)
+        self._max = np.maximum(params[GROWTH[1]].to_numpy(np.float32), groups["DBH"].to_numpy(np.float32))
+        self._mortality = params[GROWTH[2]].to_numpy(float)
+        self._start = groups["DBH"].to_numpy(np.float32)
+
+        # DBH of each group in years 1..years, and the share of the benefits
+        # in each year (by DBH squared), adding up to 1.
+        step = np.arange(1, years + 1, dtype=np.float32)
+        self._dbh = np.minimum(self._start[:, None] + self._rate[:, None] * step, self._max[:, None])
+        area = self._dbh.astype(float) ** 2
+        self._weights = area / area.sum(axis=1, keepdims=True)  # (groups, years)
+        self._survival = (1 - self._mortality[:, None]) ** step  # Alive at the end of each year.
+
+        # Benefits of every group (one pass over the trees).
+        self._group_values = np.column_stack([np.bincount(self._codes, weights=column, minlength=len(groups))
+                                              for column in self._values.T])
+
+    def years(self):
+        """ Returns the project years, 1 to years. """
+
+        return np.arange(1, self._years + 1)
+
+    def dbh(self):
+        """ Returns the DBH of every tree in every year, shape (trees, years). """
+
+        return self._dbh[self._codes]
+
+    def tree_series(self, metric=TOTAL, survival=True):
+        """ Returns the expected benefit of every tree in every year,
+            shape (trees, years). """
+
+        share = self._weights * self._survival if survival else self._weights
+        j = self._columns.index(metric)
+        return self._values[:, j, None] * share[self._codes].astype(np.float32)
+
+    def annual(self, survival=True):
+        """ Returns the expected benefits per year (rows) and metric (columns).
+            Without survival, the years add up to the iTree totals. """
+
+        share = self._weights * self._survival if survival else self._weights
+        annual = share.T @ self._group_values  # (years, metrics)
+        return pd.DataFrame(annual, index=pd.Index(self.years(), name="Year"), columns=self._columns)
+
+    def alive(self):
+        """ Returns the expected share of trees alive at the end of each year. """
+
+        counts = np.bincount(self._codes, minlength=len(self._start))
+        return (counts @ self._survival) / max(1, counts.sum())
+
+    def monte_carlo(self, draws=1000, metrics=(TOTAL,), percentiles=(5, 50, 95), seed=0,
+                    processes=None, cumulative=False):
+        """ Draws the year each tree dies, 'draws' times, and returns
+            {metric: DataFrame of the percentiles of each year's benefits}
+            (or of the benefits up to each year, if cumulative).
+            Draws are split over a pool of processes. """
+
+        columns = [self._columns.index(metric) for metric in metrics]
+        processes = processes or os.cpu_count() or 1
+        sizes = [len(part) for part in np.array_split(np.arange(draws), processes) if len(part)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        state = (self._codes, self._mortality[self._codes], self._weights, self._values[:, columns])
+
+        if len(sizes) == 1:
+            results = [_draws(state, seeds[0], sizes[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=len(sizes), initializer=_start_worker,
+                                     initargs=(state,)) as executor:
+                results = list(executor.map(_worker_draws, seeds, sizes))
+
+        series = np.concatenate(results)  # (draws, metrics, years)
+        if cumulative:
+            series = np.cumsum(series, axis=2)
+        bands = np.percentile(series, percentiles, axis=0)  # (percentiles, metrics, years)
+        return {metric: pd.DataFrame(bands[:, k].T, index=pd.Index(self.years(), name="Year"),
+                                     columns=["p%g" % p for p in percentiles])
+                for k, metric in enumerate(metrics)}
+
+
+def _draws(state, seed, draws):
+    """ Runs 'draws' random mortality draws. Returns (draws, metrics, years). """
+
+    codes, mortality, weights, values = state
+    groups, years = weights.shape
+    rng = np.random.default_rng(seed)
+    out = np.empty((draws, values.shape[1], years))
+
+    for i in range(draws):
+        # Year each tree dies (1 = first year). Years past the end are the same.
+        death = np.minimum(rng.geometric(np.clip(mortality, 1e-12, 1)), years + 1)
+        index = codes * (years + 2) + death
+        for k in range(values.shape[1]):
+            # Benefits of the trees of each group that die in each year.
+            dead = np.bincount(index, weights=values[:, k], minlength=groups * (years + 2))
+            dead = np.cumsum(dead.reshape(groups, years + 2), axis=1)
+            alive = dead[:, -1:] - dead[:, 1:years + 1]  # Alive at the end of years 1..years.
+            out[i, k] = np.einsum("gy,gy->y", weights, alive)
+
+    return out
+
+
+_state = None  # Trees of each worker process.
+
+
+def _start_worker(state):
+    global _state
+    _state = state
+
+
+def _worker_draws(seed, draws):
+    return _draws(_state, seed, draws)
+
+
+def main():
+    """ Prints the yearly benefits of treeresult.csv with a 90% band. """
+
+    projection = Projection(from_export("treeresult.csv"), load_growth("growth.csv"), 25)
+    annual = projection.annual()
+    bands = projection.monte_carlo(1000)[TOTAL]
+    bands["expected"] = annual[TOTAL]
+    print(bands.round(2).to_string())
+    print("Trees alive after %d years: %.1f%%" % (len(annual), 100 * projection.alive()[-1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,80 +7,90 @@
    DATE :           June 5, 2018
 
    DESCRIPTION :    Generates general iTree report for organizations.
+                    Results go where the "{{name}}" placeholders are in
+                    report_ex.docx. With --batch, makes one report per
+                    organization in parallel from a single parsed template.
+                    With --years, adds yearly benefits (projection.py), with
+                    --map, a map of the trees (treemap.py), and with
+                    --archive, keeps this run's results (archive.py) and
+                    adds the trend of a benefit over the archived years.
 
  *****************************************************************************
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt  # Imports plots.
 import math  # Math functions.
 
-from docx import Document
-from docx.shared  import Pt  # Imports font typeface and size.
-from docx.enum.style import WD_STYLE_TYPE  # Accesses styles attribute.
-
+import argparse
+import copy  # Copies the template body for each report.
 import datetime  # Imports cur time and date.
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor  # Makes reports in parallel.
+
+import charts  # Draws charts in memory, without pyplot.
+import resultstore  # Parses results once and keeps running totals.
+import tracing  # Stage timings.
 
 
 class csvData():
     """ This is a class for analyzing csv data. """
     def __init__(self, file, start):
+        import pandas as pd  # Only when a csv is read.
+
         self._df = pd.read_csv(file, skiprows=start)  # Starts from start.
+        self._totals = None  # Sums of every benefit column.
 
     def read_file(self):
         """ Reads file in mutable float format. """
 
-        # Renames a weirdly named index.
-        self._df.rename(index=str, columns={"PM2.5                                                     Avoided (pounds)":
-                  "PM2.5 Avoided (pounds)", "PM2.5                                                      Removed (pounds)":
-                  "PM2.5 Removed (pounds)"}, inplace=True)  #inplace makes this new label in place of df.
-
-        # Changes col data into floats.
-        for i in range(2, len(self._df.columns) - 1):  # Starts from CO2 Avoided column.
-            cur_col = self._df[self._df.columns[i]]  # Current column by index.
-
-            if type(cur_col[0]) == str:  # Checks if first value is string. Only goes through string values.
-                cur_col = cur_col.str.replace("$","")  # Replaces dollar values.
-                cur_col = cur_col.str.replace(",","")  # Replaces , values.
-                cur_col = cur_col.astype(float)  # Changes to type float.
-                self._df[self._df.columns[i]] = cur_col  # Replaces DF column with new current column.
+        # Renames the weirdly named PM2.5 columns and changes every
+        # benefit column ("$1,234.50") into floats at once.
+        with tracing.span("report.read_file", len(self._df)):
+            self._df = resultstore.parse(self._df)
+        self._totals = None
 
         # print("read file")  # Tests if method was properly implemented.
 
     def row1(self):
         """ Reads first row and returns the itree disclaimer and location. """
 
+        import pandas as pd
+
         location = pd.read_csv("result.csv", header=None, nrows=1)  # Reads only the first row.
         return location.iloc[0, 0] + "," + location.iloc[0, 1]  # iloc is [row, col].
 
     def get_index(self):
         """ Returns a list of index of the DataFrame. """
 
-        return pd.Index(list(self._df))
+        return self._df.columns
 
     def find_col(self, index):
         """ Finds the column by name of col index. """
 
         return self._df.loc[:, index]
 
+    def totals(self):
+        """ Sums every benefit column in one pass and rounds to the third decimal place. """
+
+        if self._totals is None:
+            metrics = [col for col in resultstore.METRICS if col in self._df.columns]
+            self._totals = self._df[metrics].sum().round(3).to_dict()
+        return self._totals
+
     def sum_col(self, index):
         """ Finds the sum of the cols and rounds to the third decimal place. """
 
+        if index in self.totals():
+            return self.totals()[index]
         return round(self.find_col(index).sum(), 3)
 
     def make_pp(self, data1, data2, data3, data4, n1, n2, n3, n4, name):
-        """ Makes pie plot with given data."""
-
-        series = pd.Series((data1, data2, data3, data4), index=[n1, n2, n3, n4], name=name)
+        """ Makes pie plot with given data. Returns PNG bytes
+            (use charts.buffer to add it to a docx)."""
 
         # Makes pie plot.
-        pie = series.plot.pie(labels=[n1, n2, n3, n4],
-                              colors=['r', 'y', 'g', 'c'],
-                              autopct="$%.2f",  # Adds values to 2 decimal points.
-                              fontsize=15,
-                              figsize=(6,6))  # Sets figure size.
-        fig = pie.get_figure()  # Gets figure.
-        fig.savefig("pie.jpg")  # Saves figure as jpg file.
+        return charts.draw("pie", [data1, data2, data3, data4], [n1, n2, n3, n4], name,
+                           size=(6, 6))  # Sets figure size.
 
 
 """ I wanted to make this a subclass of Document, but it was giving me a weird error:
@@ -92,9 +102,13 @@ class Report():
 class Report():
     def __init__(self, file):
         """ Initializes the report by creating a new file
-            that is a copy of the given file. """
+            that is a copy of the given file (or an opened Document). """
 
-        self._doc = Document(file)
+        from docx import Document  # Only when a report is made.
+
+        self._doc = file if hasattr(file, "paragraphs") else Document(file)
+        self._anchors = None  # Placeholder paragraphs, found on first use.
+        self._style_ids = {}
 
     def add_in(self, index, text, font="Normal"):
         """ Adds paragraph in given paragraph. """
@@ -106,98 +120,385 @@ class Report():
         if font == "Bold":  # Bold font.
             cur_font.bold = True
 
+    @tracing.traced("report.add_after")
     def add_after(self, index, text, style="Normal"):
         """ Adds paragraph after given index. """
 
-        self._doc.add_paragraph()
-        cur = len(self._doc.paragraphs) - 1  # Current paragraph index.
+        paragraphs = self._doc.paragraphs
 
-        while cur > index:
-            self._doc.paragraphs[cur] = self._doc.paragraphs[cur - 1]
-            cur = cur - 1
-
-        new_par = self._doc.paragraphs[cur + 1].insert_paragraph_before(text)
+        if index + 1 < len(paragraphs):
+            new_par = paragraphs[index + 1].insert_paragraph_before(text)
+        else:  # Last paragraph.
+            new_par = self._doc.add_paragraph(text)
         new_par.style = self._doc.styles[style]
 
+    def anchors(self):
+        """ Returns {name: paragraph} for every "{{name}}" placeholder paragraph. """
+
+        if self._anchors is None:
+            self._anchors = {}
+            for paragraph in self._doc.paragraphs:
+                text = paragraph.text.strip()
+                if text.startswith("{{") and text.endswith("}}"):
+                    self._anchors[text[2:-2]] = paragraph
+        return self._anchors
+
+    def fill(self, name, text, font="Normal"):
+        """ Replaces "{{name}}" inside a paragraph (e.g. the date) with text. """
+
+        placeholder = "{{%s}}" % name
+        for paragraph in self._doc.paragraphs:
+            for run in paragraph.runs:
+                if placeholder in run.text:
+                    run.text = run.text.replace(placeholder, text)
+                    if font == "Bold":  # Bold font.
+                        run.font.bold = True
+
+    def add_at(self, name, text, style="Normal"):
+        """ Adds paragraph at the "{{name}}" placeholder. Paragraphs added at
+            the same placeholder stay in the order they were added. """
+
+        new_par = self.anchors()[name].insert_paragraph_before(text)
+        new_par._p.style = self.style_id(style)  # Same as new_par.style = ..., but faster.
+        return new_par
+
+    def style_id(self, style):
+        """ Returns the id of a paragraph style. Looked up once per style. """
+
+        if style not in self._style_ids:
+            self._style_ids[style] = self._doc.styles[style].style_id
+        return self._style_ids[style]
+
+    def add_picture_at(self, name, data, width=None):
+        """ Adds a picture (PNG bytes) at the "{{name}}" placeholder, 6
+            inches wide unless 'width' (a docx length) is given. """
+
+        from docx.shared import Inches  # Imports picture size.
+
+        width = Inches(6) if width is None else width
+        new_par = self.anchors()[name].insert_paragraph_before()
+        new_par.add_run().add_picture(charts.buffer(data), width=width)
+        return new_par
+
+    def remove_anchors(self):
+        """ Removes the placeholder paragraphs that are left. """
+
+        for paragraph in self.anchors().values():
+            paragraph._p.getparent().remove(paragraph._p)
+        self._anchors = {}
+
     def save(self, name):
         """ Saves the file. """
 
+        self.remove_anchors()
         self._doc.save(name)
 
 
-"""/**** Reads CSV Data. ***/ """
-data = csvData("treeresult.csv", 3)  # Reads file, skipping three lines.
-data.read_file()  # Goes through data and converts to usable format.
-
-# Sets Variables.
-co2a = data.sum_col("CO2 Avoided (pounds)")
-co2a_dol = data.sum_col("CO2 Avoided ($)")
-co2s = data.sum_col("CO2 Sequestered (pounds)")
-co2s_dol = data.sum_col("CO2 Sequestered ($)")
-elec = data.sum_col("Electricity Saved (kWh)")
-elec_dol = data.sum_col("Electricity Saved ($)")
-fuel = data.sum_col("Fuel Saved (MMBtu)")
-fuel_dol = data.sum_col("Fuel Saved ($)")
-biomass = data.sum_col("Tree Biomass (short ton)")
-rain = data.sum_col("Rainfall Interception (gallons)")
-storm = data.sum_col("Stormwater Managed (gallons)")
-storm_dol = data.sum_col("Stormwater Managed ($)")
-o3 = data.sum_col("O3 Removed (pounds)")
-no2a = data.sum_col("NO2 Avoided (pounds)")
-no2r= data.sum_col("NO2 Removed (pounds)")
-so2a = data.sum_col("SO2 Avoided (pounds)")
-so2r = data.sum_col("SO2 Removed (pounds)")
-voc = data.sum_col("VOC Avoided (pounds)")
-pma = data.sum_col("PM2.5 Avoided (pounds)")
-pmr = data.sum_col("PM2.5 Removed (pounds)")
-
-
-"""/**** From here, creates REPORT ***/ """
-# GENERAL INFO SOURCE(S) : Adapted from i-Tree Design Report by Jiin Jeong.
-doc = Report("report_ex.docx")
-# document.add_heading("Tree Benefit Report", 0)
-
-# Adds current date.
-now = datetime.datetime.now()
-doc.add_in(1, "%d/%02d/%02d." % (now.year, now.month, now.day), "Bold")  # 2-digit str format.
-
-
-"""/**** CO2 ***/ """
-# These are specific results. General info is copied from the example file (no need to be recreated).
-doc.add_after(4, "With your trees, you will avoid %s pounds of CO2. " % co2a +
-          "This is equivalent to avoiding $%s of CO2." % co2a_dol, "List Bullet")
-doc.add_after(5, "Your trees will sequester %s pounds of CO2. " % co2s +
-          "This is equivalent to sequestering $%s of CO2." % co2s_dol, "List Bullet")
-doc.add_after(6, "In total, you will save $%s by reducing %s of "
-          % (co2a_dol + co2s_dol, co2a + co2s) + "atmospheric carbon dioxide " +
-          "through CO2 sequestration and decreased energy production needs and emissions.",
-          "List Bullet")
-
-
-"""/**** ENERGY ***/ """
-doc.add_after(12, "With your trees, you will save %s kWh of electricity. " % elec +
-          "Your electricity energy savings are $%s." % elec_dol, "List Bullet")
-
-doc.add_after(13, "With your trees, you will save %s MMBtu of fuel. " % fuel +
-          "Your fuel savings are $%s." % fuel_dol, "List Bullet")
-
-
-"""/**** ECO ***/ """
-doc.add_after(20, "Your trees produce %s short tons of biomass." % biomass, "List Bullet")
-doc.add_after(21, "Your trees intercept %s gallons of rainwater." % rain, "List Bullet")
-doc.add_after(22, "Your trees manage $%s worth of %s gallons of stormwater."
-              % (storm_dol, storm), "List Bullet")
-
-"""/**** AIR POLLUTION ***/ """
-doc.add_after(30, "Your trees remove %s pounds of O3, %s pounds of NO2, " % (o3, no2r) +
-              "%s pounds of SO2, and %s pounds of PM2.5." % (so2r, pmr), "List Bullet")
-doc.add_after(31, "Your trees avoid %s pounds of NO2, %s pounds of SO2, " % (no2a, so2a) +
-              "%s pounds of VOC, and %s pounds of PM2.5." % (voc, pma), "List Bullet")
-
-"""/**** SUMMARY ***/ """
-# Adds pieplot of the breakdown of tree benefits.
-# data.make_pp(co2a_dol + co2s_dol, elec_dol, fuel_dol, data.sum_col("Stormwater Managed ($)"),
-#              "CO2", "Electricity", "Fuel", "Water", "Total Benefits in $")
-# document.add_picture("pie.jpg")
-
-doc.save("report.docx")
+class Template():
+    """ Report template that is only parsed once. Every report starts
+        from a fresh copy of its body, so thousands of reports can be
+        made without opening report_ex.docx again. """
+
+    def __init__(self, file):
+        from docx import Document
+
+        self._doc = Document(file)
+        self._body = copy.deepcopy(self._doc.element.body)  # Untouched copy.
+        self._rels = set(self._doc.part.rels)  # e.g. images of the template itself.
+
+    def new(self):
+        """ Returns an empty Report made from the template. """
+
+        self._doc.element.replace(self._doc.element.body, copy.deepcopy(self._body))
+
+        # Drops pictures that the previous report added.
+        for rId in set(self._doc.part.rels) - self._rels:
+            self._doc.part.drop_rel(rId)
+
+        return Report(self._doc.part.document)  # New Document object for the new body.
+
+
+def summary_chart(totals):
+    """ Returns the (kind, values, labels, title) of the summary chart.
+        A pie can't show negative benefits, so those get a bar chart. """
+
+    values = [totals["CO2 Avoided ($)"] + totals["CO2 Sequestered ($)"],
+              totals["Electricity Saved ($)"], totals["Fuel Saved ($)"],
+              totals["Stormwater Managed ($)"]]
+    kind = "pie" if min(values) >= 0 else "bar"
+    return kind, [round(value, 2) for value in values], ["CO2", "Electricity", "Fuel", "Water"], "Total Benefits in $"
+
+
+@tracing.traced("report.write")
+def write_report(doc, totals, now=None, chart=None):
+    """ Writes the results into a report made from report_ex.docx.
+        'totals' maps benefit columns to their sums (see resultstore.py),
+        and 'chart' is the PNG bytes of the summary chart. """
+
+    # Sets Variables.
+    co2a = totals["CO2 Avoided (pounds)"]
+    co2a_dol = totals["CO2 Avoided ($)"]
+    co2s = totals["CO2 Sequestered (pounds)"]
+    co2s_dol = totals["CO2 Sequestered ($)"]
+    elec = totals["Electricity Saved (kWh)"]
+    elec_dol = totals["Electricity Saved ($)"]
+    fuel = totals["Fuel Saved (MMBtu)"]
+    fuel_dol = totals["Fuel Saved ($)"]
+    biomass = totals["Tree Biomass (short ton)"]
+    rain = totals["Rainfall Interception (gallons)"]
+    storm = totals["Stormwater Managed (gallons)"]
+    storm_dol = totals["Stormwater Managed ($)"]
+    o3 = totals["O3 Removed (pounds)"]
+    no2a = totals["NO2 Avoided (pounds)"]
+    no2r= totals["NO2 Removed (pounds)"]
+    so2a = totals["SO2 Avoided (pounds)"]
+    so2r = totals["SO2 Removed (pounds)"]
+    voc = totals["VOC Avoided (pounds)"]
+    pma = totals["PM2.5 Avoided (pounds)"]
+    pmr = totals["PM2.5 Removed (pounds)"]
+
+    # Adds current date.
+    if now is None:
+        now = datetime.datetime.now()
+    doc.fill("date", "%d/%02d/%02d." % (now.year, now.month, now.day), "Bold")  # 2-digit str format.
+
+
+    """/**** CO2 ***/ """
+    # These are specific results. General info is copied from the example file (no need to be recreated).
+    doc.add_at("co2", "With your trees, you will avoid %s pounds of CO2. " % co2a +
+               "This is equivalent to avoiding $%s of CO2." % co2a_dol, "List Bullet")
+    doc.add_at("co2", "Your trees will sequester %s pounds of CO2. " % co2s +
+               "This is equivalent to sequestering $%s of CO2." % co2s_dol, "List Bullet")
+    doc.add_at("co2", "In total, you will save $%s by reducing %s of "
+               % (co2a_dol + co2s_dol, co2a + co2s) + "atmospheric carbon dioxide " +
+               "through CO2 sequestration and decreased energy production needs and emissions.",
+               "List Bullet")
+
+
+    """/**** ENERGY ***/ """
+    doc.add_at("energy", "With your trees, you will save %s kWh of electricity. " % elec +
+               "Your electricity energy savings are $%s." % elec_dol, "List Bullet")
+
+    doc.add_at("energy", "With your trees, you will save %s MMBtu of fuel. " % fuel +
+               "Your fuel savings are $%s." % fuel_dol, "List Bullet")
+
+
+    """/**** ECO ***/ """
+    doc.add_at("eco", "Your trees produce %s short tons of biomass." % biomass, "List Bullet")
+    doc.add_at("eco", "Your trees intercept %s gallons of rainwater." % rain, "List Bullet")
+    doc.add_at("eco", "Your trees manage $%s worth of %s gallons of stormwater."
+               % (storm_dol, storm), "List Bullet")
+
+    """/**** AIR POLLUTION ***/ """
+    doc.add_at("air", "Your trees remove %s pounds of O3, %s pounds of NO2, " % (o3, no2r) +
+               "%s pounds of SO2, and %s pounds of PM2.5." % (so2r, pmr), "List Bullet")
+    doc.add_at("air", "Your trees avoid %s pounds of NO2, %s pounds of SO2, " % (no2a, so2a) +
+               "%s pounds of VOC, and %s pounds of PM2.5." % (voc, pma), "List Bullet")
+
+    """/**** SUMMARY ***/ """
+    # Adds pieplot of the breakdown of tree benefits (see summary_chart).
+    if chart is not None:
+        doc.add_picture_at("summary", chart)
+
+
+def projection_chart(bands):
+    """ Returns the (kind, values, labels, title) of the benefits chart, with
+        the 5th to 95th percentile band of the benefits so far in each year. """
+
+    values = list(bands["p5"]) + list(bands["p50"]) + list(bands["p95"])
+    return "band", [round(value, 2) for value in values], list(bands.index), "Benefits So Far in $"
+
+
+def write_projection(doc, annual, bands, alive, chart=None):
+    """ Adds the yearly benefits (see projection.py) after the summary chart.
+        'annual' is the expected total $ per year, 'bands' the Monte Carlo
+        percentiles of the benefits so far and 'alive' the share of trees
+        alive in each year. """
+
+    years = len(annual)
+    doc.add_at("summary", "Over %d years, your trees will provide about $%s in benefits "
+               % (years, round(annual.sum(), 2)) +
+               "($%s to $%s in 9 out of 10 simulations of tree losses). "
+               % (round(bands["p5"].iloc[-1], 2), round(bands["p95"].iloc[-1], 2)) +
+               "About %d%% of your trees are expected to still be alive after %d years."
+               % (round(100 * alive[-1]), years))
+    if chart is not None:
+        doc.add_picture_at("summary", chart)
+
+
+def write_trend(doc, trend, metric, chart=None):
+    """ Adds the total of one benefit in every archived year (see archive.py). """
+
+    doc.add_at("summary", "%s of your trees, by year: %s." % (metric, ", ".join(
+        "%s in %d" % (round(value, 2), year) for year, value in trend.items())))
+    if chart is not None:
+        doc.add_picture_at("summary", chart)
+
+
+def write_map(doc, picture, trees):
+    """ Adds the map of the trees (PNG bytes from treemap.py) after the summary. """
+
+    doc.add_at("summary", "Your %d trees are shown on the map below." % trees)
+    doc.add_picture_at("summary", picture)
+
+
+"""/**** BATCH MODE: one report per organization. ***/ """
+_template = None  # Template of each worker process.
+
+
+def _start_worker(file):
+    """ Parses the template once per worker process. """
+
+    global _template
+    _template = Template(file)
+
+
+def _render(name, totals, out, now, chart):
+    """ Makes one report and returns (name, seconds). """
+
+    start = time.perf_counter()
+    doc = _template.new()
+    write_report(doc, totals, now, chart)
+    doc.save(out)
+    return name, time.perf_counter() - start
+
+
+def safe_name(name):
+    """ Returns a name that can be used as a file name. """
+
+    return "".join(c if c.isalnum() or c in "-_ " else "_" for c in str(name)).strip() or "report"
+
+
+def batch(table, folder, template="report_ex.docx", processes=None, charts_folder=None):
+    """ Makes one report per row of 'table', a DataFrame indexed by
+        organization (or neighbourhood) with one column per benefit.
+        Returns {name: seconds it took to make that report}. """
+
+    os.makedirs(folder, exist_ok=True)
+    now = datetime.datetime.now()  # Same date on every report.
+    rows = [(name, row.to_dict()) for name, row in table.round(3).iterrows()]
+
+    # Charts first: organizations with the same breakdown share one chart.
+    service = charts.ChartService(processes or os.cpu_count() or 1, charts_folder)
+    try:
+        with tracing.span("report.charts", len(rows)):
+            futures = [service.submit(*summary_chart(totals)) for name, totals in rows]
+            pictures = [future.result() for future in futures]
+    finally:
+        service.close()
+
+    jobs = [(name, totals, os.path.join(folder, safe_name(name) + ".docx"), now, picture)
+            for (name, totals), picture in zip(rows, pictures)]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_start_worker,
+                             initargs=(template,)) as executor, tracing.span("report.batch", len(jobs)):
+        chunk = max(1, len(jobs) // (4 * (processes or os.cpu_count() or 1)))
+        times = dict(executor.map(_render, *zip(*jobs), chunksize=chunk)) if jobs else {}
+
+    return times
+
+
+def timing_stats(times):
+    """ Returns count, mean, median, 95th percentile and max seconds per report. """
+
+    seconds = sorted(times.values())
+    if not seconds:
+        return {"reports": 0}
+    return {"reports": len(seconds),
+            "mean": sum(seconds) / len(seconds),
+            "median": seconds[len(seconds) // 2],
+            "p95": seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))],
+            "max": seconds[-1]}
+
+
+def store_table(store):
+    """ Returns a DataFrame of benefit totals per group of a ResultStore. """
+
+    import pandas as pd
+
+    return pd.DataFrame({group: store.totals(group) for group in store.groups()}).T
+
+
+def main(argv=None):
+    """ Makes report.docx from treeresult.csv, or one report per group
+        of the result store with --batch. """
+
+    parser = argparse.ArgumentParser(description="Generates iTree reports.")
+    parser.add_argument("--batch", metavar="FOLDER", help="makes one report per group into FOLDER")
+    parser.add_argument("--table", help="csv with a group column and benefit columns (default: result store)")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--years", type=int, default=None, help="adds yearly benefits over YEARS years")
+    parser.add_argument("--draws", type=int, default=1000, help="Monte Carlo draws for --years")
+    parser.add_argument("--map", metavar="SHEET", help="adds a map of the trees in SHEET (e.g. tree.xls)")
+    parser.add_argument("--archive", metavar="FOLDER", help="archives this run and adds the trend of --trend")
+    parser.add_argument("--trend", default="CO2 Sequestered (pounds)", choices=resultstore.METRICS,
+                        metavar="METRIC", help="benefit column of the trend chart")
+    parser.add_argument("--organization", default="Sustainable Claremont", help="organization of the archive")
+    parser.add_argument("--sheet", default="tree.xls", help="tree sheet of treeresult.csv, for the archived zones")
+    args = parser.parse_args(argv)
+
+    """/**** Reads CSV Data. ***/ """
+    # Parses the file only the first time, then reuses the stored totals.
+    store = resultstore.ResultStore("results")
+    store.add("treeresult.csv")  # Reads file, skipping three lines.
+
+    if args.batch:
+        if args.table:
+            import pandas as pd
+
+            table = pd.read_csv(args.table, index_col=0)
+        else:
+            table = store_table(store)
+        start = time.perf_counter()
+        times = batch(table, args.batch, processes=args.processes,
+                      charts_folder=os.path.join("results", "charts"))
+        print("Made %d reports in %.2f s" % (len(times), time.perf_counter() - start))
+        print(timing_stats(times))
+        return
+
+
+    """/**** From here, creates REPORT ***/ """
+    # GENERAL INFO SOURCE(S) : Adapted from i-Tree Design Report by Jiin Jeong.
+    doc = Report("report_ex.docx")
+    # document.add_heading("Tree Benefit Report", 0)
+
+    totals = store.totals()
+    service = charts.ChartService(1, os.path.join("results", "charts"))  # Reuses last run's chart.
+    try:
+        chart = service.render(*summary_chart(totals))
+        write_report(doc, totals, chart=chart)
+
+        if args.years:
+            import projection  # Yearly benefits with tree growth and losses.
+
+            # Same trees, spread over the years with growth and tree losses.
+            trees = projection.Projection(projection.from_export("treeresult.csv"),
+                                          projection.load_growth("growth.csv"), args.years)
+            bands = trees.monte_carlo(args.draws, processes=args.processes, cumulative=True)[projection.TOTAL]
+            write_projection(doc, trees.annual()[projection.TOTAL], bands, trees.alive(),
+                             service.render(*projection_chart(bands)))
+
+        if args.archive:
+            import archive  # History of the results (needs pyarrow).
+
+            history = archive.Archive(args.archive)
+            zones = archive.sheet_zones(args.sheet) if os.path.exists(args.sheet) else None
+            history.append(archive.from_export("treeresult.csv", zones=zones), "Claremont", args.organization)
+            trend = history.trend(args.trend, city="Claremont", organization=args.organization)
+            write_trend(doc, trend, args.trend, service.render(*archive.trend_chart(trend, args.trend)))
+    finally:
+        service.close()
+
+    if args.map:
+        import treemap  # Map of the trees.
+
+        index = treemap.TreeIndex(*treemap.load_points(args.map))
+        tiles = treemap.TileRenderer(index, os.path.join("results", "tiles"))  # Only changed tiles are drawn.
+        write_map(doc, tiles.overview(), len(index))
+
+    with tracing.span("report.save"):
+        doc.save("report.docx")
+
+
+if __name__ == '__main__':
+    main()
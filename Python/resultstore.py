@@ -0,0 +1,153 @@
+"""
+ *****************************************************************************
+   FILE :           resultstore.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Keeps iTree results (treeresult.csv, benefits.csv or
+                    merged itreepool.py exports) in a folder of NumPy
+                    column files, so each csv is only parsed once. Totals of
+                    every benefit column are updated when a new batch of
+                    trees is added, overall and per group (e.g. per
+                    organization), so report.py doesn't have to re-read and
+                    re-sum the csv files.
+
+   FILES :          results/batch00001.npy   benefits, one row per column
+                    results/totals.json      totals, groups and sources
+
+ *****************************************************************************
+"""
+
+import json
+import os
+
+import numpy as np
+
+import tracing  # Stage timings.
+from benefits import METRICS, parse_currency
+
+
+def parse(df):
+    """ Renames the weirdly named PM2.5 columns and changes every benefit
+        column into floats, all columns at once. """
+
+    df = df.rename(columns={col: " ".join(col.split()) for col in df.columns})
+    metrics = [col for col in METRICS if col in df.columns]
+    df[metrics] = parse_currency(df, metrics).to_numpy()
+    return df
+
+
+def read_results(file, start=3):
+    """ Reads an iTree export, skipping the 'start' header lines. """
+
+    import pandas as pd
+
+    return parse(pd.read_csv(file, skiprows=start, dtype=str))
+
+
+class ResultStore():
+    """ Folder of benefit columns with running totals. """
+
+    def __init__(self, folder="results"):
+        self._folder = folder
+        self._index = os.path.join(folder, "totals.json")
+        os.makedirs(folder, exist_ok=True)
+
+        if os.path.exists(self._index):
+            with open(self._index) as fp:
+                self._state = json.load(fp)
+        else:
+            self._state = {"rows": 0, "totals": dict.fromkeys(METRICS, 0.0),
+                           "groups": {}, "batches": [], "sources": {}, "last": 0}
+
+    def _save(self):
+        """ Writes totals.json through a temporary file so a crash can't corrupt it. """
+
+        temp = self._index + ".tmp"
+        with open(temp, "w") as fp:
+            json.dump(self._state, fp, indent=1)
+        os.replace(temp, self._index)
+
+    def add(self, file, group="", start=3):
+        """ Adds the trees of a result csv unless the same file (same size and
+            modification time) was added before. Returns the number of rows added. """
+
+        stat = os.stat(file)
+        source = os.path.abspath(file)
+        signature = [stat.st_mtime, stat.st_size, group]
+        if self._state["sources"].get(source) == signature:
+            return 0
+
+        self.remove(source)  # The file changed since it was added.
+        with tracing.span("ingest.read_results", file=os.path.basename(file)) as span:
+            df = read_results(file, start)
+            span.add(len(df))
+        return self.add_frame(df, group, source, signature)
+
+    def remove(self, source):
+        """ Takes the batches of a source file out of the totals. """
+
+        keep = []
+        for batch in self._state["batches"]:
+            if batch.get("source") != source:
+                keep.append(batch)
+                continue
+
+            for metric, value in zip(METRICS, batch["sums"]):
+                self._state["totals"][metric] -= value
+                self._state["groups"][batch["group"]][metric] -= value
+            self._state["rows"] -= batch["rows"]
+            os.remove(os.path.join(self._folder, batch["file"]))
+
+        self._state["batches"] = keep
+        self._state["sources"].pop(source, None)
+
+    def add_frame(self, df, group="", source=None, signature=None):
+        """ Adds the trees of a DataFrame with benefit columns. """
+
+        values = df.reindex(columns=METRICS).to_numpy(float)  # Missing columns become NaN.
+        self._state["last"] += 1
+        name = "batch%05d.npy" % self._state["last"]
+        np.save(os.path.join(self._folder, name), np.ascontiguousarray(values.T))  # One row per column.
+
+        sums = np.nansum(values, axis=0)  # Every metric in one pass.
+        totals = self._state["totals"]
+        group_totals = self._state["groups"].setdefault(group, dict.fromkeys(METRICS, 0.0))
+        for metric, value in zip(METRICS, sums):
+            totals[metric] += float(value)
+            group_totals[metric] += float(value)
+
+        self._state["rows"] += len(values)
+        self._state["batches"].append({"file": name, "group": group, "rows": len(values),
+                                       "source": source, "sums": [float(value) for value in sums]})
+        if source is not None:
+            self._state["sources"][source] = signature
+        self._save()
+        return len(values)
+
+    def rows(self):
+        """ Returns the number of trees in the store. """
+
+        return self._state["rows"]
+
+    def totals(self, group=None, digits=3):
+        """ Returns {metric: total}, for every tree or for one group. """
+
+        totals = self._state["totals"] if group is None else self._state["groups"][group]
+        return {metric: round(value, digits) for metric, value in totals.items()}
+
+    def groups(self):
+        """ Returns the names of the groups in the store. """
+
+        return list(self._state["groups"])
+
+    def column(self, metric, group=None):
+        """ Returns every value of one benefit column. Batches are memory
+            mapped, so only that column is read from disk. """
+
+        j = METRICS.index(metric)
+        parts = [np.load(os.path.join(self._folder, batch["file"]), mmap_mode="r")[j]
+                 for batch in self._state["batches"] if group is None or batch["group"] == group]
+        return np.concatenate(parts) if parts else np.empty(0)
@@ -0,0 +1,399 @@
+"""
+ *****************************************************************************
+   FILE :           service.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Small HTTP service (asyncio, no web framework) that
+                    answers benefit questions from memory, so report jobs
+                    and spreadsheets can ask it instead of each reading the
+                    csv files again. Everything is loaded once at startup:
+                    the coefficient table and mappings (benefits.py,
+                    normalize.py), the result store (resultstore.py, the
+                    same totals csvData gives), and the benefit totals of
+                    every zone (zones.py). Computed answers are kept in an
+                    LRU cache (only totals: "detail" answers have a row per
+                    tree and are not kept), and bulk benefit computations
+                    run in worker processes so the event loop keeps
+                    answering.
+
+                    GET  /health
+                    GET  /metrics               requests, p50/p99 latency,
+                                                requests per second, caches
+                    GET  /totals                every tree of the results
+                    GET  /organizations[/NAME]  result store groups
+                    GET  /zones[/NAME]          hexagon zones of the sheet
+                    GET  /tree?species=..&distance=..&direction=..&dbh=..
+                    POST /trees                 {"trees": [{"species": ..,
+                                                "distance": .., "direction":
+                                                .., "dbh": ..}, ...],
+                                                "detail": false}
+
+                    Species, distance and direction can be sheet values
+                    ("Quercus rubra", "20'-40'", "N") or iTree values.
+
+   USAGE :          python service.py --port 8080
+                    python loadtest.py   (see loadtest.py)
+
+ *****************************************************************************
+"""
+
+import argparse
+import asyncio
+import hashlib  # Cache keys of bulk requests.
+import json
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor  # Bulk benefit computations.
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+import benefits
+import normalize
+from benefits import METRICS
+
+
+REGION = ("California", "Los Angeles", "Claremont")
+MAX_BODY = 16 * 1024 * 1024  # Largest POST body in bytes.
+MAX_TREES = 100000  # Most trees in one POST.
+WINDOW = 60.0  # Seconds of requests per second.
+
+
+class LRU():
+    """ Least recently used cache of computed answers. """
+
+    def __init__(self, size=1024):
+        self._items = OrderedDict()
+        self._size = size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self._size:
+            self._items.popitem(last=False)
+
+    def stats(self):
+        return {"entries": len(self._items), "size": self._size, "hits": self.hits, "misses": self.misses}
+
+
+class Metrics():
+    """ Latency of the last requests of every route, and requests per second. """
+
+    def __init__(self, keep=10000):
+        self._keep = keep
+        self._latency = {}  # route -> deque of seconds.
+        self._counts = {}  # route -> [requests, errors]
+        self._times = deque()  # End time of the requests in the last WINDOW seconds.
+        self._start = time.monotonic()
+
+    def record(self, route, seconds, status):
+        self._latency.setdefault(route, deque(maxlen=self._keep)).append(seconds)
+        counts = self._counts.setdefault(route, [0, 0])
+        counts[0] += 1
+        counts[1] += status >= 500
+        now = time.monotonic()
+        self._times.append(now)
+        while self._times and self._times[0] < now - WINDOW:
+            self._times.popleft()
+
+    def snapshot(self):
+        """ Returns the numbers of every route and of all of them together. """
+
+        def numbers(values, requests, errors):
+            ms = np.asarray(values) * 1000
+            return {"requests": requests, "errors": errors,
+                    "p50_ms": round(float(np.percentile(ms, 50)), 3) if len(ms) else None,
+                    "p99_ms": round(float(np.percentile(ms, 99)), 3) if len(ms) else None}
+
+        routes = {route: numbers(values, *self._counts[route]) for route, values in self._latency.items()}
+        every = [value for values in self._latency.values() for value in values]
+        total = numbers(every, sum(c[0] for c in self._counts.values()), sum(c[1] for c in self._counts.values()))
+        uptime = time.monotonic() - self._start
+        total["per_second"] = round(len(self._times) / max(1e-9, min(WINDOW, uptime)), 1)
+        total["uptime_s"] = round(uptime, 1)
+        return {"all": total, "routes": routes}
+
+
+class HTTPError(Exception):
+    """ Error answer with a status code. """
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+def check_trees(trees):
+    """ Raises a 400 HTTPError unless every tree is an object whose dbh (if
+        given) is a number, the same for GET /tree and POST /trees. """
+
+    for i, tree in enumerate(trees):
+        if not isinstance(tree, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Tree %d must be an object." % i)
+        try:
+            float(tree.get("dbh", benefits.DEFAULT_DBH))
+        except (TypeError, ValueError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "dbh of tree %d must be a number." % i)
+
+
+"""/**** WORKERS ***/ """
+_table = None
+_names = None
+
+
+def _start_worker(coefficients, region, mappings):
+    """ Loads the coefficient table and mappings once per worker process. """
+
+    global _table, _names
+    _table = benefits.load_table(coefficients, *region)
+    _names = normalize.Normalizer(mappings, record=False)  # Client values are not counted.
+
+
+def _frame(trees, names):
+    """ Returns a DataFrame of request trees in iTree values. """
+
+    import pandas as pd
+
+    frame = pd.DataFrame({"Species": [str(tree.get("species", "")) for tree in trees],
+                          "DBH": [tree.get("dbh", benefits.DEFAULT_DBH) for tree in trees],
+                          "Distance": [str(tree.get("distance", "")) for tree in trees],
+                          "Direction": [str(tree.get("direction", "")) for tree in trees]})
+    return names.frame(frame)
+
+
+def compute(trees, table=None, names=None):
+    """ Returns the benefits of request trees, shape (trees, metrics). Trees
+        that can't be computed are NaN. Runs in the workers. """
+
+    return (table or _table).compute(_frame(trees, names or _names))
+
+
+def _answer(values, detail):
+    """ Returns the JSON answer of computed benefits. """
+
+    unknown = np.isnan(values).all(axis=1) if len(values) else np.zeros(0, bool)
+    answer = {"trees": len(values), "unknown": int(unknown.sum()),
+              "totals": {metric: round(float(total), 3) for metric, total in zip(METRICS, np.nansum(values, axis=0))}}
+    if detail:
+        answer["benefits"] = [None if skip else [round(float(value), 3) for value in row]
+                              for row, skip in zip(values, unknown)]
+    return answer
+
+
+"""/**** SERVICE ***/ """
+class BenefitService():
+    """ Benefit answers from indexes kept in memory. """
+
+    def __init__(self, coefficients="coefficients.csv", mappings="mappings.csv", region=REGION,
+                 results="treeresult.csv", group="Claremont", sheet="tree.xls", store="results",
+                 zone_size=500, processes=None, cache_size=4096):
+        self._table = benefits.load_table(coefficients, *region)
+        self._names = normalize.Normalizer(mappings, record=False)  # Client values are not counted.
+        self._cache = LRU(cache_size)
+        self.metrics = Metrics()
+
+        import resultstore
+        self._store = resultstore.ResultStore(store)
+        if results:
+            self._store.add(results, group)
+        self._zones = self._zone_index(sheet, results, zone_size) if sheet and results else {}
+
+        self._executor = ProcessPoolExecutor(max_workers=processes, initializer=_start_worker,
+                                             initargs=(coefficients, region, mappings))
+
+    def _zone_index(self, sheet, results, size):
+        """ Returns {zone: totals} of the trees of a sheet and its results. """
+
+        import zones
+        from resultstore import read_results
+
+        trees = zones.load_trees(sheet)
+        values = read_results(results)
+        if len(trees) != len(values):
+            print("%s and %s don't have the same trees, no zones." % (sheet, results))
+            return {}
+        table = zones.zone_totals(zones.hex_grid(trees["Longitude"], trees["Latitude"], size), values[METRICS])
+        return {zone: {key: round(float(value), 3) for key, value in row.items()}
+                for zone, row in table.iterrows()}
+
+    async def dispatch(self, method, target, body):
+        """ Returns (route, answer) of one request. """
+
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip("/").split("/") if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        head = parts[0] if parts else ""
+
+        if method == "POST" and parts == ["trees"]:
+            return "POST /trees", await self.bulk(body)
+        if method != "GET":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Only GET and POST /trees.")
+
+        if head == "health":
+            return "GET /health", {"status": "ok"}
+        if head == "metrics":
+            return "GET /metrics", dict(self.metrics.snapshot(), cache=self._cache.stats())
+        if head == "totals":
+            return "GET /totals", self._store.totals()
+        if head == "organizations":
+            if len(parts) == 1:
+                return "GET /organizations", self._store.groups()
+            if parts[1] not in self._store.groups():
+                raise HTTPError(HTTPStatus.NOT_FOUND, "No organization %s." % parts[1])
+            return "GET /organizations/{name}", self._store.totals(parts[1])
+        if head == "zones":
+            if len(parts) == 1:
+                return "GET /zones", sorted(self._zones)
+            if parts[1] not in self._zones:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "No zone %s." % parts[1])
+            return "GET /zones/{name}", self._zones[parts[1]]
+        if head == "tree":
+            return "GET /tree", self.tree(query)
+        raise HTTPError(HTTPStatus.NOT_FOUND, "No page %s." % url.path)
+
+    def tree(self, query):
+        """ Benefits of one tree, cached ("unknown" is 1 if the tree can't be
+            computed). """
+
+        tree = {"species": query.get("species", ""), "distance": query.get("distance", ""),
+                "direction": query.get("direction", ""), "dbh": query.get("dbh", benefits.DEFAULT_DBH)}
+        key = ("tree",) + tuple(tree.values())
+        answer = self._cache.get(key)
+        if answer is None:
+            check_trees([tree])
+            answer = _answer(compute([tree], self._table, self._names), False)
+            self._cache.put(key, answer)
+        return answer
+
+    async def bulk(self, body):
+        """ Benefits of many trees, computed in a worker process. Answers
+            with a row per tree ("detail") are not cached. """
+
+        key = ("trees", hashlib.sha1(body).hexdigest())
+        answer = self._cache.get(key)
+        if answer is not None:
+            return answer
+
+        try:
+            request = json.loads(body)
+            trees = request["trees"]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Send {"trees": [...]} as JSON.')
+        if not isinstance(trees, list) or len(trees) > MAX_TREES:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'trees' must be a list of at most %d trees." % MAX_TREES)
+        check_trees(trees)
+
+        loop = asyncio.get_running_loop()
+        values = await loop.run_in_executor(self._executor, compute, trees)
+        detail = bool(request.get("detail"))
+        answer = _answer(values, detail)
+        if not detail:  # Up to MAX_TREES rows would stay in memory.
+            self._cache.put(key, answer)
+        return answer
+
+    async def handle(self, reader, writer):
+        """ Answers the requests of one connection (keep-alive). """
+
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                start = time.perf_counter()
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {name.strip().lower(): value.strip()
+                           for name, _, value in (line.partition(":") for line in lines[1:] if line)}
+                keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                route = "%s ?" % method
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY:
+                        keep = False
+                        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body is too large.")
+                    body = await reader.readexactly(length) if length else b""
+                    route, answer = await self.dispatch(method, target, body)
+                    status = HTTPStatus.OK
+                except HTTPError as err:
+                    status, answer = HTTPStatus(err.status), {"error": str(err)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as err:  # Keeps the service up; the error goes to the client.
+                    status, answer = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(err)}
+
+                data = json.dumps(answer).encode("utf-8")
+                writer.write(("HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n"
+                              "Connection: %s\r\n\r\n" % (status.value, status.phrase, len(data),
+                                                          "keep-alive" if keep else "close")).encode("latin-1"))
+                writer.write(data)
+                await writer.drain()
+                self.metrics.record(route, time.perf_counter() - start, status.value)
+                if not keep:
+                    break
+        except asyncio.CancelledError:  # The loop is stopping with the connection still open.
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """ Starts the workers and listens. Returns the asyncio server (port 0
+            picks a free one). """
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, compute, [])
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_BODY)
+
+    def close(self):
+        self._executor.shutdown()
+
+
+async def serve(service, host, port):
+    server = await service.start(host, port)
+    print("Listening on http://%s:%d/" % server.sockets[0].getsockname()[:2])
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    """ Runs the service until it is stopped (Ctrl+C). """
+
+    parser = argparse.ArgumentParser(description="Answers benefit questions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--results", default="treeresult.csv")
+    parser.add_argument("--group", default="Claremont", help="organization of the results")
+    parser.add_argument("--sheet", default="tree.xls", help="tree sheet of the results, for zones")
+    parser.add_argument("--store", default="results", help="result store folder")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    service = BenefitService(results=args.results, group=args.group, sheet=args.sheet, store=args.store,
+                             processes=args.processes)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+ *****************************************************************************
+   FILE :           sheetreader.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Reads tree and contact sheets one row at a time from
+                    .xls, .xlsx or .csv files, so big inventories don't have
+                    to fit in memory. Each row also says if it is struck
+                    through (the strikethrough check from itree.py), which
+                    works for both .xls and .xlsx now.
+                    Used by itree.py, contact.py, treespecies.py and
+                    benefits.py.
+
+   NOTES :          .xlsx and .csv are streamed. xlrd always loads a whole
+                    .xls sheet, but .xls sheets can't have more than 65,536
+                    rows, so memory stays bounded there too.
+
+ *****************************************************************************
+"""
+
+import csv
+import os
+from collections import namedtuple
+
+
+# Columns of the tree sheet (see tree.xls).
+TreeRecord = namedtuple("TreeRecord", ["row", "number", "species", "address", "city",
+                                       "longitude", "latitude", "stock", "direction",
+                                       "distance", "struck"])
+
+# Columns of the contact sheet, found by header name (see contact_list.xlsx).
+ContactRecord = namedtuple("ContactRecord", ["row", "name", "email", "phone", "preferred", "location",
+                                             "trees"])
+CONTACT_HEADERS = {"name": "Name", "email": "E-mail", "phone": "Phone", "preferred": "Preferred",
+                   "location": "Location",  # Yahoo WOEID.
+                   "trees": "Trees"}  # Tree # of their trees, e.g. "12, 15".
+
+
+def _xls_rows(file, sheet, start):
+    """ Rows of an .xls file. Only the font of each cell format is checked. """
+
+    import xlrd  # Library for reading data and formatting info from Excel.
+
+    workbook = xlrd.open_workbook(file, formatting_info=True, on_demand=True)
+    try:
+        # Formats whose font is struck through. Only their indexes are kept.
+        struck = {i for i, xf in enumerate(workbook.xf_list)
+                  if workbook.font_list[xf.font_index].struck_out}
+
+        data = workbook.sheet_by_index(sheet)
+        for i in range(start, data.nrows):
+            # Checks first data cell (species) for strikethrough, like itree.py.
+            is_struck = data.ncols > 1 and data.cell_xf_index(i, 1) in struck
+            yield i, data.row_values(i), is_struck
+
+    finally:
+        workbook.release_resources()
+
+
+def _xlsx_rows(file, sheet, start):
+    """ Rows of an .xlsx file, streamed in read-only mode. """
+
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file, read_only=True)
+    try:
+        data = workbook.worksheets[sheet]
+        for i, cells in enumerate(data.iter_rows(min_row=start + 1), start):
+            values = [cell.value for cell in cells]
+            font = getattr(cells[1], "font", None) if len(cells) > 1 else None  # Blank cells have no font.
+            yield i, values, bool(font is not None and font.strike)
+
+    finally:
+        workbook.close()
+
+
+def _csv_rows(file, sheet, start):
+    """ Rows of a .csv file. Text files can't have strikethrough. """
+
+    with open(file, newline="", encoding="utf-8-sig") as fp:
+        for i, values in enumerate(csv.reader(fp)):
+            if i >= start:
+                yield i, values, False
+
+
+READERS = {".xls": _xls_rows, ".xlsx": _xlsx_rows, ".xlsm": _xlsx_rows, ".csv": _csv_rows}
+
+
+def rows(file, start=0, sheet=0):
+    """ Yields (row index, list of cell values, struck through) for every
+        row from 'start' (0 is the first row, like xlrd). """
+
+    extension = os.path.splitext(file)[1].lower()
+    if extension not in READERS:
+        raise ValueError("Can't read %s: only .xls, .xlsx and .csv files." % file)
+
+    for i, values, struck in READERS[extension](file, sheet, start):
+        yield i, ["" if value is None else value for value in values], struck
+
+
+def text(value):
+    """ Returns the cell as text. Whole numbers lose their '.0'. """
+
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def number(value):
+    """ Returns the cell as a float, or None for blank, 'N/A' or text. """
+
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def trees(file, start=3, sheet=0):
+    """ Yields a TreeRecord for every row of a tree sheet.
+        Skips the three header rows by default. """
+
+    for i, values, struck in rows(file, start, sheet):
+        values = values + [""] * (13 - len(values))  # Short csv rows.
+        yield TreeRecord(row=i,
+                         number=number(values[0]),  # Tree #.
+                         species=text(values[1]),
+                         address=text(values[2]),
+                         city=text(values[3]),
+                         longitude=number(values[4]),
+                         latitude=number(values[5]),
+                         stock=text(values[9]),  # Stock size.
+                         direction=text(values[11]),
+                         distance=text(values[12]),
+                         struck=struck)
+
+
+def contacts(file, sheet=0):
+    """ Yields a ContactRecord for every row after the header row.
+        Columns are found by their header, so their order doesn't matter. """
+
+    header = None
+    for i, values, struck in rows(file, 0, sheet):
+        if header is None:
+            header = [text(value).strip() for value in values]
+            columns = {field: header.index(name) if name in header else None
+                       for field, name in CONTACT_HEADERS.items()}
+            continue
+
+        fields = {field: text(values[column]) if column is not None and column < len(values) else ""
+                  for field, column in columns.items()}
+        if any(fields.values()):  # Skips blank rows.
+            yield ContactRecord(row=i, **fields)
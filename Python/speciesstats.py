@@ -0,0 +1,286 @@
+"""
+ *****************************************************************************
+   FILE :           speciesstats.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Species counts of many tree sheets at once (one per city
+                    or organization), instead of listing the species of one
+                    sheet like treespecies.py. Sheets are read in parallel,
+                    each one gives its counts per species, zone (hexagon of
+                    the zones.py grid) and stock size class, and the counts
+                    are kept per sheet in a SQLite file. A rerun only reads
+                    the sheets that are new or changed (size or date), and
+                    drops the ones that were deleted from the scanned files
+                    or folders. Sheets of other runs (other folders) stay.
+
+                    From the counts: frequency tables, the Shannon index of
+                    the species, and the 10/20/30 rule (no species over 10%
+                    of the trees, no genus over 20%, no family over 30%).
+                    Genus is the first word of the species name; families
+                    come from families.csv.
+
+   USAGE :          python speciesstats.py sheets/ --out species_counts.csv
+
+ *****************************************************************************
+"""
+
+import argparse
+import glob
+import math
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor  # Reads sheets in parallel.
+
+import numpy as np
+
+import inventory  # Trees of the sheet as arrays.
+import zones  # Hexagon grid.
+
+
+UNKNOWN = "(unknown)"
+SIZES = ["5 gal or less", "15 gal", "24 in box", "36 in box or more", UNKNOWN]  # Stock size classes.
+LIMITS = {"Species": 0.10, "Genus": 0.20, "Family": 0.30}  # 10/20/30 rule.
+MIDDLE = 34.0967  # Latitude of the grid (Claremont), the same for every sheet.
+EXTENSIONS = (".xls", ".xlsx", ".csv")
+
+STOCK_RE = re.compile(r"(?P<number>\d+(?:\.\d+)?)\s*(?P<unit>gal|g\b|in|\"|'')", re.IGNORECASE)
+
+
+def size_class(stock):
+    """ Returns the size class of a Stock Size cell ("15 gal", "24 in box"). """
+
+    found = STOCK_RE.search(str(stock))
+    if found is None:
+        return UNKNOWN
+    number = float(found.group("number"))
+    if found.group("unit").lower() in ("gal", "g"):
+        return SIZES[0] if number <= 5 else SIZES[1] if number <= 15 else SIZES[2]
+    return SIZES[2] if number < 36 else SIZES[3]  # Box sizes in inches.
+
+
+def species_name(text):
+    """ Returns a species name without extra spaces ("Quercus rubra " is
+        "Quercus rubra"). """
+
+    return " ".join(str(text).split())
+
+
+def genus(species):
+    """ Returns the genus (first word) of a species name. """
+
+    words = species.split()
+    return words[0].capitalize() if words else UNKNOWN
+
+
+def count_sheet(file, size=1000, middle=MIDDLE):
+    """ Returns (file, [(species, zone, size class, trees)]) of one sheet.
+        Struck out and blank rows are not counted. Runs in the workers. """
+
+    import pandas as pd
+
+    trees = inventory.load_sheet(file)
+    keep = ~trees.struck() & ~trees.blank()
+    data = trees.data[keep]
+
+    # One name and class per distinct sheet value, then codes per tree.
+    names = np.array([species_name(name) for name in trees.categories("species")], dtype=object)
+    classes = np.array([size_class(stock) for stock in trees.categories("stock")], dtype=object)
+    cells = zones.hex_grid(np.where(trees.located()[keep], data["longitude"], np.nan), data["latitude"],
+                           size, middle)
+
+    frame = pd.DataFrame({"Species": names[data["species"]], "Zone": cells, "Size": classes[data["stock"]]})
+    counts = frame.value_counts(sort=False)
+    return file, [key + (int(count),) for key, count in counts.items()]
+
+
+def signature(file):
+    """ Returns what tells if a sheet changed since the last run. """
+
+    info = os.stat(file)
+    return "%d|%d" % (info.st_size, info.st_mtime_ns)
+
+
+class SpeciesSummary():
+    """ Species counts of every sheet, kept in a SQLite file. """
+
+    def __init__(self, file="species_summary.sqlite", size=1000, middle=MIDDLE):
+        self._db = sqlite3.connect(file)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sheets (file TEXT PRIMARY KEY, signature TEXT, trees INTEGER)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS counts (file TEXT, species TEXT, zone TEXT, size TEXT, "
+                         "trees INTEGER)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS counts_file ON counts (file)")
+
+        # Counts of another grid can't be merged: every sheet is read again.
+        settings = "%g|%g" % (size, middle)
+        if dict(self._db.execute("SELECT key, value FROM meta")).get("grid") != settings:
+            with self._db:
+                for table in ("meta", "sheets", "counts"):
+                    self._db.execute("DELETE FROM %s" % table)
+                self._db.execute("INSERT INTO meta VALUES ('grid', ?)", (settings,))
+
+        self._size = size
+        self._middle = middle
+
+    def stale(self, files, paths=()):
+        """ Returns (new or changed sheets, sheets that are gone). A sheet is
+            only gone if it was under one of the scanned 'paths' (files or
+            folders) and is no longer on disk; sheets of other runs stay. """
+
+        known = dict(self._db.execute("SELECT file, signature FROM sheets"))
+        files = [os.path.abspath(file) for file in files]
+        changed = [file for file in files if known.get(file) != signature(file)]
+        scanned = [os.path.abspath(path) for path in paths]
+        gone = sorted(file for file in set(known) - set(files)
+                      if not os.path.exists(file) and any(_inside(file, path) for path in scanned))
+        return changed, gone
+
+    def update(self, files, processes=None, paths=()):
+        """ Reads the new and changed sheets in a process pool and drops the
+            ones that are gone (see stale). Returns (sheets read, sheets
+            dropped). """
+
+        changed, gone = self.stale(files, paths)
+        with self._db:
+            for file in gone:
+                self._forget(file)
+
+        if changed:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = executor.map(count_sheet, changed, [self._size] * len(changed),
+                                       [self._middle] * len(changed))
+                for file, rows in results:  # Saved as they come in.
+                    with self._db:
+                        self._forget(file)
+                        self._db.executemany("INSERT INTO counts VALUES (?, ?, ?, ?, ?)",
+                                             [(file,) + row for row in rows])
+                        self._db.execute("INSERT INTO sheets VALUES (?, ?, ?)",
+                                         (file, signature(file), sum(row[-1] for row in rows)))
+
+        return len(changed), len(gone)
+
+    def _forget(self, file):
+        self._db.execute("DELETE FROM counts WHERE file = ?", (file,))
+        self._db.execute("DELETE FROM sheets WHERE file = ?", (file,))
+
+    def counts(self, families=None):
+        """ Returns the counts of every sheet together: Species, Genus,
+            Family, Zone, Size and Trees. """
+
+        import pandas as pd
+
+        frame = pd.read_sql_query("SELECT species AS Species, zone AS Zone, size AS Size, SUM(trees) AS Trees "
+                                  "FROM counts GROUP BY species, zone, size", self._db)
+        frame.insert(1, "Genus", frame["Species"].map(genus))
+        frame.insert(2, "Family", frame["Genus"].map(families or {}).fillna(UNKNOWN))
+        return frame
+
+    def sheets(self):
+        """ Returns {sheet: trees counted}. """
+
+        return dict(self._db.execute("SELECT file, trees FROM sheets ORDER BY file"))
+
+    def close(self):
+        self._db.close()
+
+
+def load_families(file="families.csv"):
+    """ Returns {genus: family}. """
+
+    import pandas as pd
+
+    frame = pd.read_csv(file)
+    return dict(zip(frame["Genus"], frame["Family"]))
+
+
+def table(counts, rows="Species", columns="Size"):
+    """ Returns a frequency table (e.g. species x size class). """
+
+    return counts.pivot_table(index=rows, columns=columns, values="Trees", aggfunc="sum", fill_value=0)
+
+
+def shannon(trees):
+    """ Returns the Shannon index (H) and evenness (H / ln of the number of
+        species) of tree counts per species. """
+
+    trees = np.asarray(trees, float)
+    trees = trees[trees > 0]
+    if len(trees) == 0:
+        return 0.0, 0.0
+    share = trees / trees.sum()
+    index = float(-(share * np.log(share)).sum())
+    return index, index / math.log(len(trees)) if len(trees) > 1 else 0.0
+
+
+def rule_10_20_30(counts):
+    """ Returns the largest species, genus and family with their share of
+        the trees and whether they are under the 10/20/30 limits. """
+
+    import pandas as pd
+
+    total = counts["Trees"].sum()
+    rows = []
+    for level, limit in LIMITS.items():
+        shares = counts.groupby(level)["Trees"].sum() / total if total else pd.Series(dtype=float)
+        largest = shares.idxmax() if len(shares) else UNKNOWN
+        share = float(shares.max()) if len(shares) else 0.0
+        rows.append({"Level": level, "Largest": largest, "Share": round(share, 4), "Limit": limit,
+                     "Passes": share <= limit})
+    return pd.DataFrame(rows).set_index("Level")
+
+
+def _inside(file, path):
+    """ Checks if 'file' is 'path' or in the folder 'path' (both absolute). """
+
+    return file == path or file.startswith(path.rstrip(os.sep) + os.sep)
+
+
+def sheet_files(paths):
+    """ Returns the tree sheets in a list of files and folders. """
+
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found += sorted(file for file in glob.glob(os.path.join(path, "**", "*"), recursive=True)
+                            if file.lower().endswith(EXTENSIONS))
+        else:
+            found.append(path)
+    return found
+
+
+def main(argv=None):
+    """ Updates the species counts of the sheets and prints the diversity. """
+
+    parser = argparse.ArgumentParser(description="Species counts and diversity of many tree sheets.")
+    parser.add_argument("paths", nargs="*", default=["tree.xls"], help="tree sheets or folders of them")
+    parser.add_argument("--db", default="species_summary.sqlite")
+    parser.add_argument("--size", type=float, default=1000, help="zone (hexagon) size in meters")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--out", help="writes the species x zone x size counts to a csv")
+    args = parser.parse_args(argv)
+
+    summary = SpeciesSummary(args.db, args.size)
+    try:
+        read, dropped = summary.update(sheet_files(args.paths), args.processes, args.paths)
+        print("Read %d sheets, dropped %d, %d sheets in the summary" % (read, dropped, len(summary.sheets())))
+        counts = summary.counts(load_families())
+    finally:
+        summary.close()
+
+    if args.out:
+        counts.to_csv(args.out, index=False)
+
+    species = counts.groupby("Species")["Trees"].sum().sort_values(ascending=False)
+    print(species.to_string())
+    print("\nTrees per family and size class:\n%s" % table(counts, "Family").to_string())
+    index, evenness = shannon(species)
+    print("\n%d trees, %d species, Shannon index %.3f, evenness %.3f" % (species.sum(), len(species), index, evenness))
+    print(rule_10_20_30(counts).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+ *****************************************************************************
+   FILE :           test_changes.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Regression tests of changes.py: rows are redone when
+                    mappings.csv changes, and the reports of zones left
+                    without trees are deleted.
+
+   USAGE :          python -m unittest test_changes   (from Python/)
+
+ *****************************************************************************
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import changes
+import sheetreader
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEADER = "Synthetic tree sheet\nGrant Number:\n"
+COLUMNS = ("Tree #,Species,Address,City,Y  Coordinate,X Coordinate,Census Tract,DAC Status,"
+           "Date Planted,Stock Size,Grow Space,Tree direction,Tree distance\n")
+
+
+def tree(number, species, longitude=-117.7195, latitude=34.0967):
+    return sheetreader.TreeRecord(row=number + 2, number=number, species=species, address="", city="",
+                                  longitude=longitude, latitude=latitude, stock="15 gal",
+                                  direction="SW", distance="40'-60'", struck=False)
+
+
+def write_sheet(file, trees):
+    with open(file, "w", encoding="utf-8") as fp:
+        fp.write(HEADER + COLUMNS)
+        for number, species, longitude, latitude in trees:
+            fp.write("%d,%s,,,%s,%s,,,,15 gal,,SW,40'-60'\n" % (number, species, longitude, latitude))
+
+
+class ChangesTest(unittest.TestCase):
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        os.chdir(HERE)  # mappings.csv, coefficients.csv and report_ex.docx.
+        self._temp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        shutil.rmtree(self._temp)
+
+    def test_new_mapping_counts_the_row(self):
+        mappings = os.path.join(self._temp, "mappings.csv")
+        shutil.copy("mappings.csv", mappings)
+        db = os.path.join(self._temp, "rows.sqlite")
+        trees = changes.keyed([tree(1, "Lagerstroemia indica"), tree(2, "Arbor imaginaria")])
+
+        def run(mappings):
+            index = changes.RowIndex(db, inputs=changes.benefit_inputs(mappings))
+            try:
+                found = index.diff(trees)
+                index.apply(found, trees, changes.local_benefits(mappings))
+                return found, int(index.zone_table()["Trees"].sum())
+            finally:
+                index.close()
+
+        found, counted = run(mappings)
+        self.assertEqual((len(found.new), counted), (2, 1))  # The made-up species isn't mapped yet.
+
+        found, counted = run(mappings)
+        self.assertEqual((len(found.unchanged), counted), (2, 1))
+
+        added = os.path.join(self._temp, "mappings2.csv")  # normalize.load keeps a file once read.
+        shutil.copy(mappings, added)
+        with open(added, "a", encoding="utf-8") as fp:
+            fp.write('species,Arbor imaginaria,"Crapemyrtle"\n')
+        found, counted = run(added)
+        self.assertEqual((len(found.changed), counted), (2, 2))
+
+    def test_emptied_zone_loses_its_report(self):
+        sheet = os.path.join(self._temp, "trees.csv")
+        db = os.path.join(self._temp, "rows.sqlite")
+        reports = os.path.join(self._temp, "reports")
+        far = (2, "Lagerstroemia indica", -117.40, 34.40)
+        write_sheet(sheet, [(1, "Lagerstroemia indica", -117.7195, 34.0967), far])
+        changes.main(["--file", sheet, "--db", db, "--reports", reports])
+        self.assertEqual(len(os.listdir(reports)), 2)
+
+        write_sheet(sheet, [(1, "Lagerstroemia indica", -117.7195, 34.0967)])
+        changes.main(["--file", sheet, "--db", db, "--reports", reports])
+        self.assertEqual(len(os.listdir(reports)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
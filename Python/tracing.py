@@ -0,0 +1,309 @@
+"""
+ *****************************************************************************
+   FILE :           tracing.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Where the time of a run goes, the same way for every
+                    script. Code marks its stages with spans and counts what
+                    it did:
+
+                        with tracing.span("report.read_file") as span:
+                            ...
+                            span.add(len(rows))  # Items, for throughput.
+                        tracing.count("submit.rows.skipped", skipped)
+
+                        @tracing.traced("report.add_after")
+                        def add_after(self, index, text, style="Normal"):
+
+                    Every span name gets calls, total and max seconds, items
+                    and items per second, and (with memory on) the highest
+                    traced memory while it ran. Spans can also go to a
+                    JSON-lines file as they end, and everything can be read
+                    from a local Prometheus endpoint (/metrics).
+
+                    Without configure() the numbers are only kept in memory,
+                    which costs a clock read per span. cli.py turns the rest
+                    on: --trace FILE, --memory, --metrics-port PORT and
+                    --profile FILE (cProfile of the whole command).
+
+   NOTES :          Memory peaks come from tracemalloc, which is process
+                    wide: a span's peak is the highest traced memory since
+                    the outermost open span started, so nested and parallel
+                    spans share it. Spans in worker processes are not seen.
+
+ *****************************************************************************
+"""
+
+import functools
+import io
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource  # Max RSS (not on Windows).
+except ImportError:
+    resource = None
+
+
+PREFIX = "tree"  # Prometheus metric names.
+
+
+class Span():
+    """ One timed stage. 'add' counts the items it handled. """
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.items = 0
+
+    def add(self, items=1):
+        self.items += items
+
+
+class Tracer():
+    """ Spans and counters of a run. """
+
+    def __init__(self, out=None, memory=False):
+        self._lock = threading.Lock()
+        self._stages = {}  # name -> [calls, seconds, max seconds, items, peak bytes]
+        self._counters = {}
+        self._file = open(out, "a", encoding="utf-8") if out else None
+        self._memory = memory
+        self._open = 0  # Spans open in every thread, for the memory peak.
+        self._server = None
+        self._start = time.time()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def span(self, name, items=0, **attrs):
+        """ Times the code inside the 'with' block. Yields the Span. """
+
+        span = Span(name, attrs)
+        span.add(items)
+        if self._memory:
+            with self._lock:
+                if self._open == 0:
+                    tracemalloc.reset_peak()
+                self._open += 1
+        wall, start = time.time(), time.perf_counter()
+        error = None
+        try:
+            yield span
+        except BaseException as err:
+            error = err
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if self._memory:
+                with self._lock:
+                    peak = tracemalloc.get_traced_memory()[1]
+                    self._open -= 1
+            self._record(name, seconds, span.items, peak)
+            if self._file is not None:
+                event = dict(attrs, type="span", name=name, start=round(wall, 6), seconds=round(seconds, 6),
+                             items=span.items, thread=threading.current_thread().name)
+                if peak is not None:
+                    event["peak_bytes"] = peak
+                if error is not None:
+                    event["error"] = repr(error)
+                self._write(event)
+
+    def add(self, name, seconds, items=0):
+        """ Adds a stage measurement timed elsewhere (e.g. waits.Timings). """
+
+        self._record(name, seconds, items, None)
+
+    def _record(self, name, seconds, items, peak):
+        with self._lock:
+            stage = self._stages.setdefault(name, [0, 0.0, 0.0, 0, 0])
+            stage[0] += 1
+            stage[1] += seconds
+            stage[2] = max(stage[2], seconds)
+            stage[3] += items
+            if peak is not None:
+                stage[4] = max(stage[4], peak)
+
+    def count(self, name, n=1):
+        """ Adds n to a counter (rows processed, skipped, failed...). """
+
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def _write(self, event):
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def stages(self):
+        """ Returns {name: {calls, seconds, max, items, per_second, peak_kb}}. """
+
+        with self._lock:
+            found = {name: list(stage) for name, stage in self._stages.items()}
+        return {name: {"calls": calls, "seconds": round(seconds, 6), "max": round(longest, 6), "items": items,
+                       "per_second": round(items / seconds, 1) if items and seconds else None,
+                       "peak_kb": round(peak / 1024, 1) if peak else None}
+                for name, (calls, seconds, longest, items, peak) in found.items()}
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def summary(self):
+        """ Returns the stages, counters and memory high-water marks of the run. """
+
+        found = {"seconds": round(time.time() - self._start, 3), "stages": self.stages(),
+                 "counters": self.counters()}
+        if resource is not None:
+            found["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux.
+        if tracemalloc.is_tracing():
+            found["traced_peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        return found
+
+    def report(self):
+        """ Returns the stages as text, slowest first. """
+
+        lines = ["%-32s %7s %10s %9s %10s %12s %10s" % ("STAGE", "CALLS", "TOTAL(s)", "MAX(s)", "ITEMS",
+                                                       "ITEMS/S", "PEAK(KB)")]
+        for name, stage in sorted(self.stages().items(), key=lambda item: -item[1]["seconds"]):
+            lines.append("%-32s %7d %10.3f %9.3f %10d %12s %10s" % (
+                name, stage["calls"], stage["seconds"], stage["max"], stage["items"],
+                "" if stage["per_second"] is None else stage["per_second"],
+                "" if stage["peak_kb"] is None else stage["peak_kb"]))
+        for name, value in sorted(self.counters().items()):
+            lines.append("%-32s %7d" % (name, value))
+        return "\n".join(lines)
+
+    def prometheus(self):
+        """ Returns every number in the Prometheus text format. """
+
+        def label(name):
+            return name.replace("\\", "\\\\").replace('"', '\\"')
+
+        stages = self.stages()
+        lines = []
+        for metric, key, kind in (("stage_calls_total", "calls", "counter"),
+                                  ("stage_seconds_total", "seconds", "counter"),
+                                  ("stage_max_seconds", "max", "gauge"),
+                                  ("stage_items_total", "items", "counter"),
+                                  ("stage_peak_kilobytes", "peak_kb", "gauge")):
+            lines.append("# TYPE %s_%s %s" % (PREFIX, metric, kind))
+            lines += ['%s_%s{stage="%s"} %s' % (PREFIX, metric, label(name), stage[key])
+                      for name, stage in sorted(stages.items()) if stage[key] is not None]
+        lines.append("# TYPE %s_events_total counter" % PREFIX)
+        lines += ['%s_events_total{name="%s"} %d' % (PREFIX, label(name), value)
+                  for name, value in sorted(self.counters().items())]
+        if resource is not None:
+            lines.append("# TYPE %s_max_rss_kilobytes gauge" % PREFIX)
+            lines.append("%s_max_rss_kilobytes %d" % (PREFIX, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9108, host="127.0.0.1"):
+        """ Serves /metrics in a background thread. Returns the port. """
+
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only when served.
+
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                data = tracer.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):  # Quiet.
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        """ Writes the summary line and stops the endpoint. """
+
+        if self._file is not None:
+            self._write(dict(self.summary(), type="summary"))
+            self._file.close()
+            self._file = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+_tracer = Tracer()  # Numbers in memory only, until configure().
+
+
+def configure(out=None, memory=False, port=None):
+    """ Replaces the tracer of this process. Returns it. """
+
+    global _tracer
+    _tracer = Tracer(out, memory)
+    if port is not None:
+        _tracer.serve(port)
+    return _tracer
+
+
+def tracer():
+    return _tracer
+
+
+def span(name, items=0, **attrs):
+    """ Times a stage with the tracer of this process (see Tracer.span). """
+
+    return _tracer.span(name, items, **attrs)
+
+
+def traced(name, items=None):
+    """ Decorator that times every call of a function as a span. 'items'
+        gets the arguments of a call and returns its number of items. """
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _tracer.span(name, items(*args, **kwargs) if items else 0):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add(name, seconds, items=0):
+    _tracer.add(name, seconds, items)
+
+
+def count(name, n=1):
+    _tracer.count(name, n)
+
+
+@contextmanager
+def profile(file=None, top=25, stream=sys.stderr):
+    """ Runs cProfile over the 'with' block, saves the stats to 'file' (for
+        snakeviz or pstats) and prints the slowest functions. """
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if file:
+            profiler.dump_stats(file)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+        print(text.getvalue(), file=stream)
@@ -0,0 +1,262 @@
+"""
+ *****************************************************************************
+   FILE :           treemap.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Python version of staticmap.gs. Instead of a Google
+                    Static Map URL (which gets too long after a few hundred
+                    markers), the map is drawn here as 256 x 256 PNG tiles
+                    (same tiles as Google/OpenStreetMap maps) or as one
+                    overview image that report.py can put in the docx.
+                    Struck out rows and "N/A" coordinates are skipped, like
+                    in staticmap.gs.
+
+                    Trees are kept sorted along a Z-order curve, so the trees
+                    of any tile are one slice of the arrays (a quadtree
+                    without the tree). When zoomed out, nearby trees are
+                    drawn as one circle with their count. Tiles are cached
+                    on disk by the trees they show, so only tiles whose
+                    trees changed are drawn again.
+
+   USAGE :          python treemap.py --file tree.xls --out map.png
+
+ *****************************************************************************
+"""
+
+import argparse
+import hashlib  # Cache key of each tile.
+import io
+import math
+import os
+
+import numpy as np
+
+import inventory  # Trees of the sheet as arrays.
+import validate  # Rows that can't be drawn.
+
+
+TILE = 256  # Tile size in pixels.
+INDEX_ZOOM = 24  # Zoom of the Z-order keys (about 1 cm per pixel step).
+CLUSTER = 32  # Trees closer than this many pixels are drawn as one circle.
+CLUSTER_MAX_ZOOM = 17  # Every tree gets its own marker from this zoom on.
+MAX_LAT = 85.05112878  # Web Mercator stops here.
+
+# Same colors as toHex in staticmap.gs.
+COLORS = {"RED": "#FF0000", "ORANGE": "#FF9900", "YELLOW": "#FFFF00", "GREEN": "#00FF00",
+          "BLUE": "#0000FF", "PURPLE": "#9900FF", "PINK": "#FF00FF", "WHITE": "#FFFFFF",
+          "BLACK": "#000000"}
+
+
+def to_hex(color):
+    """ Changes a color name into a hex color code, like toHex in staticmap.gs. """
+
+    return COLORS[color.upper()]  # Accounts for upper/lowercase errors.
+
+
+def mercator(longitude, latitude):
+    """ Returns Web Mercator x and y from 0 to 1 (y goes down from the north). """
+
+    longitude = np.asarray(longitude, float)
+    latitude = np.radians(np.clip(np.asarray(latitude, float), -MAX_LAT, MAX_LAT))
+    x = (longitude + 180) / 360
+    y = (1 - np.log(np.tan(latitude) + 1 / np.cos(latitude)) / math.pi) / 2
+    return x, y
+
+
+def _spread(v):
+    """ Puts a zero bit between every bit of 32-bit integers. """
+
+    v = v.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF),
+                        (4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def morton(tx, ty):
+    """ Returns the Z-order keys of tile numbers (x bits and y bits mixed). """
+
+    return _spread(tx) | (_spread(ty) << np.uint64(1))
+
+
+def load_points(file, start=3):
+    """ Returns longitude and latitude arrays of the trees in a tree sheet.
+        Skips struck out rows and rows without coordinates (e.g. "N/A") or
+        outside the world (see validate.py). Trees at the same place are
+        kept: they are drawn stacked and counted in the clusters. """
+
+    trees = inventory.load_sheet(file, start)
+    keep = ~validate.validate(trees).rejected(validate.MAP)
+    return trees.data["longitude"][keep].astype(float), trees.data["latitude"][keep].astype(float)
+
+
+class TreeIndex():
+    """ Trees sorted by their Z-order key at INDEX_ZOOM. The trees of a tile
+        at any lower zoom have keys in one range, so they are one slice. """
+
+    def __init__(self, longitude, latitude):
+        x, y = mercator(longitude, latitude)
+        keep = np.isfinite(x) & np.isfinite(y)
+        x, y = x[keep], y[keep]
+
+        scale = 2 ** INDEX_ZOOM
+        keys = morton(np.minimum(x * scale, scale - 1).astype(np.int64),
+                      np.minimum(y * scale, scale - 1).astype(np.int64))
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._x = x[order]
+        self._y = y[order]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def tile(self, zoom, tx, ty):
+        """ Returns the slice of trees in tile (zoom, tx, ty). """
+
+        if tx < 0 or ty < 0 or tx >= 2 ** zoom or ty >= 2 ** zoom:
+            return slice(0, 0)
+        shift = np.uint64(2 * (INDEX_ZOOM - zoom))
+        first = morton(np.array([tx]), np.array([ty]))[0] << shift
+        last = (morton(np.array([tx]), np.array([ty]))[0] + np.uint64(1)) << shift
+        return slice(int(np.searchsorted(self._keys, first)), int(np.searchsorted(self._keys, last)))
+
+    def points(self, zoom, tx, ty):
+        """ Returns the x and y (0 to 1) of the trees in a tile. """
+
+        found = self.tile(zoom, tx, ty)
+        return self._x[found], self._y[found]
+
+    def bounds(self):
+        """ Returns min x, min y, max x, max y of every tree (0 to 1). """
+
+        return self._x.min(), self._y.min(), self._x.max(), self._y.max()
+
+
+def clusters(x, y, zoom):
+    """ Groups trees by CLUSTER-pixel cells of the whole map at 'zoom'.
+        Returns the pixel x, pixel y (center of the trees) and count of
+        each group. The cells line up with the tiles. """
+
+    scale = TILE * 2 ** zoom
+    px, py = x * scale, y * scale
+    if zoom >= CLUSTER_MAX_ZOOM or len(px) == 0:
+        return px, py, np.ones(len(px), dtype=int)
+
+    cells = (px // CLUSTER).astype(np.int64) * (scale // CLUSTER + 1) + (py // CLUSTER).astype(np.int64)
+    cells, group, counts = np.unique(cells, return_inverse=True, return_counts=True)
+    return (np.bincount(group, weights=px) / counts, np.bincount(group, weights=py) / counts, counts)
+
+
+class TileRenderer():
+    """ Draws map tiles of a TreeIndex, cached in a folder by their contents. """
+
+    def __init__(self, index, folder=None, color="#00FF00", background=(242, 239, 233, 255)):
+        self._index = index
+        self._folder = folder
+        self._color = color
+        self._background = background
+        self.drawn = 0  # Tiles that were actually drawn (not from the cache).
+
+    def _near(self, zoom, tx, ty):
+        """ Trees of a tile and the 8 tiles around it, for markers on the edges. """
+
+        parts = [self._index.points(zoom, tx + dx, ty + dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+        return np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts])
+
+    def _key(self, zoom, x, y):
+        digest = hashlib.sha1(("%s|%s|%d|" % (self._color, self._background, zoom)).encode())
+        digest.update(np.ascontiguousarray(x).tobytes())
+        digest.update(np.ascontiguousarray(y).tobytes())
+        return digest.hexdigest()[:16]
+
+    def draw(self, zoom, tx, ty):
+        """ Returns a tile as a Pillow image (drawn, or read from the cache). """
+
+        from PIL import Image, ImageDraw, ImageFont
+
+        x, y = self._near(zoom, tx, ty)
+        file = None
+        if self._folder:
+            file = os.path.join(self._folder, str(zoom), str(tx), "%d-%s.png" % (ty, self._key(zoom, x, y)))
+            if os.path.exists(file):
+                return Image.open(file)
+
+        image = Image.new("RGBA", (TILE, TILE), self._background)
+        pen = ImageDraw.Draw(image)
+        font = ImageFont.load_default()
+        left, top = tx * TILE, ty * TILE
+
+        px, py, counts = clusters(x, y, zoom)
+        for cx, cy, count in zip(px - left, py - top, counts):
+            radius = 5 if count == 1 else 8 + 4 * math.log10(count)
+            if cx < -radius or cy < -radius or cx > TILE + radius or cy > TILE + radius:
+                continue  # Belongs to a tile around this one.
+            pen.ellipse((cx - radius, cy - radius, cx + radius, cy + radius),
+                        fill=self._color, outline="#000000")
+            if count > 1:
+                pen.text((cx, cy), str(count), fill="#000000", font=font, anchor="mm")
+
+        self.drawn += 1
+        if file:
+            os.makedirs(os.path.dirname(file), exist_ok=True)
+            image.save(file)
+        return image
+
+    def tile_png(self, zoom, tx, ty):
+        """ Returns a tile as PNG bytes. """
+
+        buffer = io.BytesIO()
+        self.draw(zoom, tx, ty).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def overview(self, width=1500, height=1200, padding=40):
+        """ Returns PNG bytes of one image with every tree (same size as
+            staticmap.gs), at the highest zoom where all of them fit. """
+
+        from PIL import Image
+
+        x0, y0, x1, y1 = self._index.bounds() if len(self._index) else (0.5, 0.5, 0.5, 0.5)
+        zoom = 0
+        for z in range(CLUSTER_MAX_ZOOM + 2, -1, -1):
+            scale = TILE * 2 ** z
+            if (x1 - x0) * scale <= width - 2 * padding and (y1 - y0) * scale <= height - 2 * padding:
+                zoom = z
+                break
+
+        scale = TILE * 2 ** zoom
+        left = int((x0 + x1) / 2 * scale - width / 2)
+        top = int((y0 + y1) / 2 * scale - height / 2)
+
+        image = Image.new("RGBA", (width, height), self._background)
+        for ty in range(top // TILE, (top + height) // TILE + 1):
+            for tx in range(left // TILE, (left + width) // TILE + 1):
+                if 0 <= tx < 2 ** zoom and 0 <= ty < 2 ** zoom:
+                    image.paste(self.draw(zoom, tx, ty), (tx * TILE - left, ty * TILE - top))
+
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+def main(argv=None):
+    """ Draws the trees of a tree sheet into one map image. """
+
+    parser = argparse.ArgumentParser(description="Draws a map of the trees in a tree sheet.")
+    parser.add_argument("--file", default="tree.xls", help=".xls, .xlsx or .csv tree sheet")
+    parser.add_argument("--out", default="map.png")
+    parser.add_argument("--color", default="Green", help=", ".join(name.capitalize() for name in COLORS))
+    parser.add_argument("--tiles", default=os.path.join("results", "tiles"), help="tile cache folder")
+    args = parser.parse_args(argv)
+
+    index = TreeIndex(*load_points(args.file))
+    renderer = TileRenderer(index, args.tiles, to_hex(args.color))
+    with open(args.out, "wb") as fp:
+        fp.write(renderer.overview())
+    print("Drew %d trees into %s (%d new tiles)" % (len(index), args.out, renderer.drawn))
+
+
+if __name__ == '__main__':
+    main()
@@ -24,17 +24,50 @@
  *****************************************************************************
 """
 
-import pandas as pd
+import argparse
 
-# Skips first three rows. Works with .xlsx as well.
-df = pd.read_excel("tree.xls", header=None, skiprows=3)
+import inventory  # Reads .xls, .xlsx or .csv into arrays.
 
-# Renames the column.
-df.rename(columns={list(df)[1]: 'Species'}, inplace=True)
 
-# Drops duplicate species and only keps the first instance.
-df = df.drop_duplicates(subset=['Species'])
+def species(file="tree.xls", start=3):
+    """ Returns every species of a tree sheet once, alphabetically sorted. """
 
-# Alphabetically sorts.
-sorted_alph = df.sort_values(by=['Species'])
-print(sorted_alph.iloc[:, 1])
+    # Skips first three rows. Works with .xlsx as well.
+    # Keeps each species only once, and skips blank rows.
+    trees = inventory.load_sheet(file, start)
+    counts = trees.counts("species", ~trees.blank())
+    found = {name for name, count in zip(trees.categories("species"), counts) if count and name != ''}
+
+    # Alphabetically sorts.
+    return sorted(found)
+
+
+def species_counts(file="tree.xls", start=3):
+    """ Returns {species: number of trees}, without struck out rows. For
+        many sheets, zones and size classes, see speciesstats.py. """
+
+    trees = inventory.load_sheet(file, start)
+    counts = trees.counts("species", ~trees.blank() & ~trees.struck())
+    return {name: int(count) for name, count in zip(trees.categories("species"), counts) if count}
+
+
+def main(argv=None):
+    """ Prints the species of tree.xls (or --file). """
+
+    parser = argparse.ArgumentParser(description="Finds all tree species in a tree sheet.")
+    parser.add_argument("--file", default="tree.xls", help=".xls, .xlsx or .csv tree sheet")
+    parser.add_argument("--counts", action="store_true", help="prints the number of trees of each species")
+    args = parser.parse_args(argv)
+
+    if args.counts:
+        counts = species_counts(args.file)
+        for name in sorted(counts):
+            print("%6d  %s" % (counts[name], name))
+        return
+
+    for name in species(args.file):
+        print(name)
+
+
+if __name__ == '__main__':
+    main()
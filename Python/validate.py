@@ -0,0 +1,199 @@
+"""
+ *****************************************************************************
+   FILE :           validate.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Checks a whole tree sheet before anything slow starts
+                    (iTree submission, maps), instead of finding bad rows
+                    one at a time in the browser. Every check is done on
+                    whole columns of the inventory (inventory.py), and every
+                    row gets the set of problems it has:
+
+                    struck             struck out row
+                    blank_species      no species (or 'NaN')
+                    unknown_species    not in mappings.csv
+                    unknown_distance
+                    unknown_direction
+                    no_location        no coordinates (e.g. "N/A")
+                    out_of_bounds      coordinates outside the bounds
+                    duplicate          same place as an earlier tree
+
+                    Each stage only rejects rows for the problems that
+                    matter to it (SUBMIT, MAP). The rejected rows go to a
+                    csv report with their problems, and the clean rows are
+                    what itree.py, benefits.py, zones.py and treemap.py use.
+                    Duplicates are only flagged (FLAGS, in the summary):
+                    trees planted side by side round to the same place, and
+                    the map stacks them instead of losing them.
+
+   NOTES :          There is no DBH check: the sheet has stock sizes, so
+                    every tree gets benefits.DEFAULT_DBH (inventory.py).
+
+   USAGE :          python validate.py --file tree.xls --report rejections.csv
+
+ *****************************************************************************
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+import inventory  # Trees of the sheet as arrays.
+import tracing  # Stage timings.
+
+
+# Problem -> bit of the issues array.
+ISSUES = {"struck": 1, "blank_species": 2, "unknown_species": 4, "unknown_distance": 8,
+          "unknown_direction": 16, "no_location": 32, "out_of_bounds": 64, "duplicate": 128}
+
+# Problems that keep a row out of each stage.
+SUBMIT = ["struck", "blank_species", "unknown_species", "unknown_distance", "unknown_direction"]
+MAP = ["struck", "no_location", "out_of_bounds"]
+STAGES = {"submit": SUBMIT, "map": MAP}
+FLAGS = ["duplicate"]  # Counted, but no stage rejects them.
+
+WORLD = (-180.0, -90.0, 180.0, 90.0)  # Min longitude, min latitude, max longitude, max latitude.
+PRECISION = 5  # Decimals of the coordinates that make two trees the same place (about 1 m).
+
+
+def _problems(stage):
+    """ Returns the problems of a stage (a name of STAGES or a list). """
+
+    return STAGES[stage] if isinstance(stage, str) else list(stage)
+
+
+def _bits(names):
+    return sum(ISSUES[name] for name in names)
+
+
+class Validation():
+    """ The problems of every row of an inventory. """
+
+    def __init__(self, trees, issues, translated=None):
+        self.trees = trees
+        self.issues = issues  # uint8 bits of ISSUES, one per row.
+        self.translated = translated  # {kind: (codes, iTree values)} like inventory.submittable.
+
+    def rejected(self, stage=SUBMIT):
+        """ Returns the mask of the rows a stage (name or list of problems) can't use. """
+
+        return (self.issues & _bits(_problems(stage))) != 0
+
+    def clean(self, stage=SUBMIT):
+        """ Returns the Inventory of the rows a stage can use. """
+
+        return self.trees.select(~self.rejected(stage))
+
+    def counts(self, stage=None):
+        """ Returns {problem: rows} (only the problems of a stage if given). """
+
+        names = _problems(stage) if stage else list(ISSUES)
+        return {name: int(np.count_nonzero(self.issues & ISSUES[name])) for name in names}
+
+    def reasons(self, mask, stage=None):
+        """ Returns the problems of the rows in 'mask' as "a;b" text. """
+
+        names = _problems(stage) if stage else list(ISSUES)
+        values, inverse = np.unique(self.issues[mask] & _bits(names), return_inverse=True)
+        text = np.array([";".join(name for name in names if value & ISSUES[name]) for value in values],
+                        dtype=object)
+        return text[inverse.ravel()]
+
+    def report(self, file, stage=SUBMIT):
+        """ Writes the rows a stage can't use, with their problems, to a csv.
+            Returns the number of rows. """
+
+        import pandas as pd
+
+        mask = self.rejected(stage)
+        data = self.trees.data[mask]
+        frame = pd.DataFrame({"Row": data["row"], "Tree #": data["number"],
+                              "Species": self.trees.values("species")[mask],
+                              "Distance": self.trees.values("distance")[mask],
+                              "Direction": self.trees.values("direction")[mask],
+                              "Longitude": data["longitude"], "Latitude": data["latitude"],
+                              "Problems": self.reasons(mask, stage)})
+        frame.to_csv(file, index=False)
+        return len(frame)
+
+    def summary(self, stage=SUBMIT):
+        """ Returns the numbers of a stage as a dict (for JSON). """
+
+        rejected = int(np.count_nonzero(self.rejected(stage)))
+        return {"rows": len(self.trees), "clean": len(self.trees) - rejected, "rejected": rejected,
+                "problems": self.counts(stage), "flagged": self.counts(FLAGS)}
+
+
+def duplicates(longitude, latitude, located, precision=PRECISION):
+    """ Returns the mask of the trees at the same place (rounded to
+        'precision' decimals) as an earlier tree. """
+
+    scale = 10.0 ** precision
+    x = np.round(np.where(located, longitude, 0) * scale).astype(np.int64) + (1 << 31)
+    y = np.round(np.where(located, latitude, 0) * scale).astype(np.int64) + (1 << 31)
+    keys = (x << 32) | y  # Both fit in 32 bits.
+
+    found = np.zeros(len(keys), bool)
+    rows = np.flatnonzero(located)
+    order = rows[np.argsort(keys[rows], kind="stable")]  # Earlier rows first among equal keys.
+    found[order[1:]] = keys[order][1:] == keys[order][:-1]
+    return found
+
+
+@tracing.traced("ingest.validate", lambda trees, *args, **kwargs: len(trees))
+def validate(trees, names=None, bounds=WORLD, precision=PRECISION):
+    """ Checks every row of an Inventory. Category checks need a
+        normalize.Normalizer ('names'); without one they are skipped. """
+
+    issues = np.zeros(len(trees), np.uint8)
+
+    def flag(name, mask):
+        issues[mask] |= ISSUES[name]
+
+    struck, blank = trees.struck(), trees.blank()
+    flag("struck", struck)
+    flag("blank_species", blank)
+
+    translated = None
+    if names is not None:
+        usable = ~struck & ~blank  # Only these count as unmatched values in the normalizer.
+        translated = {kind: trees.translate(kind, names, usable) for kind in ("species", "distance", "direction")}
+        for kind, (codes, lookup) in translated.items():
+            flag("unknown_" + kind, ~blank & (codes < 0) if kind == "species" else codes < 0)
+
+    located = trees.located()
+    longitude, latitude = trees.data["longitude"], trees.data["latitude"]
+    flag("no_location", ~located)
+    inside = (longitude >= bounds[0]) & (latitude >= bounds[1]) & (longitude <= bounds[2]) & (latitude <= bounds[3])
+    flag("out_of_bounds", located & ~inside)
+    flag("duplicate", duplicates(longitude, latitude, located & inside & ~struck, precision))
+
+    return Validation(trees, issues, translated)
+
+
+def main(argv=None):
+    """ Checks a tree sheet and writes the rejected rows and the clean ones. """
+
+    parser = argparse.ArgumentParser(description="Checks a tree sheet before submission or maps.")
+    parser.add_argument("--file", default="tree.xls")
+    parser.add_argument("--stage", choices=list(STAGES), default="submit")
+    parser.add_argument("--bounds", type=float, nargs=4, default=WORLD,
+                        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"))
+    parser.add_argument("--report", default="rejections.csv", help="csv of the rejected rows")
+    parser.add_argument("--clean", metavar="NPZ", help="saves the clean rows (inventory.Inventory.load)")
+    args = parser.parse_args(argv)
+
+    import normalize
+    check = validate(inventory.load_sheet(args.file), normalize.load("mappings.csv"), args.bounds)
+    check.report(args.report, args.stage)
+    if args.clean:
+        check.clean(args.stage).save(args.clean)
+    print(json.dumps(check.summary(args.stage), indent=1))
+
+
+if __name__ == '__main__':
+    main()
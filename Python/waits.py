@@ -0,0 +1,195 @@
+"""
+ *****************************************************************************
+   FILE :           waits.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Wait and locator layer for AutomateBrowser in itree.py.
+                    Instead of polling with a new WebDriverWait for every
+                    cell, the page tells us when an element shows up (with a
+                    MutationObserver), and the element that was waited for
+                    is the one that is used, so every cell is looked up once.
+                    Every step is timed, so a run can print which page or
+                    field takes the most time.
+
+ *****************************************************************************
+"""
+
+import csv
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+import tracing  # Every step also counts in the stage of its page.
+
+
+# Calls back as soon as the XPath matches a visible element.
+WAIT_SCRIPT = """
+var xpath = arguments[0], done = arguments[arguments.length - 1];
+function find() {
+  var e = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  return (e && (e.offsetWidth || e.offsetHeight || e.getClientRects().length)) ? e : null;
+}
+var observer = new MutationObserver(function() {
+  var e = find();
+  if (e) { observer.disconnect(); done(e); }
+});
+var e = find();
+if (e) { done(e); }
+else {
+  observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+  setTimeout(function() { observer.disconnect(); }, arguments[1] * 1000);
+}
+"""
+
+# Fills every field of a tree row at once. Returns the fields that failed.
+FILL_SCRIPT = """
+var row = document.getElementById(arguments[0]), fields = arguments[1], missing = [];
+for (var name in fields) {
+  var box = row.getElementsByClassName(name)[0], text = fields[name];
+  if (!box) { missing.push(name); continue; }
+  if (box.tagName == "SELECT") {
+    var found = -1;
+    for (var i = 0; i < box.options.length; i++) {
+      if (box.options[i].text.trim() == text) { found = i; break; }
+    }
+    if (found < 0) { missing.push(name); continue; }
+    box.selectedIndex = found;
+  } else {
+    box.click();
+    box.setAttribute("value", text);
+    box.value = text;
+  }
+  box.dispatchEvent(new Event("input", {bubbles: true}));
+  box.dispatchEvent(new Event("change", {bubbles: true}));
+}
+return missing;
+"""
+
+
+class Timings():
+    """ Records how long every step of a run takes. Each browser has its
+        own, and itreepool.py merges them at the end of a run. """
+
+    def __init__(self):
+        self._steps = {}  # (page, step) -> [count, total, max]
+        self._lock = threading.Lock()
+        self._page = ""
+
+    def page(self, name):
+        """ Sets the page that the next steps belong to. """
+
+        self._page = name
+
+    @contextmanager
+    def time(self, step):
+        """ Times the code inside the 'with' block. """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(self._page, step, time.perf_counter() - start)
+
+    def add(self, page, step, seconds):
+        """ Adds one measurement. """
+
+        tracing.add("submit.page.%s" % (page or "start").lower(), seconds)
+        with self._lock:
+            count_total_max = self._steps.setdefault((page, step), [0, 0.0, 0.0])
+            count_total_max[0] += 1
+            count_total_max[1] += seconds
+            count_total_max[2] = max(count_total_max[2], seconds)
+
+    def merge(self, other):
+        """ Adds every measurement of another Timings object. """
+
+        for (page, step), (count, total, longest) in other.rows():
+            with self._lock:
+                count_total_max = self._steps.setdefault((page, step), [0, 0.0, 0.0])
+                count_total_max[0] += count
+                count_total_max[1] += total
+                count_total_max[2] = max(count_total_max[2], longest)
+
+    def rows(self):
+        """ Returns ((page, step), (count, total, max)) sorted by total time. """
+
+        with self._lock:
+            return sorted(((key, tuple(value)) for key, value in self._steps.items()),
+                          key=lambda row: -row[1][1])
+
+    def report(self):
+        """ Returns the timing report as text, slowest step first. """
+
+        rows = self.rows()
+        everything = sum(total for key, (count, total, longest) in rows) or 1.0
+
+        lines = ["%-12s %-40s %7s %9s %8s %8s %6s" % ("PAGE", "STEP", "COUNT", "TOTAL(s)",
+                                                      "MEAN(s)", "MAX(s)", "SHARE")]
+        for (page, step), (count, total, longest) in rows:
+            lines.append("%-12s %-40s %7d %9.2f %8.3f %8.3f %5.1f%%" % (page, step, count, total,
+                         total / count, longest, 100 * total / everything))
+        return "\n".join(lines)
+
+    def save(self, file):
+        """ Saves the timing report as csv. """
+
+        with open(file, "w", newline="") as fp:
+            writer = csv.writer(fp)
+            writer.writerow(["Page", "Step", "Count", "Total (s)", "Max (s)"])
+            for (page, step), (count, total, longest) in self.rows():
+                writer.writerow([page, step, count, round(total, 4), round(longest, 4)])
+
+
+class Waiter():
+    """ Waits for elements and keeps the XPaths of every table row. """
+
+    def __init__(self, driver):
+        self._driver = driver
+        self._rows = {}  # Row ID -> {field class: XPath}
+
+    def row(self, rowID, field):
+        """ Returns the XPath of a field in a table row. Built once per row. """
+
+        if rowID not in self._rows:
+            self._rows[rowID] = {}
+        xpaths = self._rows[rowID]
+
+        if field not in xpaths:
+            xpaths[field] = "//tr[@id='%s']/td/*[@class='%s']" % (rowID, field)
+        return xpaths[field]
+
+    def find(self, xpath, timeout=10):
+        """ Returns the first visible element matching xpath as soon as it
+            shows up. Raises TimeoutException after 'timeout' seconds. """
+
+        end = time.time() + timeout
+        while True:
+            left = end - time.time()
+            if left <= 0:
+                raise TimeoutException("Timed out waiting for %s" % xpath)
+
+            self._driver.set_script_timeout(left)
+            try:
+                return self._driver.execute_async_script(WAIT_SCRIPT, xpath, left)
+            except TimeoutException:
+                raise TimeoutException("Timed out waiting for %s" % xpath)
+            except WebDriverException:
+                # The page was replaced while waiting (e.g. after NEXT). Waits on the new one.
+                time.sleep(0.05)
+
+    def fill_row(self, rowID, fields):
+        """ Fills every field of a table row with one script.
+            'fields' maps field class to the visible text to enter. """
+
+        first = next(iter(fields))
+        self.find(self.row(rowID, first))  # Waits for the row to exist.
+
+        missing = self._driver.execute_script(FILL_SCRIPT, rowID, fields)
+        if missing:
+            raise ValueError("%s: could not enter %s" % (rowID, ", ".join(
+                             "%r in %s" % (fields[name], name) for name in missing)))
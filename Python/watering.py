@@ -0,0 +1,244 @@
+"""
+ *****************************************************************************
+   FILE :           watering.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Decides how often each tree should be watered this week,
+                    instead of one message for everyone from the average
+                    high (weatherContent in contact.gs). Every tree gets an
+                    urgency score:
+
+                    score = heat x sensitivity x youth x dryness
+
+                    heat         forecast highs over 65°F, sooner days
+                                 count more (1.0 is a week of 85°F)
+                    sensitivity  1.5 - drought tolerance of the species
+                                 (growth.csv, 0 to 1)
+                    youth        1 to 2, higher for trees planted in the
+                                 last couple of years (Date Planted, or
+                                 DBH / growth rate when there is no date)
+                    dryness      days since Last Watered / 7 (0 to 2, 1 if
+                                 the sheet doesn't say)
+
+                    Scores give "once", "two times" or "three times" (or
+                    nothing, for trees that don't need water this week).
+                    Each recipient gets the answer of their most urgent
+                    tree (Trees column of the contact list). Recipients
+                    without scored trees get exactly what weatherContent
+                    sends: once below 85°F, three times above 100°F, two
+                    times otherwise (never nothing).
+
+   NOTES :          Everything that doesn't change with the weather is
+                    computed once (WateringModel), so a forecast update is
+                    a multiplication over the trees.
+
+   USAGE :          python watering.py --file tree.xls --out watering.csv
+
+ *****************************************************************************
+"""
+
+import argparse
+import datetime
+import time
+
+import numpy as np
+
+import inventory  # Trees of the sheet as arrays.
+import normalize
+import outbox  # Messages by Preferred channel.
+import sheetreader
+
+
+BASE_HIGH = 65.0  # Trees need extra water above this high (°F).
+HOT_SPAN = 20.0  # Degrees over BASE_HIGH for a heat of 1.0 (85°F, weatherContent's first line).
+DECAY = 0.85  # Weight of each next forecast day.
+DRY_DAYS = 7.0  # Days since watering for a dryness of 1.0.
+MAX_DRY = 2.0
+ESTABLISH = 2.0  # Years it takes a new tree to root (youth goes from 2 to 1).
+TOLERANCE = "Drought Tolerance"  # Column of growth.csv.
+GROWTH = "Growth (in/yr)"
+
+# Score limits of each answer of scored trees.
+LIMITS = [0.35, 1.0, 1.75]
+TIMES = ["none", "once", "two times", "three times"]
+
+
+def forecast(weather, days=7):
+    """ Returns the daily highs of a weatherinfo lookup as an array of
+        'days' values (the average high every day if there are none). """
+
+    highs = [float(high) for high in weather.get("highs") or [weather["high"]]][:days]
+    return np.array(highs + [highs[-1]] * (days - len(highs)))
+
+
+def heat(highs):
+    """ Returns the heat of forecasts, shape (days,) or (locations, days):
+        weighted mean of the degrees over BASE_HIGH, in HOT_SPANs. """
+
+    highs = np.asarray(highs, float)
+    weights = DECAY ** np.arange(highs.shape[-1])
+    return (np.maximum(highs - BASE_HIGH, 0) / HOT_SPAN) @ weights / weights.sum()
+
+
+class WateringModel():
+    """ The parts of every tree's score that don't change with the weather. """
+
+    def __init__(self, trees, names, traits, today=None, location=None):
+        today = inventory.to_day_number(today or datetime.date.today())
+        default = traits.loc["default"] if "default" in traits.index else traits.mean(numeric_only=True)
+
+        # One lookup per species, then every tree gets its species' values.
+        codes, lookup = trees.translate("species", names)
+        params = traits.reindex(lookup)
+        tolerance = np.append(params[TOLERANCE].fillna(default[TOLERANCE]).to_numpy(float),
+                              default[TOLERANCE])[codes]  # -1 (unknown species) is the default.
+        growth = np.append(params[GROWTH].fillna(default[GROWTH]).to_numpy(float), default[GROWTH])[codes]
+
+        data = trees.data
+        age = np.where(np.isnan(data["planted"]), data["dbh"] / growth, (today - data["planted"]) / 365.25)
+        youth = 1 + np.exp(-np.clip(age, 0, None) / ESTABLISH)
+        dryness = np.where(np.isnan(data["watered"]), 1.0,
+                           np.clip((today - data["watered"]) / DRY_DAYS, 0, MAX_DRY))
+
+        self._base = ((1.5 - tolerance) * youth * dryness).astype(np.float32)
+        self._location = location  # Index into the heat of each location, or None for one forecast.
+        self.trees = trees
+        self.counted = ~trees.struck() & ~trees.blank()
+
+    def __len__(self):
+        return len(self._base)
+
+    def scores(self, heat):
+        """ Returns the score of every tree for a heat (one value, or one per
+            location). Struck out and blank rows get 0. """
+
+        heat = np.asarray(heat, np.float32)
+        found = self._base * (heat if self._location is None else heat[self._location])
+        return np.where(self.counted, found, 0)
+
+
+def levels(scores):
+    """ Returns the index in TIMES of every score. """
+
+    return np.searchsorted(LIMITS, scores, side="right")
+
+
+def default_level(high):
+    """ Level of recipients without scored trees, from the average high
+        like weatherContent in contact.gs. """
+
+    return 1 if high < 85 else 3 if high > 100 else 2
+
+
+def tree_numbers(text):
+    """ Returns the Tree # in a Trees cell ("12, 15" or "12; 15"). """
+
+    found = []
+    for part in str(text).replace(";", ",").split(","):
+        number = sheetreader.number(part.strip())
+        if number is not None:
+            found.append(int(number))
+    return found
+
+
+def recipient_levels(contacts, numbers, tree_levels, default):
+    """ Returns the level of every contact: the highest level of their trees
+        (Tree # in their Trees column), or 'default' if none are found. """
+
+    owners, owned = [], []
+    for i, contact in enumerate(contacts):
+        for number in tree_numbers(contact.trees):
+            owners.append(i)
+            owned.append(number)
+
+    found = np.full(len(contacts), -1)
+    if owned:
+        order = np.argsort(numbers, kind="stable")
+        owned = np.asarray(owned)
+        where = np.minimum(np.searchsorted(numbers[order], owned), len(order) - 1)
+        match = numbers[order][where] == owned
+        np.maximum.at(found, np.asarray(owners)[match], tree_levels[order][where][match])
+    return np.where(found < 0, default, found)
+
+
+def content(times, high):
+    """ Returns the reminder text for one answer, like weatherContent. """
+
+    return ("A friendly reminder to water your tree! This week's average high temperature will be %s. "
+            % high + "Please water your tree %s this week.\n \nFrom your Sustainable Claremont Team." % times)
+
+
+def cohorts(contacts, model, highs):
+    """ Returns {times: [contacts]} for a forecast (daily highs), leaving
+        out the contacts whose trees don't need water. """
+
+    scores = model.scores(heat(highs))
+    found = recipient_levels(contacts, model.trees.data["number"], levels(scores),
+                             default_level(round(float(np.mean(highs)), 3)))
+    groups = {}
+    for contact, level in zip(contacts, found):
+        if level > 0:
+            groups.setdefault(TIMES[level], []).append(contact)
+    return groups
+
+
+def messages(contacts, model, weather, subject):
+    """ Returns {channel: [(recipient, name, subject, body)]} with each
+        contact's message for their cohort (see outbox.messages). """
+
+    highs = forecast(weather)
+    found = {}
+    for times, members in cohorts(contacts, model, highs).items():
+        for channel, items in outbox.messages(members, subject, content(times, round(highs.mean(), 3))).items():
+            found.setdefault(channel, []).extend(items)
+    return found
+
+
+def load_model(file="tree.xls", mappings="mappings.csv", traits="growth.csv", today=None):
+    """ Returns the WateringModel of a tree sheet. """
+
+    import pandas as pd
+
+    return WateringModel(inventory.load_sheet(file), normalize.load(mappings),
+                         pd.read_csv(traits, index_col="Species"), today)
+
+
+def main(argv=None):
+    """ Scores the trees of tree.xls with this week's forecast. """
+
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Scores how much each tree needs water.")
+    parser.add_argument("--file", default="tree.xls")
+    parser.add_argument("--contacts", default="contact_list.xlsx")
+    parser.add_argument("--date", type=datetime.date.fromisoformat, default=None, help="YYYY-MM-DD")
+    parser.add_argument("--out", default="watering.csv")
+    args = parser.parse_args(argv)
+
+    import weatherinfo
+    service = weatherinfo.WeatherService(weatherinfo.YahooProvider(), fallback=weatherinfo.FixtureProvider())
+    highs = forecast(service.lookup(weatherinfo.CLAREMONT, args.date))
+
+    model = load_model(args.file, today=args.date)
+    trees = model.trees
+    start = time.perf_counter()
+    scores = model.scores(heat(highs))
+    print("Scored %d trees in %.4f s" % (len(model), time.perf_counter() - start))
+
+    found = levels(scores)
+    table = pd.DataFrame({"Row": trees.data["row"], "Tree #": trees.data["number"],
+                          "Species": trees.values("species"), "Score": scores.round(3),
+                          "Water": np.array(TIMES, dtype=object)[found]})[model.counted]
+    table.sort_values("Score", ascending=False).to_csv(args.out, index=False)
+    print("Wrote %d trees to %s" % (len(table), args.out))
+
+    contacts = list(sheetreader.contacts(args.contacts))
+    for times, members in cohorts(contacts, model, highs).items():
+        print("%s: %d recipients" % (times, len(members)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+ *****************************************************************************
+   FILE :           weatherinfo.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Weather for the watering e-mails. Lookups go through a
+                    provider (Yahoo Weather, or a local fixture file for
+                    testing and as a fallback) and are cached on disk by
+                    location and date, so a mailing only asks for the
+                    weather once per distinct location, not per recipient.
+                    Locations that are not cached are fetched at the same
+                    time with asyncio: lookup_many_async inside a running
+                    event loop, lookup_many (which starts one) elsewhere.
+
+   FILES :          weather_fixture.json   weather used when Yahoo fails
+                    weather_cache.json     cached lookups (made when run)
+
+ *****************************************************************************
+"""
+
+import asyncio
+import datetime
+import json
+import os
+import time
+
+
+CLAREMONT = "2380633"  # Yahoo WOEID of Claremont, CA.
+
+
+class YahooProvider():
+    """ Current temperature, the daily highs and their average from Yahoo Weather. """
+
+    def __init__(self, days=7):
+        self._days = days
+
+    def fetch(self, location):
+        """ Returns {"temp": current temperature, "high": average high,
+            "highs": high of each day} in Fahrenheit. """
+
+        from weather import Weather, Unit  # Yahoo Weather info
+
+        weather = Weather(unit=Unit.FAHRENHEIT)
+        loc = weather.lookup(int(location))  # Looks up weather using WOEID.
+        highs = [float(day.high) for day in loc.forecast[:self._days]]
+        return {"temp": float(loc.condition.temp),
+                "high": round(sum(highs) / len(highs), 3),
+                "highs": highs}
+
+
+class FixtureProvider():
+    """ Weather read from a JSON file ({location: {"temp": .., "high": ..}}).
+        Locations that are not in the file get the "default" entry. """
+
+    def __init__(self, file="weather_fixture.json"):
+        with open(file) as fp:
+            self._data = json.load(fp)
+
+    def fetch(self, location):
+        """ Returns the weather of a location from the file. """
+
+        data = self._data.get(str(location), self._data.get("default"))
+        if data is None:
+            raise KeyError("No weather for %s in the fixture file." % location)
+        return dict(data)
+
+
+class WeatherService():
+    """ Looks up weather through a provider, with a disk cache that keeps
+        each (location, date) for 'ttl' seconds. """
+
+    def __init__(self, provider, fallback=None, cache_file="weather_cache.json", ttl=3 * 3600, limit=8):
+        self._provider = provider
+        self._fallback = fallback  # Used (but not cached) when the provider fails.
+        self._cache_file = cache_file
+        self._ttl = ttl
+        self._limit = limit  # Max lookups at the same time.
+        self._cache = {}
+        self.fetched = 0  # Number of lookups sent to the provider.
+
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file) as fp:
+                self._cache = json.load(fp)
+
+    def _key(self, location, date):
+        return "%s|%s" % (location, date)
+
+    def _save(self):
+        """ Writes the cache through a temporary file, leaving out old entries. """
+
+        if not self._cache_file:
+            return
+        now = time.time()
+        self._cache = {key: entry for key, entry in self._cache.items()
+                       if now - entry["time"] < self._ttl}
+        temp = self._cache_file + ".tmp"
+        with open(temp, "w") as fp:
+            json.dump(self._cache, fp, indent=1)
+        os.replace(temp, self._cache_file)
+
+    def _fetch(self, location):
+        """ Asks the provider, then the fallback. Returns (data, cacheable). """
+
+        self.fetched += 1
+        try:
+            return self._provider.fetch(location), True
+        except Exception as err:
+            if self._fallback is None:
+                raise
+            print("Weather lookup failed for %s (%s), using fallback." % (location, err))
+            return self._fallback.fetch(location), False
+
+    async def _fetch_all(self, locations):
+        """ Fetches every location at the same time, at most 'limit' at once. """
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self._limit)
+
+        async def one(location):
+            async with semaphore:
+                return await loop.run_in_executor(None, self._fetch, location)
+
+        return await asyncio.gather(*(one(location) for location in locations))
+
+    def _cached(self, locations, date):
+        """ Returns (found, missing): {location: weather} of the distinct
+            locations in the cache, and the list of the other ones. """
+
+        now = time.time()
+        found = {}
+        missing = []
+        for location in dict.fromkeys(str(location) for location in locations):  # Distinct, in order.
+            entry = self._cache.get(self._key(location, date))
+            if entry is not None and now - entry["time"] < self._ttl:
+                found[location] = entry["data"]
+            else:
+                missing.append(location)
+        return found, missing
+
+    def _keep(self, found, missing, results, date, now):
+        """ Adds fetched weather to 'found' and caches it (not fallbacks). """
+
+        for location, (data, cacheable) in zip(missing, results):
+            found[location] = data
+            if cacheable:
+                self._cache[self._key(location, date)] = {"time": now, "data": data}
+        self._save()
+
+    async def lookup_many_async(self, locations, date=None):
+        """ Same as lookup_many, for code already in an event loop. """
+
+        date = str(date or datetime.date.today())
+        now = time.time()
+        found, missing = self._cached(locations, date)
+        if missing:
+            self._keep(found, missing, await self._fetch_all(missing), date, now)
+        return found
+
+    def lookup_many(self, locations, date=None):
+        """ Returns {location: weather} for every distinct location. Only
+            locations that are not cached are fetched. Starts an event loop,
+            so it can't be called from one (use lookup_many_async). """
+
+        date = str(date or datetime.date.today())
+        now = time.time()
+        found, missing = self._cached(locations, date)
+        if missing:
+            self._keep(found, missing, asyncio.run(self._fetch_all(missing)), date, now)
+        return found
+
+    async def lookup_async(self, location, date=None):
+        """ Returns the weather of one location, in an event loop. """
+
+        return (await self.lookup_many_async([location], date))[str(location)]
+
+    def lookup(self, location, date=None):
+        """ Returns the weather of one location. """
+
+        return self.lookup_many([location], date)[str(location)]
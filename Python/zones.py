@@ -0,0 +1,248 @@
+"""
+ *****************************************************************************
+   FILE :           zones.py
+
+   AUTHOR :         Jiin Jeong
+
+   DATE :           October 2026
+
+   DESCRIPTION :    Adds up tree benefits per zone instead of for the whole
+                    city. Zones are polygons from a GeoJSON file (council
+                    districts, census tracts, ...) or the cells of a square
+                    or hexagon grid. Every tree is put in a zone with its
+                    coordinates, then every benefit column is summed per
+                    zone at once. The result can be used for one report per
+                    zone: python report.py --batch FOLDER --table zones.csv
+
+   USAGE :          python zones.py --polygons districts.geojson --name NAME
+                    python zones.py --grid hex --size 500
+
+ *****************************************************************************
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+import inventory  # Trees of the sheet as arrays.
+import normalize  # Translates sheet values into iTree values.
+from benefits import METRICS
+from resultstore import read_results
+
+
+NO_ZONE = "(none)"  # Trees without coordinates or outside every polygon.
+EARTH = 6371008.8  # Mean earth radius in meters.
+
+
+def load_trees(file, start=3, mappings="mappings.csv"):
+    """ Returns the trees of a tree sheet that itree.py submits (same rows,
+        same order as its export) with their coordinates. """
+
+    trees = inventory.load_sheet(file, start)
+    mask, translated = inventory.submittable(trees, normalize.load(mappings))
+    frame = inventory.itree_frame(trees, translated, mask)
+    located = trees.located()[mask]
+    frame["Longitude"] = np.where(located, trees.data["longitude"][mask], np.nan)
+    frame["Latitude"] = np.where(located, trees.data["latitude"][mask], np.nan)
+    return frame.drop(columns="DBH")
+
+
+"""/**** POLYGONS ***/ """
+def _rings(geometry):
+    """ Yields every ring (outer and holes) of a Polygon or MultiPolygon. """
+
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return
+    for polygon in polygons:
+        for ring in polygon:
+            yield np.asarray(ring, float)[:, :2]
+
+
+class PolygonIndex():
+    """ Polygons with their edges in flat arrays. Points are sorted by
+        longitude once, so each polygon only tests the points inside its
+        bounding box. """
+
+    def __init__(self, names, geometries):
+        self._names = list(names)
+        self._edges = []  # (x0, y0, x1, y1) arrays of each polygon.
+        self._boxes = []  # (min x, min y, max x, max y) of each polygon.
+
+        for geometry in geometries:
+            rings = list(_rings(geometry))
+            if not rings:
+                self._edges.append(np.empty((0, 4)))
+                self._boxes.append((np.inf, np.inf, -np.inf, -np.inf))
+                continue
+            edges = np.concatenate([np.column_stack([ring, np.roll(ring, -1, axis=0)]) for ring in rings])
+            points = np.concatenate(rings)
+            self._edges.append(edges)
+            self._boxes.append((*points.min(axis=0), *points.max(axis=0)))
+
+    @classmethod
+    def from_geojson(cls, file, name=None):
+        """ Loads the polygons of a GeoJSON file. Zones are named by the
+            'name' property, or numbered. """
+
+        with open(file, encoding="utf-8") as fp:
+            features = json.load(fp)["features"]
+
+        names = [str((feature.get("properties") or {}).get(name, i)) if name else str(i)
+                 for i, feature in enumerate(features)]
+        return cls(names, [feature["geometry"] for feature in features])
+
+    def __len__(self):
+        return len(self._names)
+
+    def assign(self, longitude, latitude, chunk=1000000):
+        """ Returns the zone name of every point (the first polygon that
+            has it, or NO_ZONE). """
+
+        x = np.asarray(longitude, float)
+        y = np.asarray(latitude, float)
+        zone = np.full(len(x), -1)
+
+        valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        order = valid[np.argsort(x[valid], kind="stable")]
+        sorted_x = x[order]
+
+        for k, (edges, (x0, y0, x1, y1)) in enumerate(zip(self._edges, self._boxes)):
+            # Bounding box first: a slice of the sorted points, then latitude.
+            found = order[np.searchsorted(sorted_x, x0, "left"):np.searchsorted(sorted_x, x1, "right")]
+            found = found[(y[found] >= y0) & (y[found] <= y1) & (zone[found] < 0)]
+            if len(found) == 0:
+                continue
+
+            # Even-odd rule: a point is inside if a ray to the east crosses an
+            # odd number of edges. Holes are inside two rings, so they are out.
+            size = max(1, chunk // max(1, len(edges)))  # Bounds the (points x edges) arrays.
+            for part in np.array_split(found, -(-len(found) // size)):
+                px, py = x[part, None], y[part, None]
+                ex0, ey0, ex1, ey1 = (edges[:, j] for j in range(4))
+                spans = (ey0 > py) != (ey1 > py)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    cross = ex0 + (py - ey0) * (ex1 - ex0) / (ey1 - ey0)
+                inside = np.count_nonzero(spans & (px < cross), axis=1) % 2 == 1
+                zone[part[inside]] = k
+
+        names = np.array(self._names + [NO_ZONE], dtype=object)
+        return names[zone]  # -1 is the last name.
+
+
+"""/**** GRIDS ***/ """
+def middle_latitude(latitude):
+    """ Returns the middle latitude of the points (0 if there are none). """
+
+    latitude = np.asarray(latitude, float)
+    return float(np.nanmean(latitude)) if np.isfinite(latitude).any() else 0.0
+
+
+def _meters(longitude, latitude, middle=None):
+    """ Returns x and y in meters around the latitude 'middle' (by default
+        the middle of the points), with a flat earth, fine for a city. Give
+        the same 'middle' to get the same cells in every run. """
+
+    if middle is None:
+        middle = middle_latitude(latitude)
+    x = np.radians(np.asarray(longitude, float))
+    y = np.radians(np.asarray(latitude, float))
+    return x * np.cos(np.radians(middle)) * EARTH, y * EARTH
+
+
+def square_grid(longitude, latitude, size=500, middle=None):
+    """ Returns the square cell ("sq_col_row") of every point. Cells are
+        'size' meters wide. """
+
+    import pandas as pd
+
+    x, y = _meters(longitude, latitude, middle)
+    valid = np.isfinite(x) & np.isfinite(y)
+    col = np.floor(np.where(valid, x, 0) / size).astype(np.int64)
+    row = np.floor(np.where(valid, y, 0) / size).astype(np.int64)
+    names = pd.Series("sq_" + col.astype(str).astype(object) + "_" + row.astype(str).astype(object))
+    return np.where(valid, names.to_numpy(object), NO_ZONE)
+
+
+def hex_grid(longitude, latitude, size=500, middle=None):
+    """ Returns the hexagon ("hex_q_r", axial coordinates) of every point.
+        Hexagons are 'size' meters from side to side. """
+
+    import pandas as pd
+
+    x, y = _meters(longitude, latitude, middle)
+    valid = np.isfinite(x) & np.isfinite(y)
+    x, y = np.where(valid, x, 0), np.where(valid, y, 0)
+
+    radius = size / np.sqrt(3)  # Center to corner of a pointy-top hexagon.
+    q = (np.sqrt(3) / 3 * x - y / 3) / radius
+    r = (2 / 3 * y) / radius
+
+    # Rounds to the nearest hexagon in cube coordinates (q + r + s = 0).
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+
+    names = pd.Series("hex_" + rq.astype(np.int64).astype(str).astype(object) + "_" +
+                      rr.astype(np.int64).astype(str).astype(object))
+    return np.where(valid, names.to_numpy(object), NO_ZONE)
+
+
+"""/**** TOTALS ***/ """
+def zone_totals(zones, values, columns=METRICS):
+    """ Sums every benefit column per zone in one pass. 'values' is an
+        array or DataFrame of shape (trees, columns). Returns a DataFrame
+        indexed by zone with a Trees count and one column per benefit. """
+
+    import pandas as pd
+
+    values = np.nan_to_num(np.asarray(values, float))
+    codes, names = pd.factorize(pd.Series(zones, dtype=object), sort=True)
+    sums = np.column_stack([np.bincount(codes, weights=values[:, j], minlength=len(names))
+                            for j in range(values.shape[1])]) if len(names) else np.empty((0, len(columns)))
+
+    table = pd.DataFrame(sums, index=pd.Index(names, name="Zone"), columns=list(columns))
+    table.insert(0, "Trees", np.bincount(codes, minlength=len(names)))
+    return table
+
+
+def main():
+    """ Writes benefits per zone of tree.xls and treeresult.csv. """
+
+    parser = argparse.ArgumentParser(description="Adds up tree benefits per zone.")
+    parser.add_argument("--file", default="tree.xls", help="tree sheet with coordinates")
+    parser.add_argument("--results", default="treeresult.csv", help="iTree export of the same trees")
+    parser.add_argument("--polygons", help="GeoJSON file with one polygon per zone")
+    parser.add_argument("--name", help="property with the zone name in the GeoJSON file")
+    parser.add_argument("--grid", choices=["square", "hex"], default="hex")
+    parser.add_argument("--size", type=float, default=500, help="grid cell size in meters")
+    parser.add_argument("--out", default="zones.csv")
+    args = parser.parse_args()
+
+    trees = load_trees(args.file)
+    results = read_results(args.results)
+    if len(results) != len(trees):
+        raise ValueError("%s has %d trees but %s has %d rows" % (args.file, len(trees), args.results, len(results)))
+
+    if args.polygons:
+        zones = PolygonIndex.from_geojson(args.polygons, args.name).assign(trees["Longitude"], trees["Latitude"])
+    elif args.grid == "square":
+        zones = square_grid(trees["Longitude"], trees["Latitude"], args.size)
+    else:
+        zones = hex_grid(trees["Longitude"], trees["Latitude"], args.size)
+
+    table = zone_totals(zones, results[METRICS])
+    table.round(3).to_csv(args.out)
+    print("Wrote %d zones to %s" % (len(table), args.out))
+
+
+if __name__ == '__main__':
+    main()